@@ -0,0 +1,117 @@
+"""VesperiaTools batch mesh export.
+
+Export every SPM/SPV pair under an extracted directory tree.
+
+Usage example:
+
+    python batch_export.py path/to/Data64 path/to/output -j 8 --format obj --exclude "BTL*"
+
+"""
+import argparse
+import logging
+import os
+import sys
+
+from cli import set_logging
+from utils import instrument
+from utils.batch import (
+    EXPORT_FORMATS,
+    FORMAT_OBJ,
+    export_meshes,
+    format_report,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Export every SPM/SPV pair under a directory tree as OBJ or GLB.",
+    )
+    parser.add_argument(
+        "input_path",
+        help="Directory containing extracted SPM/SPV files (or a single SPM file)",
+    )
+    parser.add_argument(
+        "output_path",
+        help="Output directory, a directory per package is created in it",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes decoding packages. Default to CPU count.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        default=FORMAT_OBJ,
+        help="Export format. GLB requires trimesh. Default obj.",
+    )
+    parser.add_argument(
+        "--mesh-cache",
+        metavar="DIR",
+        help="Cache decoded SPM/SPV meshes in this directory and reuse them on later exports",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Only export SPM matching the file name glob (e.g. 'CH*'). Repeatable.",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip SPM matching the file name glob (e.g. 'BTL*'). Repeatable.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Export every package even if the manifest reports it as unchanged",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="JSONL",
+        help="Record the write timings as JSON lines and print a summary",
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Enable debug logging",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    set_logging(logging.DEBUG if args.verbose else logging.INFO)
+    if args.profile:
+        open(args.profile, "w").close()
+        instrument.enable(args.profile)
+
+    report = export_meshes(
+        args.input_path,
+        args.output_path,
+        workers=args.jobs,
+        export_format=args.format,
+        include=args.include,
+        exclude=args.exclude,
+        force=args.force,
+        mesh_cache_path=args.mesh_cache,
+    )
+    if not report.packages:
+        logger.error(f"No SPM/SPV found in {args.input_path}")
+        return 1
+
+    print(format_report(report))
+    if args.profile:
+        instrument.disable()
+        print(instrument.format_summary(instrument.summarize(instrument.load_records(args.profile))))
+    return 1 if report.failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
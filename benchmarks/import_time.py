@@ -0,0 +1,132 @@
+"""Import time benchmark.
+
+Measure the cumulative import time of the VesperiaTools entry points with
+``python -X importtime`` and fail when a budget is exceeded or when a heavy
+dependency is imported eagerly.
+
+Usage example:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 10 --scale 2.0
+
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budgets in milliseconds
+IMPORT_BUDGETS_MS = {
+    "parsers.parser": 150,
+    "utils.exporter": 200,
+    "utils.pipeline": 150,
+    "utils.batch": 150,
+    "cli": 250,
+    "main": 1000,
+}
+
+# Modules that must only be imported on first use
+HEAVY_MODULES = (
+    "PySide2",
+    "pyrender",
+    "trimesh",
+    "OpenGL",
+    "pyglet",
+)
+
+# Entry points allowed to import some heavy modules eagerly
+ALLOWED_HEAVY_MODULES = {
+    "main": ("PySide2",),
+}
+
+
+def measure_import(module: str) -> Dict[str, int]:
+    """Import a module in a fresh interpreter with -X importtime.
+
+    Parameters
+    ----------
+    module : str
+        Module name (e.g. 'parsers.parser')
+
+    Returns
+    -------
+    dict
+        Cumulative import time in microseconds keyed by imported module name.
+
+    Raises
+    ------
+    ImportError
+        If the module can't be imported in this environment.
+
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise ImportError(process.stderr.strip().splitlines()[-1])
+
+    timings = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # import time: self [us] | cumulative | imported package
+        _, cumulative_us, name = line.split("|")
+        timings[name.strip()] = int(cumulative_us)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check import time budgets.")
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=5,
+        help="Imports per module. The fastest run is kept. Default 5.",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply every budget (e.g. for slow CI machines). Default 1.0.",
+    )
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module, budget_ms in IMPORT_BUDGETS_MS.items():
+        budget_ms *= args.scale
+        try:
+            runs = [measure_import(module) for _ in range(args.runs)]
+        except ImportError as e:
+            print(f"SKIP {module:<16} {e}")
+            continue
+
+        elapsed_ms = min(timings[module] for timings in runs) / 1000
+        status = "OK"
+        if elapsed_ms > budget_ms:
+            status = "FAIL"
+            failures.append(f"{module} took {elapsed_ms:.1f}ms (budget {budget_ms:.1f}ms)")
+
+        allowed = ALLOWED_HEAVY_MODULES.get(module, ())
+        heavy_imports = sorted({
+            name for name in runs[0]
+            if name.split(".")[0] in HEAVY_MODULES and name.split(".")[0] not in allowed
+        })
+        if heavy_imports:
+            status = "FAIL"
+            failures.append(f"{module} eagerly imports {', '.join(heavy_imports[:5])}")
+
+        print(f"{status:<4} {module:<16} {elapsed_ms:>8.1f}ms / {budget_ms:.1f}ms")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,525 @@
+"""Parser and writer benchmarks on synthetic assets.
+
+Time every parser and writer on generated inputs and compare the fastest
+round against the stored baselines.
+
+Baselines are stored in units of a calibration loop timed on the machine
+saving them, and converted with the calibration of the machine running
+the comparison, so baselines roughly carry over between machines. The
+comparison is only reported, --check fails on regressions (only reliable
+against baselines saved on the same machine).
+
+Usage example:
+
+    python -m benchmarks.run_benchmarks
+    python benchmarks/run_benchmarks.py --size large --filter parse_mesh
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks --memory --save-baseline
+    python -m benchmarks.run_benchmarks --check
+
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import struct
+import sys
+import tempfile
+import time
+from typing import (
+    Callable,
+    Dict,
+    Tuple,
+)
+
+if not __package__:
+    # Run as a script, make the repository importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import (
+    LAYOUT_BG,
+    LAYOUT_SKINNED,
+    LAYOUT_UNSKINNED,
+    build_dat_members,
+    build_fps4,
+    build_mtr,
+    build_spm_spv,
+    build_svo,
+    build_tlzc,
+    build_txm_txv,
+    write_files,
+)
+from parsers.models import Node
+from parsers.parser import (
+    list_dat,
+    parse_dat,
+    parse_dec,
+    parse_dec_ext,
+    parse_fps4,
+    parse_material,
+    parse_mesh,
+    parse_svo,
+    parse_textures,
+)
+from utils import memory
+from utils.binaries import BinaryReader, BinaryUnpacker
+from utils.magic import find_dds_headers, get_extensions
+from utils.materials import write_to_mtl
+from utils.mesh_cache import MeshCache, load_node
+from utils.meshes import face_creation, write_to_obj
+from utils.textures import write_to_dds
+
+BASELINES_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+MEMORY_BASELINES_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_baselines.json")
+DEFAULT_THRESHOLD = 0.25
+
+CALIBRATION_KEY = "calibration"
+CALIBRATION_ROUNDS = 15
+# Vertex-like records read with struct, as the parsers do
+CALIBRATION_DATA = bytes(range(256)) * 1024
+
+SIZES = {
+    "small": {
+        "dats": 8,
+        "meshes": 8,
+        "vertices": 1024,
+        "textures": 8,
+        "dds_size": 64 * 1024,
+        "materials": 64,
+    },
+    "large": {
+        "dats": 32,
+        "meshes": 32,
+        "vertices": 2048,
+        "textures": 16,
+        "dds_size": 1024 * 1024,
+        "materials": 128,
+    },
+}
+
+# A benchmark returns a setup function, called before every round
+# outside of the timing, which returns the timed function.
+Benchmark = Callable[[str, Dict], Callable[[], Callable[[], object]]]
+
+
+def bench_parse_svo(dir_path: str, size: Dict):
+    members = [
+        (f"CH{d:03}.DAT", build_tlzc(build_fps4(build_dat_members(f"CH{d:03}", **mesh_kwargs(size)))))
+        for d in range(size["dats"])
+    ]
+    svo_path = write_files(dir_path, {"PACK.SVO": build_svo(members)})["PACK.SVO"]
+    return lambda: lambda: parse_svo(svo_path, force=True)
+
+
+def bench_parse_dat(dir_path: str, size: Dict):
+    dec = build_fps4(build_dat_members("CH000", **mesh_kwargs(size)), archive_name="CH000.DAT")
+    dat_path = write_files(dir_path, {"CH000.DAT": build_tlzc(dec)})["CH000.DAT"]
+    return lambda: lambda: parse_dat(dat_path, force=True)
+
+
+def bench_list_dat(dir_path: str, size: Dict):
+    # Same DAT as parse_dat, only decompressed up to its entry table
+    dec = build_fps4(build_dat_members("CH000", **mesh_kwargs(size)), archive_name="CH000.DAT")
+    dat_path = write_files(dir_path, {"CH000.DAT": build_tlzc(dec)})["CH000.DAT"]
+    return lambda: lambda: list_dat(dat_path)
+
+
+def bench_parse_dec(dir_path: str, size: Dict):
+    dec = build_fps4(build_dat_members("CH000", **mesh_kwargs(size)), archive_name="CH000.DAT")
+    dec_path = write_files(dir_path, {"CH000.DAT.dec": dec})["CH000.DAT.dec"]
+    return lambda: lambda: parse_dec(dec_path, force=True)
+
+
+def bench_parse_dec_ext(dir_path: str, size: Dict):
+    fps4 = build_fps4(build_dat_members("CH000", **mesh_kwargs(size)))
+    fps4_path = write_files(dir_path, {"NONAME0.FPS4": fps4})["NONAME0.FPS4"]
+    return lambda: lambda: parse_dec_ext(fps4_path)
+
+
+def make_bench_parse_mesh(layout: str, lazy=False) -> Benchmark:
+    def bench_parse_mesh(dir_path: str, size: Dict):
+        spm_path = write_spm_spv(dir_path, size, layout)
+        return lambda: lambda: parse_mesh(spm_path, Node(), lazy=lazy)
+    return bench_parse_mesh
+
+
+def bench_face_creation(dir_path: str, size: Dict):
+    spm_path = write_spm_spv(dir_path, size, LAYOUT_SKINNED)
+
+    def setup():
+        node = Node()
+        parse_mesh(spm_path, node)
+        return lambda: face_creation(node)
+    return setup
+
+
+def bench_mesh_cache(dir_path: str, size: Dict):
+    spm_path = write_spm_spv(dir_path, size, LAYOUT_SKINNED)
+    cache = MeshCache(os.path.join(dir_path, "mesh_cache"))
+    load_node(spm_path, cache=cache)
+    return lambda: lambda: load_node(spm_path, cache=cache)
+
+
+def bench_parse_textures(dir_path: str, size: Dict):
+    txm_path = write_txm_txv(dir_path, size)
+    return lambda: lambda: parse_textures(txm_path, Node())
+
+
+def bench_parse_material(dir_path: str, size: Dict):
+    mtr_path = write_files(dir_path, {"CH000.MTR": build_mtr(size["materials"])})["CH000.MTR"]
+    return lambda: lambda: parse_material(mtr_path, Node())
+
+
+def bench_write_to_obj(dir_path: str, size: Dict):
+    spm_path = write_spm_spv(dir_path, size, LAYOUT_SKINNED)
+    node = Node()
+    parse_mesh(spm_path, node)
+    face_creation(node)
+    return lambda: lambda: write_to_obj(node, dir_path)
+
+
+def bench_write_to_dds(dir_path: str, size: Dict):
+    txm_path = write_txm_txv(dir_path, size)
+    node = Node()
+    parse_textures(txm_path, node)
+    return lambda: lambda: write_to_dds(node, dir_path)
+
+
+def bench_write_to_mtl(dir_path: str, size: Dict):
+    mtr_path = write_files(dir_path, {"CH000.MTR": build_mtr(size["materials"])})["CH000.MTR"]
+    node = Node()
+    parse_material(mtr_path, node)
+    return lambda: lambda: write_to_mtl(node, dir_path)
+
+
+def make_bench_binary_reader(method: str) -> Benchmark:
+    def bench_binary_reader(dir_path: str, size: Dict):
+        # Compressed vertex stream: 8 shorts per vertex
+        count = size["meshes"] * size["vertices"] * 8
+        data_path = write_files(dir_path, {"STREAM.BIN": os.urandom(count * 2)})["STREAM.BIN"]
+
+        def run():
+            with open(data_path, "rb") as f:
+                g = BinaryReader(f)
+                return getattr(g, method)(count)
+        return lambda: run
+    return bench_binary_reader
+
+
+def bench_parse_fps4(dir_path: str, size: Dict):
+    # Tens of thousands of small members
+    fps4 = build_fps4([(f"M{idx:05}.SPM", b"\x00" * 16) for idx in range(size["dats"] * 1024)])
+
+    def setup():
+        g = BinaryUnpacker(fps4)
+        g.endian = ">"
+        return lambda: parse_fps4(g, 0, Node())
+    return setup
+
+
+def bench_classify_members(dir_path: str, size: Dict):
+    # Thousands of members, as in the largest DEC files
+    dec = build_fps4(build_dat_members("CH000", **mesh_kwargs(size)))
+    members = size["dats"] * 512
+    offsets = [idx * len(dec) // members for idx in range(members)]
+
+    def run():
+        get_extensions(dec, offsets)
+        find_dds_headers(dec, offsets)
+    return lambda: run
+
+
+def bench_binary_unpacker(dir_path: str, size: Dict):
+    # Vertex records read one field at a time, as the parsers do
+    count = size["meshes"] * size["vertices"]
+    data = os.urandom(count * 28)
+
+    def run():
+        g = BinaryUnpacker(data)
+        for _ in range(count):
+            g.f(3)
+            g.f(3)
+            g.B(4)
+    return lambda: run
+
+
+def mesh_kwargs(size: Dict) -> Dict:
+    return {
+        "meshes": size["meshes"],
+        "vertices": size["vertices"],
+        "textures": size["textures"],
+        "dds_size": size["dds_size"],
+    }
+
+
+def write_spm_spv(dir_path: str, size: Dict, layout: str) -> str:
+    spm, spv = build_spm_spv(layout=layout, meshes=size["meshes"], vertices=size["vertices"])
+    return write_files(dir_path, {"CH000.SPM": spm, "CH000.SPV": spv})["CH000.SPM"]
+
+
+def write_txm_txv(dir_path: str, size: Dict) -> str:
+    txm, txv = build_txm_txv(textures=size["textures"], dds_size=size["dds_size"])
+    return write_files(dir_path, {"CH000.TXM": txm, "CH000.TXV": txv})["CH000.TXM"]
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "parse_svo": bench_parse_svo,
+    "parse_dat": bench_parse_dat,
+    "parse_dec": bench_parse_dec,
+    "parse_dec_ext": bench_parse_dec_ext,
+    "parse_mesh[skinned]": make_bench_parse_mesh(LAYOUT_SKINNED),
+    "parse_mesh[unskinned]": make_bench_parse_mesh(LAYOUT_UNSKINNED),
+    "parse_mesh[bg]": make_bench_parse_mesh(LAYOUT_BG),
+    "parse_mesh[lazy]": make_bench_parse_mesh(LAYOUT_SKINNED, lazy=True),
+    "face_creation": bench_face_creation,
+    "mesh_cache[hit]": bench_mesh_cache,
+    "parse_textures": bench_parse_textures,
+    "parse_material": bench_parse_material,
+    "write_to_obj": bench_write_to_obj,
+    "write_to_dds": bench_write_to_dds,
+    "write_to_mtl": bench_write_to_mtl,
+    "binary_reader[half]": make_bench_binary_reader("half"),
+    "binary_reader[short]": make_bench_binary_reader("short"),
+    "binary_unpacker": bench_binary_unpacker,
+    "classify_members": bench_classify_members,
+    "parse_fps4": bench_parse_fps4,
+    "list_dat": bench_list_dat,
+}
+
+
+def run_benchmark(benchmark: Benchmark, size: Dict, rounds: int) -> Tuple[float, float]:
+    """Run a benchmark in its own temporary directory.
+
+    Parameters
+    ----------
+    benchmark : callable
+    size : dict
+        Synthetic asset sizes.
+    rounds : int
+        Number of timed rounds.
+
+    Returns
+    -------
+    tuple of float
+        The fastest and median round in seconds.
+
+    """
+    timings = []
+    with tempfile.TemporaryDirectory() as dir_path:
+        # Parsers print and log while parsing, keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            setup = benchmark(dir_path, size)
+            for _ in range(rounds):
+                run = setup()
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+def measure_peak(benchmark: Benchmark, size: Dict) -> int:
+    """Run a benchmark round under tracemalloc.
+
+    Parameters
+    ----------
+    benchmark : callable
+    size : dict
+        Synthetic asset sizes.
+
+    Returns
+    -------
+    int
+        Memory peak of the round in bytes.
+
+    """
+    with tempfile.TemporaryDirectory() as dir_path:
+        with contextlib.redirect_stdout(io.StringIO()):
+            setup = benchmark(dir_path, size)
+            run = setup()
+            memory.enable(top_sites=0)
+            try:
+                with memory.span("benchmark") as record:
+                    run()
+            finally:
+                memory.disable()
+                memory.reset()
+    return record.peak
+
+
+def calibration_loop():
+    total = 0.0
+    for offset in range(0, len(CALIBRATION_DATA) - 12, 12):
+        x, y, z = struct.unpack_from("<3f", CALIBRATION_DATA, offset)
+        total += x
+    return total
+
+
+def calibrate() -> float:
+    """Time the calibration loop.
+
+    Returns
+    -------
+    float
+        The median round in seconds, less sensitive to a lucky round than
+        the fastest one.
+
+    """
+    timings = []
+    for _ in range(CALIBRATION_ROUNDS):
+        start = time.perf_counter()
+        calibration_loop()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def get_machine() -> str:
+    return f"{platform.node()} {platform.machine()} {platform.python_version()}"
+
+
+def load_baselines(json_path: str = BASELINES_JSON) -> Dict[str, Dict[str, float]]:
+    if not os.path.isfile(json_path):
+        return {}
+    with open(json_path, "r") as f:
+        return json.load(f)
+
+
+def save_baselines(baselines: Dict[str, Dict[str, float]], json_path: str = BASELINES_JSON):
+    with open(json_path, "w") as f:
+        f.write(json.dumps(baselines, indent=4, sort_keys=True))
+
+
+def get_change(value: float, baseline: float, threshold: float) -> Tuple[str, bool]:
+    ratio = value / baseline - 1
+    regressed = ratio > threshold
+    return f"{ratio:+.0%}" + (" !" if regressed else ""), regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parsers and writers on synthetic assets.")
+    parser.add_argument(
+        "--size",
+        choices=sorted(SIZES),
+        default="small",
+        help="Synthetic asset sizes. Default small.",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=5,
+        help="Timed rounds per benchmark. Default 5.",
+    )
+    parser.add_argument(
+        "--filter",
+        default="",
+        help="Only run benchmarks whose name contains this value",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Allowed slowdown over the baseline. Default {DEFAULT_THRESHOLD} (25%%).",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Fail when a benchmark exceeds its baseline by more than the threshold",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the new baselines instead of comparing",
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help=(
+            "Also measure the tracemalloc peak of an extra round and compare it "
+            "against the memory baselines with the same threshold"
+        ),
+    )
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    start_calibration = calibrate()
+    baselines = load_baselines()
+    baseline_calibration = baselines.get(CALIBRATION_KEY, {})
+    size_baselines = baselines.setdefault(args.size, {})
+    memory_baselines = load_baselines(MEMORY_BASELINES_JSON)
+    size_memory_baselines = memory_baselines.setdefault(args.size, {})
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        results[name] = run_benchmark(benchmark, SIZES[args.size], args.rounds)
+    # Average both ends of the run to follow the machine speed drifting
+    calibration = (start_calibration + calibrate()) / 2
+    print(f"Calibration: {calibration * 1000:.2f} ms on {get_machine()}")
+    if baseline_calibration and not args.save_baseline:
+        print(
+            f"Baselines saved at {baseline_calibration['seconds'] * 1000:.2f} ms "
+            f"on {baseline_calibration['machine']}"
+        )
+        if baseline_calibration["machine"] != get_machine():
+            print("Baselines come from another machine, changes are approximate")
+
+    regressions = []
+    memory_regressions = []
+    header = f"{'benchmark':<24}{'min (ms)':>12}{'median (ms)':>14}{'baseline (ms)':>16}{'change':>10}"
+    if args.memory:
+        header += f"{'peak (MB)':>12}{'baseline (MB)':>16}{'change':>10}"
+    print(header)
+    for name, (fastest, median) in results.items():
+        benchmark = BENCHMARKS[name]
+        # Stored in calibration units
+        baseline = size_baselines.get(name, 0) * calibration
+        change = ""
+        if baseline and not args.save_baseline:
+            change, regressed = get_change(fastest, baseline, args.threshold)
+            if regressed:
+                regressions.append(name)
+        row = (
+            f"{name:<24}{fastest * 1000:>12.2f}{median * 1000:>14.2f}"
+            f"{baseline * 1000:>16.2f}{change:>10}"
+        )
+        if args.save_baseline:
+            size_baselines[name] = round(fastest / calibration, 4)
+
+        if args.memory:
+            peak = measure_peak(benchmark, SIZES[args.size])
+            memory_baseline = size_memory_baselines.get(name)
+            memory_change = ""
+            if memory_baseline and not args.save_baseline:
+                memory_change, regressed = get_change(peak, memory_baseline, args.threshold)
+                if regressed:
+                    memory_regressions.append(name)
+            row += f"{peak / 1e6:>12.2f}{(memory_baseline or 0) / 1e6:>16.2f}{memory_change:>10}"
+            if args.save_baseline:
+                size_memory_baselines[name] = peak
+        print(row)
+
+    if args.save_baseline:
+        baselines[CALIBRATION_KEY] = {
+            "seconds": round(calibration, 6),
+            "machine": get_machine(),
+        }
+        save_baselines(baselines)
+        print(f"Baselines saved to {BASELINES_JSON}")
+        if args.memory:
+            save_baselines(memory_baselines, MEMORY_BASELINES_JSON)
+            print(f"Memory baselines saved to {MEMORY_BASELINES_JSON}")
+        return 0
+
+    status = "FAIL" if args.check else "SLOWER"
+    for name in regressions:
+        print(f"{status} {name} is more than {args.threshold:.0%} slower than its baseline")
+    for name in memory_regressions:
+        print(f"{status} {name} peaks more than {args.threshold:.0%} above its memory baseline")
+    return 1 if args.check and (regressions or memory_regressions) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,405 @@
+"""Synthetic Vesperia assets.
+
+Build minimal but valid SVO, DEC (FPS4), DAT (TLZC), SPM/SPV, TXM/TXV and
+MTR files with parametric sizes, so parsers can be benchmarked without
+shipping game data.
+
+"""
+import os
+import struct
+import zlib
+from typing import (
+    Dict,
+    List,
+    Sequence,
+    Tuple,
+)
+
+from constants.tales import DDS_HEADER
+
+# Leading values matching TYPE_2_EXT_PC
+SPM_TYPE = 0x00010000
+MTR_TYPE = 0x00030000
+TXM_TYPE = (0x00, 0x02, 0x00, 0x00)
+SPV_CH_TYPE = 0xFFFFFFFF
+
+LAYOUT_SKINNED = "skinned"
+LAYOUT_UNSKINNED = "unskinned"
+LAYOUT_BG = "bg"
+MESH_TYPES = {
+    LAYOUT_SKINNED: 256,
+    LAYOUT_UNSKINNED: 1792,
+    LAYOUT_BG: 1024,
+}
+
+
+def pad(data: bytes, alignment: int) -> bytes:
+    return data + b"\x00" * (-len(data) % alignment)
+
+
+def build_fps4(
+        members: Sequence[Tuple[str, bytes]],
+        entry_size: int = 16,
+        alignment: int = 128,
+        archive_name: str = None,
+) -> bytes:
+    """Build a DEC style FPS4 package (as read by parse_fps4).
+
+    Parameters
+    ----------
+    members : list of (str, bytes)
+        Member names and contents.
+    archive_name : str or None
+        Archive name stored ahead of the member names (e.g. 'PACKAGE.DAT').
+        parse_dec only uses found package names when it is present.
+    entry_size : int
+        Entry size in bytes. 16 includes the name offset. Default 16.
+    alignment : int
+        Member data alignment. Default 128.
+
+    Returns
+    -------
+    bytes
+
+    """
+    header_size = 28
+    archive_name = archive_name.encode() + b"\x00" if archive_name else b""
+    names = archive_name + b"".join(name.encode() + b"\x00" for name, _ in members)
+    name_offset = header_size + len(members) * entry_size
+    archive_name_offset = name_offset if archive_name else 0
+    name_offset += len(archive_name)
+    data_offset = header_size + len(members) * entry_size + len(names)
+    data_offset += -data_offset % alignment
+
+    entries = b""
+    data = b""
+    for name, content in members:
+        entry = struct.pack(">4i", data_offset + len(data), len(content), len(content), name_offset)
+        entries += entry[:entry_size].ljust(entry_size, b"\x00")
+        name_offset += len(name) + 1
+        data += pad(content, alignment)
+
+    header = b"FPS4" + struct.pack(
+        ">3i2H2i",
+        len(members),
+        header_size,
+        data_offset,
+        entry_size,
+        0x47,
+        0,
+        archive_name_offset,
+    )
+    return pad(header + entries + names, alignment) + data
+
+
+def build_svo(members: Sequence[Tuple[str, bytes]]) -> bytes:
+    """Build an SVO package (FPS4 with 44 bytes entries and inline names).
+
+    Parameters
+    ----------
+    members : list of (str, bytes)
+        Member names and contents.
+
+    Returns
+    -------
+    bytes
+
+    """
+    header_size = 28
+    data_offset = header_size + len(members) * 44
+    data_offset += -data_offset % 128
+
+    entries = b""
+    data = b""
+    for name, content in members:
+        entries += struct.pack(">3i", data_offset + len(data), len(content), len(content))
+        entries += name.encode().ljust(32, b"\x00")
+        data += pad(content, 128)
+
+    header = b"FPS4" + struct.pack(">6i", len(members), header_size, data_offset, 44, 0, 0)
+    return pad(header + entries, 128) + data
+
+
+def build_tlzc(payload: bytes) -> bytes:
+    """Build a zlib TLZC DAT package.
+
+    Parameters
+    ----------
+    payload : bytes
+        The decompressed content (usually an FPS4 package).
+
+    Returns
+    -------
+    bytes
+
+    """
+    compressed = zlib.compress(payload)
+    return b"TLZC" + struct.pack("<5i", 1, len(compressed) + 24, len(payload), 0, 0) + compressed
+
+
+def build_spm_spv(
+        layout: str = LAYOUT_SKINNED,
+        meshes: int = 4,
+        submeshes: int = 2,
+        vertices: int = 256,
+        hashes: int = 4,
+) -> Tuple[bytes, bytes]:
+    """Build an SPM/SPV pair.
+
+    Every submesh is a single triangle strip over its own vertices.
+
+    Parameters
+    ----------
+    layout : str
+        LAYOUT_SKINNED, LAYOUT_UNSKINNED or LAYOUT_BG.
+    meshes : int
+        Number of meshes.
+    submeshes : int
+        Number of submeshes per mesh.
+    vertices : int
+        Number of vertices per submesh.
+    hashes : int
+        Number of trailing hash values.
+
+    Returns
+    -------
+    tuple of bytes
+        The SPM and SPV contents.
+
+    """
+    mesh_type = MESH_TYPES[layout]
+    c1_offset = 16 + 5 * 4
+    d_offset = c1_offset + meshes * 8 * 4 + meshes * 4 * 4
+    blocks_offset = d_offset + meshes * 15 * 4 + hashes * 4
+
+    skin_counts = [vertices - 3 * (vertices // 4)] + [vertices // 4] * 3
+    c1_records = b""
+    d_records = b""
+    blocks = b""
+    names = b""
+    name_offsets = []
+    for m in range(meshes):
+        name = f"MESH_{m:03}".encode() + b"\x00"
+        name_offsets.append(len(names))
+        names += name
+
+    names_offset = blocks_offset
+    block_list = []
+    for m in range(meshes):
+        # Index block: submesh count, (UV count, index count) pairs, indices
+        index_block = struct.pack("<i", submeshes)
+        index_block += struct.pack(f"<{submeshes * 2}H", *([vertices, vertices] * submeshes))
+        for _ in range(submeshes):
+            index_block += struct.pack(f"<{vertices}H", *range(vertices))
+        index_block = pad(index_block, 4)
+
+        # Vertex block
+        vertex_block = b""
+        if layout == LAYOUT_SKINNED:
+            for s in range(submeshes):
+                if s > 0:
+                    vertex_block += struct.pack("<4i", *skin_counts)
+                idx = 0
+                for weights, count in enumerate(skin_counts):
+                    for _ in range(count):
+                        vertex_block += struct.pack("<6f", idx * 0.01, s * 1.0, m * 1.0, 0.0, 1.0, 0.0)
+                        vertex_block += struct.pack("<4B", 0, 1, 2, 3)
+                        vertex_block += struct.pack(f"<{weights}f", *([0.25] * weights))
+                        idx += 1
+        else:
+            vertex_count = vertices if layout == LAYOUT_UNSKINNED else vertices * submeshes
+            for idx in range(vertex_count):
+                vertex_block += struct.pack("<3f", (idx % vertices) * 0.01, idx // vertices * 1.0, m * 1.0)
+
+        block_list.append((index_block, vertex_block))
+        names_offset += len(index_block) + len(vertex_block)
+
+    block_offset = blocks_offset
+    for m, (index_block, vertex_block) in enumerate(block_list):
+        if layout == LAYOUT_SKINNED:
+            c1 = [0, 0, 0, 0] + skin_counts
+        elif layout == LAYOUT_UNSKINNED:
+            c1 = [0, 0, 0, 0, vertices, 0, 0, 0]
+        else:
+            c1 = [0, 0, 0, 0, vertices * submeshes, 0, 0, 0]
+        c1_records += struct.pack("<8i", *c1)
+
+        d_start = d_offset + m * 15 * 4
+        index_offset = block_offset
+        vertex_offset = block_offset + len(index_block)
+        name_offset = names_offset + name_offsets[m]
+        d = [0] * 15
+        d[0] = mesh_type
+        d[4] = 1
+        d[6] = index_offset - (d_start + 6 * 4)
+        d[7] = vertex_offset - (d_start + 7 * 4)
+        d[10] = vertices * submeshes
+        d[13] = name_offset - (d_start + 13 * 4)
+        d_records += struct.pack("<15i", *d)
+        blocks += index_block + vertex_block
+        block_offset += len(index_block) + len(vertex_block)
+
+    spm = struct.pack("<4i", SPM_TYPE, 0, 16, meshes)
+    spm += struct.pack("<5i", hashes, 0, 0, 0, 0)
+    spm += c1_records
+    spm += b"\x00" * (meshes * 4 * 4)
+    spm += d_records
+    spm += struct.pack(f"<{hashes}i", *range(hashes))
+    spm += blocks + names
+
+    uv = b""
+    for idx in range(vertices):
+        uv += struct.pack("<I4f", SPV_CH_TYPE, idx / vertices, 1.0 - idx / vertices, 0.0, 0.0)
+    spv = uv * (meshes * submeshes)
+    return spm, spv
+
+
+def build_txm_txv(textures: int = 4, dds_size: int = 4096) -> Tuple[bytes, bytes]:
+    """Build a TXM/TXV pair of same sized DDS textures.
+
+    Parameters
+    ----------
+    textures : int
+        Number of textures. parse_textures needs at least 2.
+    dds_size : int
+        Size of each DDS file in bytes.
+
+    Returns
+    -------
+    tuple of bytes
+        The TXM and TXV contents.
+
+    """
+    records_offset = 16
+    names_offset = records_offset + textures * 7 * 4
+    records = b""
+    names = b""
+    for t in range(textures):
+        record_start = records_offset + t * 7 * 4
+        name_offset = names_offset + len(names)
+        records += struct.pack(">7i", t * dds_size, 0, 0, 0, 0, 0, name_offset - (record_start + 6 * 4))
+        names += f"TEX_{t:03}".encode() + b"\x00"
+
+    txm = struct.pack(">4B3i", *TXM_TYPE, 0, 0, textures) + records + names
+    dds = (DDS_HEADER + struct.pack("<i", 124)).ljust(dds_size, b"\x00")
+    txv = dds * textures
+    return txm, txv
+
+
+def build_mtr(materials: int = 8, textures_per_material: int = 3) -> bytes:
+    """Build an MTR package.
+
+    Parameters
+    ----------
+    materials : int
+        Number of materials.
+    textures_per_material : int
+        Number of texture names per material (up to 7).
+
+    Returns
+    -------
+    bytes
+
+    """
+    table_offset = 16 + 4 + materials * 8 * 4
+    names_offset = table_offset + materials * 8 * 4
+    records = b""
+    names = b""
+    for m in range(materials):
+        record_start = table_offset + m * 8 * 4
+        slots = [f"MAT_{m:03}"] + [f"TEX_{m:03}_{t}" for t in range(textures_per_material)]
+        offsets = [0] * 8
+        for i, slot in enumerate(slots):
+            offsets[i] = names_offset + len(names) - (record_start + 4 * i)
+            names += slot.encode() + b"\x00"
+        records += struct.pack("<8i", *offsets)
+
+    mtr = struct.pack("<4i", MTR_TYPE, 0, 16, materials)
+    mtr += struct.pack("<i", materials)
+    mtr += b"\x00" * (materials * 8 * 4)
+    return mtr + records + names
+
+
+def build_dat_members(
+        name: str,
+        layout: str = LAYOUT_SKINNED,
+        meshes: int = 4,
+        vertices: int = 256,
+        textures: int = 4,
+        dds_size: int = 4096,
+) -> List[Tuple[str, bytes]]:
+    spm, spv = build_spm_spv(layout=layout, meshes=meshes, vertices=vertices)
+    txm, txv = build_txm_txv(textures=textures, dds_size=dds_size)
+    return [
+        (f"{name}.SPM", spm),
+        (f"{name}.SPV", spv),
+        (f"{name}.TXM", txm),
+        (f"{name}.TXV", txv),
+        (f"{name}.MTR", build_mtr()),
+    ]
+
+
+def write_game_tree(
+        dir_path: str,
+        svos: int = 1,
+        dats: int = 4,
+        **kwargs,
+) -> List[str]:
+    """Write a synthetic game directory of SVOs containing DATs.
+
+    Parameters
+    ----------
+    dir_path : str
+        Output directory.
+    svos : int
+        Number of SVO files.
+    dats : int
+        Number of DAT files per SVO.
+    **kwargs
+        Passed to build_dat_members (e.g. meshes, vertices, textures).
+
+    Returns
+    -------
+    list of str
+        Written SVO paths.
+
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    svo_paths = []
+    for s in range(svos):
+        dat_members = []
+        for d in range(dats):
+            name = f"CH{s:02}_{d:03}"
+            dec = build_fps4(build_dat_members(name, **kwargs), archive_name=f"{name}.DAT")
+            dat_members.append((f"{name}.DAT", build_tlzc(dec)))
+
+        svo_path = os.path.join(dir_path, f"PACK{s:02}.SVO")
+        with open(svo_path, "wb") as f:
+            f.write(build_svo(dat_members))
+        svo_paths.append(svo_path)
+    return svo_paths
+
+
+def write_files(dir_path: str, files: Dict[str, bytes]) -> Dict[str, str]:
+    """Write files into a directory.
+
+    Parameters
+    ----------
+    dir_path : str
+        Output directory.
+    files : dict
+        File contents keyed by file name.
+
+    Returns
+    -------
+    dict
+        Written file paths keyed by file name.
+
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    paths = {}
+    for file_name, content in files.items():
+        paths[file_name] = os.path.join(dir_path, file_name)
+        with open(paths[file_name], "wb") as f:
+            f.write(content)
+    return paths
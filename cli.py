@@ -0,0 +1,312 @@
+"""VesperiaTools headless batch extraction.
+
+Usage example:
+
+    python cli.py path/to/Data64 -j 8 --include "*.SPM" --exclude "BTL*"
+    python cli.py path/to/PACKAGE.DAT.dec --list --recursive
+
+"""
+import argparse
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+from functools import partial
+from typing import TYPE_CHECKING
+
+from constants.tales import FPS4_MAX_DEPTH
+from exceptions.files import InvalidFourCCException
+from utils import instrument, memory
+from utils.filters import MemberFilter
+from utils.pipeline import (
+    PipelineOptions,
+    discover_svo_jobs,
+    is_wanted,
+    run_stage,
+)
+from utils.scheduler import (
+    JobResult,
+    format_summary,
+    run_jobs,
+    summarize,
+    timed,
+)
+from utils.trace import write_chrome_trace
+
+if TYPE_CHECKING:
+    from parsers.models import ContainerListing
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(processName)s - %(name)s:%(lineno)d - %(levelname)s - %(message)s'
+
+
+def set_logging(level: int):
+    logging.basicConfig(stream=sys.stderr, level=level, format=LOG_FORMAT)
+
+
+def init_worker(level: int, profile_path: str = None, memory_path: str = None):
+    set_logging(level)
+    if profile_path:
+        instrument.enable(profile_path)
+    if memory_path:
+        memory.enable(memory_path)
+
+
+def format_listing(listing: "ContainerListing") -> str:
+    """Format a container listing as a plain text table.
+
+    Parameters
+    ----------
+    listing : ContainerListing
+
+    Returns
+    -------
+    str
+
+    """
+    real_size = f", {listing.real_size} bytes decompressed" if listing.real_size != listing.size else ""
+    lines = [
+        f"{listing.name} ({listing.fourcc}, {listing.size} bytes{real_size}, {len(listing.entries)} entries)",
+        f"{'offset':>12}{'size':>12}{'real size':>12}  {'type':<10}name",
+    ]
+    for entry in listing.entries:
+        lines.append(
+            f"{entry.offset:>12}{entry.size:>12}{entry.real_size:>12}  {entry.type or '?':<10}"
+            f"{'  ' * entry.depth}{entry.name}"
+        )
+    return "\n".join(lines)
+
+
+def print_listings(game_path: str, recursive=False, max_depth: int = FPS4_MAX_DEPTH) -> int:
+    # Imported here as only listing needs the parsers in the main process
+    from parsers.parser import list_container
+
+    file_paths = [job.path for job in discover_svo_jobs(game_path)]
+    if not file_paths:
+        logger.error(f"No SVO found in {game_path}")
+        return 1
+    failed = 0
+    for file_path in file_paths:
+        try:
+            listing = list_container(file_path, recursive, max_depth)
+        except (OSError, ValueError, struct.error, zlib.error, InvalidFourCCException) as e:
+            logger.error(f"Failed to list {file_path}: {e}")
+            failed += 1
+            continue
+        print(format_listing(listing))
+    return 1 if failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Extract SVO -> DAT -> DEC -> EXT and export SPM/SPV as OBJ, "
+            "TXM/TXV as DDS and MTR as MTL without the GUI."
+        ),
+    )
+    parser.add_argument(
+        "game_path",
+        help="Game directory containing SVO files (or a single SVO file)",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes. Default to CPU count.",
+    )
+    parser.add_argument(
+        "--mesh-workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help=(
+            "Processes decoding the meshes of each SPM, on top of --jobs. "
+            "Helps with a few SPMs holding many large meshes (e.g. BG maps). Default 1."
+        ),
+    )
+    parser.add_argument(
+        "--mesh-cache",
+        metavar="DIR",
+        help="Cache decoded SPM/SPV meshes in this directory and reuse them on later exports",
+    )
+    parser.add_argument(
+        "--list",
+        action="store_true",
+        help=(
+            "List the entries of every SVO (or of a single SVO, DAT or DEC file) with their offsets, sizes and "
+            "detected types, without extracting anything. DATs are only decompressed up to their entry table."
+        ),
+    )
+    parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help=(
+            "Extract the FPS4/TLZC containers nested in each DEC in one pass from memory, "
+            "without writing the intermediate containers"
+        ),
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=FPS4_MAX_DEPTH,
+        metavar="N",
+        help=f"Deepest nesting level extracted with --recursive. Default {FPS4_MAX_DEPTH}.",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Only export assets matching the file name glob (e.g. '*.SPM'). Repeatable.",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip any file matching the file name glob (e.g. 'BTL*'). Repeatable.",
+    )
+    parser.add_argument(
+        "--packages",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Only extract the SVO packages matching the file name glob (e.g. 'CH_YUR*.DAT'). Repeatable.",
+    )
+    parser.add_argument(
+        "--members",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help=(
+            "Only extract the DEC/FPS4 members matching the file name glob. "
+            "Nested containers are still extracted. Repeatable."
+        ),
+    )
+    parser.add_argument(
+        "--types",
+        action="append",
+        default=[],
+        metavar="EXT",
+        help="Only extract the DEC/FPS4 members of this detected type (e.g. 'SPM'). Repeatable.",
+    )
+    parser.add_argument(
+        "--min-size",
+        type=int,
+        default=0,
+        metavar="BYTES",
+        help="Only extract the DEC/FPS4 members of at least this size",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        metavar="BYTES",
+        help="Only extract the DEC/FPS4 members of at most this size",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Redo every stage even if the manifest reports it as unchanged",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="JSONL",
+        help="Record per-stage timings and throughput as JSON lines and print a summary",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="JSON",
+        help="Write a Chrome Trace Event file of the run (open with Perfetto or chrome://tracing)",
+    )
+    parser.add_argument(
+        "--memory",
+        metavar="JSONL",
+        help=(
+            "Record the tracemalloc peak and top retained allocation sites per stage and input file "
+            "as JSON lines and print a report. Slows the run down."
+        ),
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Enable debug logging",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    level = logging.DEBUG if args.verbose else logging.INFO
+    set_logging(level)
+    if args.list:
+        return print_listings(args.game_path, args.recursive, args.max_depth)
+
+    options = PipelineOptions(
+        include=tuple(args.include),
+        exclude=tuple(args.exclude),
+        force=args.force,
+        mesh_workers=args.mesh_workers,
+        mesh_cache_path=args.mesh_cache or "",
+        recursive=args.recursive,
+        max_depth=args.max_depth,
+        member_filter=MemberFilter(
+            include=tuple(args.members),
+            exclude=tuple(args.exclude),
+            types=tuple(args.types),
+            min_size=args.min_size,
+            max_size=args.max_size,
+            packages=tuple(args.packages),
+        ),
+    )
+    jobs = [job for job in discover_svo_jobs(args.game_path) if is_wanted(job, options)]
+    if not jobs:
+        logger.error(f"No SVO found in {args.game_path}")
+        return 1
+
+    def on_result(result: JobResult):
+        if result.error:
+            logger.error(f"[{result.job.stage}] {result.job.path} failed: {result.error}")
+        else:
+            logger.info(f"[{result.job.stage}] {result.job.path} done in {result.elapsed:.2f}s")
+
+    profile_path = args.profile
+    if args.trace and not profile_path:
+        profile_path = f"{args.trace}.jsonl"
+    if profile_path:
+        # Every worker appends to the same file, start from an empty one
+        open(profile_path, "w").close()
+    if args.memory:
+        open(args.memory, "w").close()
+
+    start = time.perf_counter()
+    results = run_jobs(
+        jobs,
+        partial(timed, partial(run_stage, options)),
+        workers=args.jobs,
+        initializer=partial(init_worker, level, profile_path, args.memory),
+        on_result=on_result,
+    )
+    wall_time = time.perf_counter() - start
+
+    print(format_summary(summarize(results), wall_time))
+    if profile_path:
+        instrument.disable()
+        records = instrument.load_records(profile_path)
+        if args.profile:
+            print(instrument.format_summary(instrument.summarize(records)))
+        if args.trace:
+            write_chrome_trace(records, args.trace)
+            logger.info(f"Trace written to {args.trace}")
+            if not args.profile:
+                os.remove(profile_path)
+    if args.memory:
+        memory.disable()
+        print(memory.format_summary(memory.load_records(args.memory)))
+    return 1 if any(result.error for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Pytest configuration, its directory is added to sys.path for the tests."""
@@ -1,4 +1,5 @@
 """Vesperia Tools Path Constants."""
 CONFIG_JSON = "config.json"
+MESH_CACHE_DIR = "mesh_cache"
 VESPERIA_STEAM_PATH = ""
 VESPERIA_EXTRACT_PATH = ""
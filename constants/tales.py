@@ -118,3 +118,6 @@ TYPE_CODE = 0x00010000
 
 # Textures
 DDS_HEADER = b'\x44\x44\x53\x20'
+
+# Containers
+FPS4_MAX_DEPTH = 8  # Nesting levels extracted by the recursive FPS4 extraction
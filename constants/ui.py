@@ -1,2 +1,8 @@
 DOUBLE_LINEBREAKS = "\n\n"
 GITHUB_REPO_URL = "https://github.com/hueyyeng/VesperiaTools"
+
+# Output log
+LOG_BUFFER_SIZE = 10000  # Pending writes kept before dropping the oldest
+LOG_FLUSH_INTERVAL = 100  # Milliseconds between flushes to the log widget
+LOG_MAX_BLOCK_COUNT = 5000  # Lines kept in the log widget
+LOG_PROGRESS_PATTERN = r"Progress completion: "
@@ -0,0 +1,2 @@
+"""Vesperia Tools Version Constants."""
+VERSION = "0.1.2"
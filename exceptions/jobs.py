@@ -0,0 +1,6 @@
+"""Vesperia Tools Job Exceptions."""
+
+
+class JobCancelledException(Exception):
+    def __init__(self, job_name):
+        Exception.__init__(self, f"Job cancelled: {job_name}")
@@ -7,7 +7,7 @@ from PySide2.QtCore import *
 from PySide2.QtGui import *
 from PySide2.QtWidgets import *
 
-from constants.path import CONFIG_JSON
+from constants.path import CONFIG_JSON, MESH_CACHE_DIR
 from constants.ui import DOUBLE_LINEBREAKS, GITHUB_REPO_URL
 from parsers.parser import (
     parse_dat,
@@ -33,7 +33,7 @@ from utils.helpers import (
     set_txm_txm_path,
 )
 from utils.log import OutLog
-from viewer.obj_viewer import show_viewer
+from utils.workers import JobQueue
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -42,6 +42,7 @@ logger.setLevel(logging.DEBUG)
 class MainWindow(QWidget):
     def __init__(self, *args, **kwargs):
         super(MainWindow, self).__init__(*args, **kwargs)
+        self.mesh_cache = None
         self.build_ui()
         self.build_ui_txm_txv_path()
         self.build_ui_extract_textures()
@@ -59,6 +60,7 @@ class MainWindow(QWidget):
         self.build_ui_export_mtr()
         self.build_ui_obj_path()
         self.build_ui_obj_viewer()
+        self.build_ui_jobs()
         self.build_ui_log()
         self.build_ui_repo_url()
         self.populate_lineedit_path()
@@ -235,7 +237,17 @@ class MainWindow(QWidget):
         self.export_spm_spv_layout = QHBoxLayout()
         self.export_spm_spv_btn = QPushButton(" Export SPM/SPV as Wavefront OBJ ")
         self.export_spm_spv_btn.clicked.connect(self.run_export_spm_spv)
+        self.view_spm_spv_btn = QPushButton(" View SPM/SPV ")
+        self.view_spm_spv_btn.clicked.connect(self.run_spm_spv_viewer)
+        self.view_spm_spv_full_detail_checkbox = QCheckBox("Full detail")
+        self.view_spm_spv_full_detail_checkbox.setToolTip(
+            f"View every triangle instead of the decimated LOD."
+            f"{DOUBLE_LINEBREAKS}"
+            f"Large BG maps can be very slow to view in full detail."
+        )
         self.export_spm_spv_layout.addStretch(0)
+        self.export_spm_spv_layout.addWidget(self.view_spm_spv_full_detail_checkbox)
+        self.export_spm_spv_layout.addWidget(self.view_spm_spv_btn)
         self.export_spm_spv_layout.addWidget(self.export_spm_spv_btn)
         self.main_layout.addLayout(self.export_spm_spv_layout)
 
@@ -293,6 +305,26 @@ class MainWindow(QWidget):
         self.obj_viewer_layout.addWidget(self.obj_viewer_btn)
         self.main_layout.addLayout(self.obj_viewer_layout)
 
+    def build_ui_jobs(self):
+        self.job_queue = JobQueue(parent=self)
+        self.job_queue.job_started.connect(self.on_job_started)
+        self.job_queue.job_progress.connect(self.on_job_progress)
+        self.job_queue.jobs_changed.connect(self.on_jobs_changed)
+        self.job_names = {}
+
+        self.jobs_layout = QHBoxLayout()
+        self.jobs_label = QLabel("Jobs: 0")
+        self.jobs_layout.addWidget(self.jobs_label)
+        self.jobs_progress_bar = QProgressBar()
+        self.jobs_progress_bar.setRange(0, 1000)
+        self.jobs_progress_bar.setValue(0)
+        self.jobs_layout.addWidget(self.jobs_progress_bar)
+        self.jobs_cancel_btn = QPushButton("Cancel All")
+        self.jobs_cancel_btn.setEnabled(False)
+        self.jobs_cancel_btn.clicked.connect(self.job_queue.cancel_all)
+        self.jobs_layout.addWidget(self.jobs_cancel_btn)
+        self.main_layout.addLayout(self.jobs_layout)
+
     def build_ui_log(self):
         self.log_label = QLabel("Output log:")
         self.main_layout.addWidget(self.log_label)
@@ -358,6 +390,24 @@ class MainWindow(QWidget):
         if folder_path:
             lineedit.setText(os.path.normpath(folder_path))
 
+    def on_job_started(self, job_id: int, name: str):
+        self.job_names[job_id] = name
+        self.jobs_progress_bar.setFormat(f"{name}: %p%")
+        self.jobs_progress_bar.setValue(0)
+
+    def on_job_progress(self, job_id: int, processed: int, total: int):
+        name = self.job_names.get(job_id, "")
+        self.jobs_progress_bar.setFormat(f"{name}: %p%")
+        self.jobs_progress_bar.setValue(processed * 1000 // total if total else 0)
+
+    def on_jobs_changed(self, jobs_total: int):
+        self.jobs_label.setText(f"Jobs: {jobs_total}")
+        self.jobs_cancel_btn.setEnabled(jobs_total > 0)
+        if jobs_total == 0:
+            self.job_names.clear()
+            self.jobs_progress_bar.setFormat("%p%")
+            self.jobs_progress_bar.setValue(0)
+
     def run_extract_textures(self):
         txm_txv_path = self.txm_txv_path_lineedit.text()
         if not txm_txv_path:
@@ -369,7 +419,12 @@ class MainWindow(QWidget):
             return
         self.update_config_json()
         output_path, _ = os.path.split(txm_txv_path)
-        export_dds_textures(txm_txv_path, output_path)
+        self.job_queue.submit(
+            f"Extract textures {os.path.basename(txm_txv_path)}",
+            export_dds_textures,
+            txm_txv_path,
+            output_path,
+        )
 
     def run_unpack_dat(self):
         if not self.dat_path_lineedit.text():
@@ -380,8 +435,11 @@ class MainWindow(QWidget):
             )
             return
         self.update_config_json()
-        parse_dat(
-            self.dat_path_lineedit.text(),
+        dat_path = self.dat_path_lineedit.text()
+        self.job_queue.submit(
+            f"Unpack DAT {os.path.basename(dat_path)}",
+            parse_dat,
+            dat_path,
         )
 
     def run_unpack_dec(self):
@@ -393,8 +451,11 @@ class MainWindow(QWidget):
             )
             return
         self.update_config_json()
-        parse_dec(
-            self.dec_path_lineedit.text(),
+        dec_path = self.dec_path_lineedit.text()
+        self.job_queue.submit(
+            f"Unpack DEC {os.path.basename(dec_path)}",
+            parse_dec,
+            dec_path,
         )
 
     def run_unpack_datdecext(self):
@@ -406,8 +467,11 @@ class MainWindow(QWidget):
             )
             return
         self.update_config_json()
-        parse_dec_ext(
-            self.datdecext_lineedit.text(),
+        datdecext_path = self.datdecext_lineedit.text()
+        self.job_queue.submit(
+            f"Unpack DAT.dec.ext {os.path.basename(datdecext_path)}",
+            parse_dec_ext,
+            datdecext_path,
         )
 
     def run_extract_svo(self):
@@ -419,7 +483,12 @@ class MainWindow(QWidget):
             )
             return
         self.update_config_json()
-        parse_svo(self.svo_path_lineedit.text())
+        svo_path = self.svo_path_lineedit.text()
+        self.job_queue.submit(
+            f"Extract SVO {os.path.basename(svo_path)}",
+            parse_svo,
+            svo_path,
+        )
 
     def run_export_spm_spv(self):
         spm_spv_path = self.spm_spv_path_lineedit.text()
@@ -432,7 +501,29 @@ class MainWindow(QWidget):
             return
         self.update_config_json()
         output_path, _ = os.path.split(spm_spv_path)
-        export_wavefront_obj(spm_spv_path, output_path)
+        self.job_queue.submit(
+            f"Export OBJ {os.path.basename(spm_spv_path)}",
+            export_wavefront_obj,
+            spm_spv_path,
+            output_path,
+            cache=self.get_mesh_cache(),
+        )
+
+    def run_spm_spv_viewer(self):
+        spm_spv_path = self.spm_spv_path_lineedit.text()
+        if not spm_spv_path:
+            QMessageBox.warning(
+                self,
+                "Warning",
+                "Please specify SPM/SPV path before viewing!",
+            )
+            return
+        self.update_config_json()
+        # Imported on first use as pyrender, trimesh and OpenGL are slow to import
+        from utils.lod import LOD_COARSE, LOD_FULL
+        from viewer.obj_viewer import show_spm_viewer
+        lod = LOD_FULL if self.view_spm_spv_full_detail_checkbox.isChecked() else LOD_COARSE
+        show_spm_viewer(spm_spv_path, lod=lod, cache=self.get_mesh_cache())
 
     def run_export_mtr(self):
         mtr_path = self.mtr_path_lineedit.text()
@@ -445,7 +536,12 @@ class MainWindow(QWidget):
             return
         self.update_config_json()
         output_path, _ = os.path.split(mtr_path)
-        export_wavefront_mtl(mtr_path, output_path)
+        self.job_queue.submit(
+            f"Export MTL {os.path.basename(mtr_path)}",
+            export_wavefront_mtl,
+            mtr_path,
+            output_path,
+        )
 
     def run_obj_viewer(self):
         obj_path = self.obj_path_lineedit.text()
@@ -457,8 +553,18 @@ class MainWindow(QWidget):
             )
             return
         self.update_config_json()
+        # Imported on first use as pyrender, trimesh and OpenGL are slow to import
+        from viewer.obj_viewer import show_viewer
         show_viewer(obj_path)
 
+    def get_mesh_cache(self):
+        """Get the mesh cache shared by the SPM/SPV exports and viewer."""
+        if self.mesh_cache is None:
+            # Imported on first use as numpy is slow to import
+            from utils.mesh_cache import MeshCache
+            self.mesh_cache = MeshCache(MESH_CACHE_DIR)
+        return self.mesh_cache
+
     def update_config_json(self):
         set_txm_txm_path(self.txm_txv_path_lineedit.text())
         set_dat_path(self.dat_path_lineedit.text())
@@ -471,6 +577,8 @@ class MainWindow(QWidget):
 
     def closeEvent(self, event):
         self.update_config_json()
+        self.job_queue.cancel_all()
+        self.job_queue.wait_for_done()
 
 
 def main():
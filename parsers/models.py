@@ -1,11 +1,16 @@
 """Object models for data extraction."""
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, List
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 from typing_extensions import NotRequired, TypedDict
 
+from utils import instrument
+
+if TYPE_CHECKING:
+    import numpy as np
+
 
 @dataclass
 class Package:
@@ -13,6 +18,83 @@ class Package:
     offset: int = 0
 
 
+@dataclass
+class MeshRecord:
+    """Offsets and counts needed to decode a mesh record of an SPM."""
+    E: List[Tuple[int, int]]
+    indices_offset: int
+    tm: int
+    D: Tuple[int, ...]
+    vertex_counts: Tuple[int, ...]
+    uv_offset: int = 0
+
+
+@dataclass
+class FPS4Table:
+    """Columnar FPS4 entry table.
+
+    Offsets are relative to the start of the FPS4 container. Real sizes
+    are the sizes for tables without a real size column. Types are only
+    classified when the container data is available.
+
+    """
+    offsets: np.ndarray
+    sizes: np.ndarray
+    real_sizes: np.ndarray
+    names: List[Optional[str]] = field(default_factory=list)
+    types: List[Optional[str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+
+@dataclass
+class FPS4TreeReport:
+    """Members extracted per nesting level of an FPS4 tree.
+
+    Level 0 holds the members of the outermost container. Containers left
+    packed at the depth limit are counted in truncated.
+
+    """
+    items_per_level: List[int] = field(default_factory=list)
+    truncated: int = 0
+
+    def add(self, level: int, count: int = 1):
+        while len(self.items_per_level) <= level:
+            self.items_per_level.append(0)
+        self.items_per_level[level] += count
+
+
+@dataclass
+class ListingEntry:
+    """Member of a container, read without extracting it.
+
+    Offsets are relative to the start of the outermost listed container.
+    The type is None when unknown, or when its first bytes weren't read.
+
+    """
+    name: Optional[str]
+    offset: int
+    size: int
+    real_size: int
+    type: Optional[str] = None
+    depth: int = 0
+
+
+@dataclass
+class ContainerListing:
+    """SVO, DAT or DEC entries and the sizes of the container itself.
+
+    The real size is the decompressed size for TLZC containers.
+
+    """
+    name: str
+    fourcc: str
+    size: int
+    real_size: int
+    entries: List[ListingEntry] = field(default_factory=list)
+
+
 class Mesh:
     """Mesh model."""
     # TODO: Cleanup Blender specific attributes
@@ -64,6 +146,7 @@ class Mesh:
 
         self.RAW = 0
 
+    @instrument.instrumented("create_face")
     def create_face(self, matID=0):
         """Create Face
 
@@ -105,6 +188,58 @@ class Mesh:
                     self.matIDList.append(matID)
                 clockwise = not clockwise
 
+        instrument.add(items=len(self.triangleList))
+
+
+# Mesh attributes decoded on first access by LazyMesh
+MESH_GEOMETRY_ATTRIBUTES = (
+    "vertPosList",
+    "vertNormList",
+    "indiceList",
+    "skinIndiceList",
+    "skinWeightList",
+)
+MESH_UV_ATTRIBUTES = (
+    "vertUVList",
+)
+
+
+class LazyMesh(Mesh):
+    """Mesh decoding its geometry and UVs on first access.
+
+    Created by parse_mesh(lazy=True) with the mesh tables only. The first
+    access of a geometry attribute calls geometry_loader, which decodes
+    every submesh of the mesh record. The first access of vertUVList calls
+    uv_loader. Decoded attributes are plain lists from then on.
+
+    """
+    def __init__(self):
+        super().__init__()
+        for attribute in MESH_GEOMETRY_ATTRIBUTES + MESH_UV_ATTRIBUTES:
+            delattr(self, attribute)
+        self.geometry_loader = None
+        self.uv_loader = None
+
+    def __getattr__(self, name):
+        # Only called for missing attributes, i.e. not decoded yet
+        if name in MESH_GEOMETRY_ATTRIBUTES:
+            loader = self.__dict__.get("geometry_loader")
+        elif name in MESH_UV_ATTRIBUTES:
+            loader = self.__dict__.get("uv_loader")
+        else:
+            raise AttributeError(name)
+        if loader is None:
+            raise AttributeError(name)
+        loader()
+        return self.__dict__[name]
+
+    @property
+    def is_loaded(self) -> bool:
+        return all(
+            attribute in self.__dict__
+            for attribute in MESH_GEOMETRY_ATTRIBUTES + MESH_UV_ATTRIBUTES
+        )
+
 
 class TMaterial(TypedDict):
     mtl: str
@@ -1,30 +1,79 @@
 """Parser for Vesperia data objects."""
 import logging
 import math  # Handle NaN value
+import mmap
 import os
 import re
 import struct
 import zlib
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, Iterable, List, Tuple, Type, Union
 
-from constants.tales import DDS_HEADER, TYPE_2_EXT_PC
+from constants.tales import DDS_HEADER, FPS4_MAX_DEPTH
 from exceptions.files import InvalidFourCCException
 from parsers.models import (
+    MESH_GEOMETRY_ATTRIBUTES,
+    MESH_UV_ATTRIBUTES,
+    ContainerListing,
+    FPS4Table,
+    FPS4TreeReport,
+    LazyMesh,
+    ListingEntry,
     Mesh,
+    MeshRecord,
     Node,
     Package,
     TImage,
     TNodeData
 )
-from utils.binaries import BinaryReader
+from utils import instrument
+from utils.binaries import BinaryReader, BinaryUnpacker
+from utils.filters import MemberFilter
 from utils.files import (
     check_fourcc,
     rename_unknown_files_ext
 )
+from utils.magic import (
+    MAGIC_FPS4,
+    MAGIC_TLZC,
+    find_dds_headers,
+    get_extension,
+    get_extensions,
+    get_magic,
+    get_member_extents,
+    get_member_type,
+)
+from utils.manifest import Manifest
 
 logger = logging.getLogger(__name__)
 
+DAT_CHUNK_SIZE = 1 << 20
+
+# D[0] of skinned, unskinned and BG meshes
+MESH_TYPES = (256, 258, 1024, 1026, 1027, 1792)
+
+# Five floats per SPV vertex
+SPV_UV_SIZE = 5 * 4
+
+# SVO entries: offset, size, real size and a 32 bytes name
+SVO_ENTRY_SIZE = 3 * 4 + 32
+
+# TLZC header: FourCC and five int32 before the zlib stream
+TLZC_HEADER_SIZE = 4 + 5 * 4
+
+# FourCC, entry count, table offset, data offset, entry size, flags and two int32
+FPS4_HEADER_SIZE = 4 + 3 * 4 + 2 * 2 + 2 * 4
+
+# Compressed bytes fed at once when only the head of a TLZC is needed
+LISTING_CHUNK_SIZE = 64 << 10
+
+# Members extracted instead of written by the recursive extraction
+CONTAINER_MAGICS = (MAGIC_FPS4, MAGIC_TLZC)
+
+# Called with (processed, total) bytes or members. May raise to abort the parser.
+ProgressCallback = Callable[[int, int], None]
+
 
 def debug_mesh(
         node: Node,
@@ -154,6 +203,46 @@ def get_vertex_data(
         mesh.skinWeightList.append([w4, w3, w2, w1])
 
 
+def read_mesh_uv(g: BinaryReader, mesh: Mesh, verbose=False):
+    """Read the UV coordinates of a submesh.
+
+    Parameters
+    ----------
+    g : BinaryReader
+        Reader at the submesh UVs in the SPV file
+    mesh : Mesh
+    verbose : bool
+        Display mesh's UV values. Default False.
+
+    """
+    unpack_error = False
+    if verbose:
+        logger.debug({
+            "Mesh UV:": mesh.name
+        })
+    for m in range(mesh.vertUVCount):
+        offset = g.tell()
+        try:
+            f = g.f(5)
+        except struct.error:
+            unpack_error = True
+            f = (0.0, 0.0, 0.0)
+        offset_diff = g.tell() - offset
+        u = 0.0 if math.isnan(f[1]) else f[1]
+        v = 0.0 if math.isnan(f[2]) else f[2]
+        if verbose:
+            logger.debug({
+                "UV": "%f, %f" % (u, v),
+                "offset": g.tell(),
+            })
+        mesh.vertUVList.append([u, 1.0 - v])  # Fix UV?
+        # mesh.vertUVList.append([u, v])  # Fix UV?
+    instrument.add(items=mesh.vertUVCount)
+    if unpack_error:
+        logger.warning("UV ERROR DURING UNPACKING. USING (0.0, 0.0) FOR AFFECTED UV")
+
+
+@instrument.instrumented("parse_uv")
 def parse_uv(
         file_path: str,
         node: Node,
@@ -185,38 +274,19 @@ def parse_uv(
     # Parse UV in SPV File
     for meshes in node.data["mesh_list"]:
         for mesh in meshes:
-            unpack_error = False
-            if verbose:
-                logger.debug({
-                    "Mesh UV:": mesh.name
-                })
-            for m in range(mesh.vertUVCount):
-                offset = g.tell()
-                try:
-                    f = g.f(5)
-                except struct.error:
-                    unpack_error = True
-                    f = (0.0, 0.0, 0.0)
-                offset_diff = g.tell() - offset
-                u = 0.0 if math.isnan(f[1]) else f[1]
-                v = 0.0 if math.isnan(f[2]) else f[2]
-                if verbose:
-                    logger.debug({
-                        "UV": "%f, %f" % (u, v),
-                        "offset": g.tell(),
-                    })
-                mesh.vertUVList.append([u, 1.0 - v])  # Fix UV?
-                # mesh.vertUVList.append([u, v])  # Fix UV?
-            if unpack_error:
-                logger.warning("UV ERROR DURING UNPACKING. USING (0.0, 0.0) FOR AFFECTED UV")
+            read_mesh_uv(g, mesh, verbose)
 
+    instrument.add(bytes_in=g.tell())
     g.close()
 
 
+@instrument.instrumented("parse_mesh")
 def parse_mesh(
         file_path: str,
         node: Node,
         verbose=False,
+        lazy=False,
+        workers=1,
 ):
     """Parse mesh data from SPM (and SPV) package.
 
@@ -229,6 +299,14 @@ def parse_mesh(
     node : Node
     verbose : bool
         Display verbose output of mesh parsing. Default False
+    lazy : bool
+        Only parse the mesh tables (names, submesh and UV counts, hashes).
+        Meshes are LazyMesh decoding their geometry and UVs on first
+        access. Default False.
+    workers : int
+        Decode the meshes in this many processes once the mesh tables are
+        read. Only worth it for SPMs with many large meshes (e.g. BG maps).
+        Default 1.
 
     Notes
     -----
@@ -238,6 +316,9 @@ def parse_mesh(
     prefix_file_path, ext = os.path.splitext(file_path)
     if ext.lower() == ".spv":
         file_path = prefix_file_path + ".SPM"
+    instrument.annotate(file=os.path.basename(file_path))
+    decode_workers = workers if not lazy else 1
+    lazy = lazy or decode_workers > 1
     binary_file = open(file_path, "rb")
     node.name = os.path.splitext(os.path.basename(file_path))[0]
     g = BinaryReader(binary_file)
@@ -274,6 +355,18 @@ def parse_mesh(
         })
     node.data["mesh_list"] = []
 
+    # Mesh records are consecutive, read them first to get every name at once
+    d_offset = g.tell()
+    D_list = [g.i(15) for _ in range(meshes)]
+    names = g.string_table(
+        d_offset + (m + 1) * 15 * 4 - 2 * 4 + D[13]
+        for m, D in enumerate(D_list)
+    )
+    g.seek(d_offset)
+
+    spv_file = os.path.splitext(file_path)[0] + ".SPV"
+    uv_offset = 0
+    records: List[MeshRecord] = []
     for _mesh_idx, m in enumerate(range(meshes)):
         logger.debug("%s Looping Mesh %s %s>" % (('=' * 64), (_mesh_idx), ('=' * 64)))
         D = g.i(15)
@@ -283,8 +376,7 @@ def parse_mesh(
         })
         tm = g.tell()
         name_offset = tm - 2 * 4 + D[13]
-        g.seek(name_offset)
-        name = g.find(b"\x00")
+        name = names.get(name_offset)
         logger.debug({
             "name": name,
             "name_offset": name_offset,
@@ -296,147 +388,251 @@ def parse_mesh(
 
         mesh_list = []
         node.data["mesh_list"].append(mesh_list)
+        E = read_submesh_headers(g, mesh_list, tm, D, name, LazyMesh if lazy else Mesh)
+
+        if lazy:
+            record = MeshRecord(E, g.tell(), tm, D, C1[m], uv_offset)
+            records.append(record)
+            geometry_loader = partial(load_mesh_geometry, file_path, mesh_list, record, n)
+            for mesh in mesh_list:
+                mesh.geometry_loader = geometry_loader
+                mesh.uv_loader = partial(load_mesh_uv, spv_file, mesh, uv_offset)
+                uv_offset += mesh.vertUVCount * SPV_UV_SIZE
+            if D[0] not in MESH_TYPES:
+                # Decoding it logs the invalid mesh object, stop as the full parsing does
+                break
+            g.seek(tm)
+            continue
+
+        if not read_mesh_geometry(g, mesh_list, E, tm, D, C1[m], n, verbose):
+            break
 
-        offset_2 = tm - 9 * 4 + D[6]
-        logger.debug("offset_2: %s - 9 * 4 + %s = %s" % (tm, D[6], offset_2))
-        g.seek(offset_2)
+        g.seek(tm)
 
-        unknown = g.i(1)
-        unkCount = unknown[0]
-        logger.debug({
-            "unknown": unknown,
-            "unkCount": unkCount,
-        })
+    if lazy:
+        g.seek(d_offset + meshes * 15 * 4)
+    F = g.i(C[0])
+    node.data["hash_list"] = F
+    instrument.add(bytes_in=g.tell(), items=meshes)
+    g.close()
+
+    if decode_workers > 1:
+        decode_meshes(file_path, spv_file, node, records, n, decode_workers)
+        return
+
+    # Handle SPV file
+    if lazy:
+        return
+    logger.debug({
+        "spv_file": spv_file,
+    })
+    parse_uv(spv_file, node, verbose=verbose)
+
+
+def read_submesh_headers(
+        g: BinaryReader,
+        mesh_list: List[Mesh],
+        tm: int,
+        D: Tuple[int, ...],
+        name: str,
+        mesh_class: Type[Mesh] = Mesh,
+) -> List[Tuple[int, int]]:
+    """Read the submesh table of a mesh record.
+
+    Creates a mesh per submesh with its name, diffuse ID and UV count and
+    leaves the reader at the index lists.
+
+    Parameters
+    ----------
+    g : BinaryReader
+    mesh_list : list of Mesh
+        Submeshes of the record, appended to.
+    tm : int
+        Offset following the D record
+    D : tuple of int
+        D record of the mesh
+    name : str
+        Mesh name
+    mesh_class : type
+        Mesh or LazyMesh. Default Mesh.
+
+    Returns
+    -------
+    list of tuple of int
+        UV and index count per submesh
+
+    """
+    offset_2 = tm - 9 * 4 + D[6]
+    logger.debug("offset_2: %s - 9 * 4 + %s = %s" % (tm, D[6], offset_2))
+    g.seek(offset_2)
+
+    unknown = g.i(1)
+    unkCount = unknown[0]
+    logger.debug({
+        "unknown": unknown,
+        "unkCount": unkCount,
+    })
+    logger.debug({
+        "indice_start_offset": g.tell(),
+        "D[11]": D[11],
+    })
+    E = []
+    for i in range(unkCount):
+        mesh = mesh_class()
+        mesh.name = name
+        mesh.diffuseID = D[4] - 1
+        E1 = g.H(2)
         logger.debug({
-            "indice_start_offset": g.tell(),
-            "D[11]": D[11],
+            "E1": E1,
         })
-        E = []
-
-        if unkCount >= 1:
-            # Original approach. Works great for CH mesh.
-            logger.debug("FOUND %s SUBMESHES - Original Approach" % unkCount)
-            for i in range(unkCount):
-                mesh = Mesh()
-                mesh.name = name
-                mesh.diffuseID = D[4] - 1
-                E1 = g.H(2)
-                logger.debug({
-                    "E1": E1,
-                })
-                mesh.vertUVCount = E1[0]
-                logger.debug("mesh.vertUVCount: %s" % mesh.vertUVCount)
-                mesh_list.append(mesh)
-                E.append(E1)
+        mesh.vertUVCount = E1[0]
+        logger.debug("mesh.vertUVCount: %s" % mesh.vertUVCount)
+        mesh_list.append(mesh)
+        E.append(E1)
+    return E
+
 
-            for i in range(unkCount):
-                face_idx = E[i][1]
-                indiceList = g.H(face_idx)
-                logger.debug("indiceList size: %s face_idx: %s" % (len(indiceList), face_idx))
-                mesh = mesh_list[i]
-                mesh.indiceList = indiceList
+def read_mesh_geometry(
+        g: BinaryReader,
+        mesh_list: List[Mesh],
+        E: List[Tuple[int, int]],
+        tm: int,
+        D: Tuple[int, ...],
+        vertex_counts: Tuple[int, ...],
+        n: int,
+        verbose=False,
+) -> bool:
+    """Read index lists, vertices, normals and skin weights of a mesh record.
 
-            logger.debug("mesh.indiceList: %s" % len(mesh.indiceList))
+    The reader must be at the index lists following the submesh table.
 
-        else:
-            # Blender combined approach. Faces still incorrectly parsed.
-            logger.debug("FOUND %s SUBMESHES - Blender Combined Approach" % unkCount)
-            for i in range(unkCount):
-                mesh = Mesh()
-                mesh.name = name
-                mesh.diffuseID = D[4] - 1
-                mesh_list.append(mesh)
-                E1 = g.H(2)
+    Parameters
+    ----------
+    g : BinaryReader
+    mesh_list : list of Mesh
+        Submeshes of the record
+    E : list of tuple of int
+        UV and index count per submesh
+    tm : int
+        Offset following the D record
+    D : tuple of int
+        D record of the mesh
+    vertex_counts : tuple of int
+        C1 record of the mesh
+    n : int
+    verbose : bool
+
+    Returns
+    -------
+    bool
+        False for an invalid mesh object, which ends the mesh parsing.
+
+    """
+    unkCount = len(E)
+    if unkCount >= 1:
+        # Original approach. Works great for CH mesh.
+        logger.debug("FOUND %s SUBMESHES - Original Approach" % unkCount)
+        for i in range(unkCount):
+            face_idx = E[i][1]
+            indiceList = g.H(face_idx)
+            logger.debug("indiceList size: %s face_idx: %s" % (len(indiceList), face_idx))
+            mesh = mesh_list[i]
+            mesh.indiceList = indiceList
+
+        logger.debug("mesh.indiceList: %s" % len(mesh.indiceList))
+
+    mesh_offset = tm - 8 * 4 + D[7]
+    logger.debug("mesh_offset: %s - 8 * 4 + %s = %s" % (tm, D[7], mesh_offset))
+    g.seek(mesh_offset)
+    logger.debug("C1: %s" % (vertex_counts,))
+    if D[0] in (1792,):
+        logger.debug("VERDICT: Unskinned mesh? %s" % mesh_list[0].name)
+        mesh = mesh_list[0]
+        for i in range(vertex_counts[4]):
+            mesh.vertPosList.append(g.f(3))
+
+    elif D[0] in (1024, 1026, 1027):
+        logger.debug("VERDICT: BG mesh? %s" % mesh_list[0].name)
+        mesh = mesh_list[0]
+        vertices = vertex_counts[4]
+        if vertices == 0:
+            # NOTE: Don't bother trying other index values besides D[10]
+            logger.debug("No vertices found! Probably BG or static mesh. Using D[10]: %s" % D[10])
+            vertices = D[10]
+
+        total_v = []
+        total_vn = []
+        total_indices = mesh.indiceList
+        print("total_indices:", len(total_indices))
+
+        for i in range(vertices):
+            # Vertex Position
+            v_offset = g.tell()
+            vertex = g.f(3)
+            if verbose:
                 logger.debug({
-                    "E1": E1,
+                    "v": vertex,
+                    "v_offset": v_offset,
                 })
-                mesh.vertUVCount += E1[0]
-                E.append(E1)
-                logger.debug("mesh.vertUVCount: %s" % mesh.vertUVCount)
-            for i in range(unkCount):
-                indiceList = g.H(E[i][1])
-                mesh = mesh_list[i]
-                mesh.indiceList = indiceList
-
-            logger.debug("mesh.indiceList size: %s" % len(mesh.indiceList))
-
-        mesh_offset = tm - 8 * 4 + D[7]
-        logger.debug("mesh_offset: %s - 8 * 4 + %s = %s" % (tm, D[7], mesh_offset))
-        g.seek(mesh_offset)
-        logger.debug("C1[%s]: %s" % (m, C1[m]))
-        if D[0] in (1792,):
-            logger.debug("VERDICT: Unskinned mesh? %s" % name)
-            mesh = mesh_list[0]
-            for i in range(C1[m][4]):
-                mesh.vertPosList.append(g.f(3))
-
-        elif D[0] in (1024, 1026, 1027):
-            logger.debug("VERDICT: BG mesh? %s" % name)
-            mesh = mesh_list[0]
-            vertices = C1[m][4]
-            if vertices == 0:
-                # NOTE: Don't bother trying other index values besides D[10]
-                logger.debug("No vertices found! Probably BG or static mesh. Using D[10]: %s" % D[10])
-                vertices = D[10]
-
-            total_v = []
-            total_vn = []
-            total_indices = mesh.indiceList
-            print("total_indices:", len(total_indices))
-
-            for i in range(vertices):
-                # Vertex Position
-                v_offset = g.tell()
-                vertex = g.f(3)
-                if verbose:
-                    logger.debug({
-                        "v": vertex,
-                        "v_offset": v_offset,
-                    })
-                total_v.append(vertex)
-                mesh.vertPosList.append(vertex)
-
-                # Vertex Normal
-                vn_offset = v_offset
-                if not D[0] in (1024, 1026):
-                    vn_offset = v_offset + 888
-                g.seek(vn_offset)
-                vertex_normal = g.f(3)
-                if verbose:
-                    logger.debug({
-                        "vn": vertex_normal,
-                        "vn_offset": vn_offset,
-                    })
-                total_vn.append(vertex_normal)
-                mesh.vertNormList.append(vertex_normal)
-                g.seek(v_offset + 12)
-
-            start_vertUVCount = 0
-            end_vertUVCount = 0
-            start_indiceList = 0
-            end_indiceList = 0
-
-            for idx, mesh in enumerate(mesh_list):
-                end_vertUVCount += mesh.vertUVCount
-                mesh.vertPosList = total_v[start_vertUVCount:end_vertUVCount]
-                mesh.vertNormList = total_vn[start_vertUVCount:end_vertUVCount]
-                start_vertUVCount += mesh.vertUVCount
-
+            total_v.append(vertex)
+            mesh.vertPosList.append(vertex)
+
+            # Vertex Normal
+            vn_offset = v_offset
+            if not D[0] in (1024, 1026):
+                vn_offset = v_offset + 888
+            g.seek(vn_offset)
+            vertex_normal = g.f(3)
+            if verbose:
                 logger.debug({
-                    "submesh_name": mesh.name,
-                    "v": len(mesh.vertPosList),
-                    "vn": len(mesh.vertNormList),
+                    "vn": vertex_normal,
+                    "vn_offset": vn_offset,
                 })
+            total_vn.append(vertex_normal)
+            mesh.vertNormList.append(vertex_normal)
+            g.seek(v_offset + 12)
+
+        start_vertUVCount = 0
+        end_vertUVCount = 0
 
-        elif D[0] in (258, 256):
-            logger.debug("VERDICT: Skinned mesh? %s" % name)
-            mesh = mesh_list[0]
+        for idx, mesh in enumerate(mesh_list):
+            end_vertUVCount += mesh.vertUVCount
+            mesh.vertPosList = total_v[start_vertUVCount:end_vertUVCount]
+            mesh.vertNormList = total_vn[start_vertUVCount:end_vertUVCount]
+            start_vertUVCount += mesh.vertUVCount
 
-            g.seek(mesh_offset)
-            v1 = C1[m][4]
-            v2 = C1[m][5]
-            v3 = C1[m][6]
-            v4 = C1[m][7]
+            logger.debug({
+                "submesh_name": mesh.name,
+                "v": len(mesh.vertPosList),
+                "vn": len(mesh.vertNormList),
+            })
+
+    elif D[0] in (258, 256):
+        logger.debug("VERDICT: Skinned mesh? %s" % mesh_list[0].name)
+        mesh = mesh_list[0]
+
+        g.seek(mesh_offset)
+        v1 = vertex_counts[4]
+        v2 = vertex_counts[5]
+        v3 = vertex_counts[6]
+        v4 = vertex_counts[7]
+        logger.debug({
+            "v1": v1,
+            "v2": v2,
+            "v3": v3,
+            "v4": v4,
+        })
+        get_vertex_data(mesh, g, v1, v2, v3, v4, n, verbose)
+        mesh_range = unkCount - 1
+        logger.debug("mesh_range: %s" % mesh_range)
+        for x in range(mesh_range):
+            logger.debug("Loop Submesh %s" % x)
+            mesh = mesh_list[1 + x]
+            E = g.i(4)
+            v1 = E[0]
+            v2 = E[1]
+            v3 = E[2]
+            v4 = E[3]
             logger.debug({
                 "v1": v1,
                 "v2": v2,
@@ -444,44 +640,160 @@ def parse_mesh(
                 "v4": v4,
             })
             get_vertex_data(mesh, g, v1, v2, v3, v4, n, verbose)
-            mesh_range = unkCount - 1
-            logger.debug("mesh_range: %s" % mesh_range)
-            for x in range(mesh_range):
-                logger.debug("Loop Submesh %s" % x)
-                mesh = mesh_list[1 + x]
-                E = g.i(4)
-                v1 = E[0]
-                v2 = E[1]
-                v3 = E[2]
-                v4 = E[3]
-                logger.debug({
-                    "v1": v1,
-                    "v2": v2,
-                    "v3": v3,
-                    "v4": v4,
-                })
-                get_vertex_data(mesh, g, v1, v2, v3, v4, n, verbose)
 
+    else:
+        logger.warning({
+            "msg": "Invalid mesh object.",
+            "D[1]": D[1],
+            "g.f(12)": g.f(12),
+        })
+        return False
+
+    return True
+
+
+def load_mesh_geometry(
+        file_path: str,
+        mesh_list: List[Mesh],
+        record: MeshRecord,
+        n: int,
+):
+    """Decode the geometry of a lazily parsed mesh record on first access.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to SPM file
+    mesh_list : list of LazyMesh
+        Submeshes of the record
+    record : MeshRecord
+    n : int
+
+    """
+    for mesh in mesh_list:
+        for attribute in MESH_GEOMETRY_ATTRIBUTES:
+            setattr(mesh, attribute, [])
+        mesh.geometry_loader = None
+    with instrument.span("load_mesh_geometry", file=os.path.basename(file_path)):
+        with open(file_path, "rb") as binary_file:
+            g = BinaryReader(binary_file)
+            g.seek(record.indices_offset)
+            read_mesh_geometry(g, mesh_list, record.E, record.tm, record.D, record.vertex_counts, n)
+            instrument.add(items=len(mesh_list))
+
+
+def decode_mesh_record(
+        spm_path: str,
+        spv_path: str,
+        record: MeshRecord,
+        n: int = 0,
+) -> List[Dict[str, list]]:
+    """Decode the geometry and UVs of a mesh record in a worker process.
+
+    Parameters
+    ----------
+    spm_path : str
+    spv_path : str
+    record : MeshRecord
+    n : int
+
+    Returns
+    -------
+    list of dict
+        Decoded attributes per submesh
+
+    """
+    mesh_list = []
+    for E1 in record.E:
+        mesh = Mesh()
+        mesh.vertUVCount = E1[0]
+        mesh_list.append(mesh)
+    if not mesh_list:
+        return []
+
+    with open(spm_path, "rb") as binary_file:
+        g = BinaryReader(binary_file)
+        g.seek(record.indices_offset)
+        read_mesh_geometry(g, mesh_list, record.E, record.tm, record.D, record.vertex_counts, n)
+    # UVs of the submeshes of a record are consecutive
+    with open(spv_path, "rb") as binary_file:
+        g = BinaryReader(binary_file)
+        g.seek(record.uv_offset)
+        for mesh in mesh_list:
+            read_mesh_uv(g, mesh)
+    return [
+        {
+            attribute: getattr(mesh, attribute)
+            for attribute in MESH_GEOMETRY_ATTRIBUTES + MESH_UV_ATTRIBUTES
+        }
+        for mesh in mesh_list
+    ]
+
+
+def decode_meshes(
+        spm_path: str,
+        spv_path: str,
+        node: Node,
+        records: List[MeshRecord],
+        n: int,
+        workers: int,
+):
+    """Decode the mesh records of a lazily parsed node in a process pool.
+
+    The decoded attributes are assigned to the meshes of
+    node.data["mesh_list"] in their original order.
+
+    Parameters
+    ----------
+    spm_path : str
+    spv_path : str
+    node : Node
+        Node parsed with lazy=True
+    records : list of MeshRecord
+        Mesh records, in the order of node.data["mesh_list"]
+    n : int
+    workers : int
+        Number of worker processes
+
+    """
+    decode = partial(decode_mesh_record, spm_path, spv_path, n=n)
+    with instrument.span("decode_meshes", file=os.path.basename(spm_path), workers=workers):
+        if workers > 1 and len(records) > 1:
+            # Imported here as only parallel decoding needs it
+            from concurrent.futures import ProcessPoolExecutor
+
+            chunksize = max(1, len(records) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=min(workers, len(records))) as executor:
+                results = list(executor.map(decode, records, chunksize=chunksize))
         else:
-            logger.warning({
-                "msg": "Invalid mesh object.",
-                "D[1]": D[1],
-                "g.f(12)": g.f(12),
-            })
-            break
+            results = [decode(record) for record in records]
 
-        g.seek(tm)
+        for mesh_list, decoded_list in zip(node.data["mesh_list"], results):
+            for mesh, decoded in zip(mesh_list, decoded_list):
+                mesh.__dict__.update(decoded)
+                mesh.geometry_loader = None
+                mesh.uv_loader = None
+        instrument.add(items=len(records))
 
-    F = g.i(C[0])
-    node.data["hash_list"] = F
 
-    # Handle SPV file
-    spv_file = os.path.splitext(file_path)[0] + ".SPV"
-    logger.debug({
-        "spv_file": spv_file,
-    })
-    parse_uv(spv_file, node, verbose=verbose)
-    g.close()
+def load_mesh_uv(file_path: str, mesh: Mesh, offset: int):
+    """Decode the UVs of a lazily parsed submesh on first access.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to SPV file
+    mesh : LazyMesh
+    offset : int
+        Offset of the submesh UVs in the SPV
+
+    """
+    mesh.vertUVList = []
+    mesh.uv_loader = None
+    with open(file_path, "rb") as binary_file:
+        g = BinaryReader(binary_file)
+        g.seek(offset)
+        read_mesh_uv(g, mesh)
 
 
 def parse_material(
@@ -533,6 +845,17 @@ def parse_material(
         "lll": lll,
     })
 
+    # Material records are consecutive, read them first to get every name at once
+    materials_offset = g.tell()
+    C_list = [g.i(8) for _ in range(B[3])]
+    names = g.string_table(
+        materials_offset + m * 32 + 4 * i + C[i]
+        for m, C in enumerate(C_list)
+        for i in range(8)
+        if C[i] != 0
+    )
+    g.seek(materials_offset)
+
     # Loop through materials
     for m in range(B[3]):
         logger.debug("%s>" % ('=' * 200))
@@ -552,8 +875,7 @@ def parse_material(
             name = None
             if c != 0:
                 logger.debug("%s>" % ('=' * 32))
-                g.seek(tm + 4 * i + c)
-                name = g.find(b"\x00")
+                name = names.get(tm + 4 * i + c)
                 if name and 'MAT' in name:
                     logger.debug("Name found: %s" % name)
                     material_name = name
@@ -664,13 +986,21 @@ def parse_textures(
         "dds_size": dds_size,
     })
 
+    # Texture records are consecutive, read them first to get every name at once
+    textures_offset = g.tell()
+    B_list = [g.i(7) for _ in range(A[6])]
+    names = g.string_table(
+        textures_offset + (i + 1) * 7 * 4 - 4 + B[6]
+        for i, B in enumerate(B_list)
+    )
+    g.seek(textures_offset)
+
     image_list: List[TImage] = []
     for i, m in enumerate(range(A[6])):
         logger.debug("%s>" % ('=' * 200))
         B = g.i(7)
         tm = g.tell()
-        g.seek(tm - 4 + B[6])
-        name = g.find(b"\x00")
+        name = names.get(tm - 4 + B[6])
         current_total_offset = current_offset + A[4] + B[0]
         logger.debug({
             "current_offset": current_offset,
@@ -702,9 +1032,13 @@ def parse_textures(
     g.close()
 
 
+@instrument.instrumented("parse_svo")
 def parse_svo(
         svo_path: str,
         verbose=False,
+        force=False,
+        progress_callback: ProgressCallback = None,
+        member_filter: MemberFilter = None,
 ):
     """Parse SVO package
 
@@ -713,6 +1047,12 @@ def parse_svo(
     svo_path : str
         Path to SVO file (e.g. 'path/to/PACKAGE.SVO')
     verbose : bool
+    force : bool
+        Extract even if the manifest reports the SVO as unchanged. Default False.
+    progress_callback : callable or None
+        Called with the processed and total bytes after each member.
+    member_filter : MemberFilter or None
+        Packages to extract, unwanted packages are never read. Default None.
 
     Notes
     -----
@@ -722,48 +1062,64 @@ def parse_svo(
     check_fourcc("FPS4", svo_path)
     svo_path = Path(svo_path)
     svo_size = svo_path.stat().st_size
+    instrument.annotate(file=svo_path.name)
+    parsed_svo_dir_path = svo_path.parent / svo_path.name.split('.')[0]
+    manifest = Manifest(parsed_svo_dir_path)
+    member_filter = member_filter or MemberFilter()
+    stage = member_filter.get_stage("svo", packages=True)
+    if not force and manifest.is_up_to_date(stage, [svo_path]):
+        logger.info(f"Skipped SVO {svo_path.name} as it is unchanged.")
+        return
+
     binary_file = open(svo_path, "rb")
     g = BinaryReader(binary_file)
     g.endian = ">"
     g.word(4)
     A = g.i(6)
 
-    filesizes = []
-    filenames = []
-    for member in range(A[0]):
-        offset = g.tell()
-        B = g.i(3)
-        filesizes.append(B)
-        name = g.find(b"\x00")
-        filenames.append(name)
-        g.seek(offset + 44)
+    table = read_fps4_table(g, A[0], SVO_ENTRY_SIZE, inline_names=True)
+    filesizes = table.sizes.tolist()
+    filenames = table.names
 
     offset = A[2]
+    parsed_svo_paths = []
     for idx, member in enumerate(range(A[0])):
+        is_wanted = bool(filenames[member]) and member_filter.is_package_wanted(filenames[member])
         g.seek(offset)
-        data = g.read(filesizes[member][1])
-        g.seek(offset + filesizes[member][1])
+        if is_wanted:
+            data = g.read(filesizes[member])
+        g.seek(offset + filesizes[member])
         g.seekpad(128)
         offset = g.tell()
-        if filenames[member]:
+        if progress_callback:
+            progress_callback(min(offset, svo_size), svo_size)
+        if is_wanted:
             logger.info(f"Progress completion: {round((offset / svo_size * 100), 2)}%")
-            parsed_svo_path = svo_path.parent / svo_path.name.split('.')[0] / filenames[member]
+            parsed_svo_path = parsed_svo_dir_path / filenames[member]
             parsed_svo_path.parent.mkdir(parents=True, exist_ok=True)
             logger.debug({
                 "msg": "Parsing SVO package",
                 "package_name": filenames[member],
                 "parsed_svo_path": str(parsed_svo_path),
             })
-            with parsed_svo_path.open("wb") as f:
-                f.write(data)
+            with instrument.span("write_member", name=filenames[member], size=len(data)):
+                with parsed_svo_path.open("wb") as f:
+                    f.write(data)
+            parsed_svo_paths.append(parsed_svo_path)
+            instrument.add(bytes_out=len(data), items=1)
 
     g.close()
+    instrument.add(bytes_in=svo_size)
+    manifest.record(stage, [svo_path], parsed_svo_paths)
     logger.info(f"Parsed SVO {svo_path.name} completed.")
 
 
+@instrument.instrumented("parse_dat")
 def parse_dat(
         dat_path: str,
         verbose=False,
+        force=False,
+        progress_callback: ProgressCallback = None,
 ):
     """Parse DAT file from SVO package
 
@@ -772,6 +1128,10 @@ def parse_dat(
     dat_path : str
         Path to DAT file (e.g. 'path/to/PACKAGE.DAT')
     verbose : bool
+    force : bool
+        Decompress even if the manifest reports the DAT as unchanged. Default False.
+    progress_callback : callable or None
+        Called with the decompressed and total compressed bytes after each chunk.
 
     Notes
     -----
@@ -780,23 +1140,122 @@ def parse_dat(
     """
     check_fourcc("TLZC", dat_path)
     dat_path = Path(dat_path)
+    instrument.annotate(file=dat_path.name)
+    manifest = Manifest(dat_path.parent)
+    if not force and manifest.is_up_to_date("dat", [dat_path]):
+        logger.info(f"Skipped DAT {dat_path.name} as it is unchanged.")
+        return
+
     binary_file = open(dat_path, "rb")
     g = BinaryReader(binary_file)
     g.word(4)
     g.i(5)
 
     dec_path = dat_path.parent / f"{dat_path.name}.dec"
+    compressed_size = g.fileSize() - g.tell()
+    read_size = 0
+    decompressor = zlib.decompressobj()
     with open(dec_path, "wb") as dec_file:
-        data = g.read(g.fileSize() - g.tell())
-        data = zlib.decompress(data)
-        dec_file.write(data)
+        while True:
+            data = g.read(DAT_CHUNK_SIZE)
+            if not data:
+                break
+            dec_data = decompressor.decompress(data)
+            dec_file.write(dec_data)
+            read_size += len(data)
+            instrument.add(bytes_in=len(data), bytes_out=len(dec_data))
+            if progress_callback:
+                progress_callback(read_size, compressed_size)
+        dec_data = decompressor.flush()
+        dec_file.write(dec_data)
+        instrument.add(bytes_out=len(dec_data), items=1)
+
+    if not decompressor.eof:
+        g.close()
+        raise zlib.error(f"Incomplete or truncated stream in {dat_path.name}")
 
     g.close()
+    manifest.record("dat", [dat_path], [dec_path])
     logger.info(f"Parse DAT as {dat_path.name}.dec completed.")
 
 
+def read_fps4_table(
+        g: Union[BinaryReader, BinaryUnpacker],
+        count: int,
+        entry_size: int,
+        base_offset: int = 0,
+        inline_names=False,
+        data=None,
+) -> FPS4Table:
+    """Read an FPS4 entry table in one pass.
+
+    The reader must be at the first entry and is left after the table.
+    Entries are int32 rows of offset, size, real size and name offset
+    (relative to base_offset). Only entries with an offset have a name.
+
+    Parameters
+    ----------
+    g : BinaryReader or BinaryUnpacker
+    count : int
+        Number of entries
+    entry_size : int
+        Entry size in bytes
+    base_offset : int
+        Offset of the FPS4 container. Default 0.
+    inline_names : bool
+        Names are stored in the entries after the size columns, as in
+        SVO files, for every entry. Default False.
+    data : bytes-like or None
+        Container data to get the member types from, as parse_dec names
+        the members. Default None.
+
+    Returns
+    -------
+    FPS4Table
+
+    """
+    # Imported here as numpy is slow to import and only needed for tables
+    import numpy as np
+
+    table_offset = g.tell()
+    columns = entry_size // 4
+    rows = np.frombuffer(
+        g.read(count * columns * 4),
+        dtype=f"{g.endian}i4",
+        count=count * columns,
+    ).reshape(count, columns).astype(np.int64)
+    empty = np.zeros(count, dtype=np.int64)
+    offsets = rows[:, 0] if columns > 0 else empty
+    sizes = rows[:, 1] if columns > 1 else empty
+    real_sizes = rows[:, 2] if columns > 2 else sizes
+
+    names: List[str] = [None] * count
+    if inline_names:
+        name_offsets = [table_offset + idx * entry_size + 3 * 4 for idx in range(count)]
+        named = list(range(count))
+    elif columns > 3:
+        named = np.flatnonzero(offsets > 0).tolist()
+        name_offsets = (base_offset + rows[named, 3]).tolist()
+    else:
+        named, name_offsets = [], []
+    string_table = g.string_table(name_offsets)
+    for idx, name_offset in zip(named, name_offsets):
+        names[idx] = string_table.get(name_offset)
+
+    types: List[str] = [None] * count
+    if data is not None:
+        # Imported here as only listing needs the member types
+        from utils.magic import get_member_types
+
+        types = get_member_types(data, (base_offset + offsets).tolist(), sizes.tolist())
+        types = [member_type if offset > 0 else None for member_type, offset in zip(types, offsets.tolist())]
+
+    return FPS4Table(offsets, sizes, real_sizes, names, types)
+
+
+@instrument.instrumented("parse_fps4")
 def parse_fps4(
-        g: BinaryReader,
+        g: Union[BinaryReader, BinaryUnpacker],
         n: int,
         parent_node: Node,
         verbose=False,
@@ -805,7 +1264,7 @@ def parse_fps4(
 
     Parameters
     ----------
-    g : BinaryReader
+    g : BinaryReader or BinaryUnpacker
     n : int
     parent_node : Node
     verbose : bool
@@ -832,41 +1291,198 @@ def parse_fps4(
         "n": n,
     })
     g.seek(current_offset + A[1])
-    B = []
-    for m in range(A[0]):
-        B.append(g.i(A[3] // 4))
-
-    for idx, b in enumerate(B):
-        logger.debug({
-            "msg": f"Loop B - {idx:04}",
-        })
-        if b[0] > 0:
-            logger.debug({
-                "b": b,
-            })
-            name = None
-            if len(b) > 3:
-                g.seek(current_offset + b[3])
-                name = g.find(b"\x00")
-
-            g.seek(current_offset + b[0])
-            logger.debug({
-                "name": name,
-                "size": b[1],
-                "n": n,
-            })
+    instrument.add(items=A[0])
+    table = read_fps4_table(g, A[0], A[3], current_offset)
+
+    for idx, (offset, size, name) in enumerate(zip(
+            table.offsets.tolist(),
+            table.sizes.tolist(),
+            table.names,
+    )):
+        if offset > 0:
             node.data[f"{idx:04}"] = {
                 "name": name,
-                "offset_start": b[0],
-                "offset_end": b[0] + b[1],
+                "offset_start": offset,
+                "offset_end": offset + size,
             }
+    logger.debug({
+        "msg": "Read FPS4 table",
+        "entries": len(table),
+        "names": table.names[:8],
+        "n": n,
+    })
 
     logger.info(f"Parsed FPS4 completed")
 
 
+def decompress_tlzc(data) -> bytes:
+    """Decompress an in-memory TLZC container, as parse_dat does for DAT files."""
+    return zlib.decompress(data[TLZC_HEADER_SIZE:])
+
+
+def get_member_path(dir_path: Path, name: str, key: str, header) -> Path:
+    """Get the path of an FPS4 member as parse_dec_ext and rename_unknown_files_ext name it."""
+    member_path = dir_path / f"{name}.{key}".replace("name=", "")
+    if member_path.suffix:
+        member_path = member_path.with_suffix(get_extension(header) or ".TXV")
+    return member_path
+
+
+def extract_nested(
+        data,
+        start: int,
+        end: int,
+        member_path: Path,
+        depth: int,
+        report: FPS4TreeReport,
+        written_paths: List[Path],
+        max_depth: int = FPS4_MAX_DEPTH,
+        member_filter: MemberFilter = None,
+) -> bool:
+    """Extract a member if it is an FPS4 or TLZC container.
+
+    An FPS4 member is extracted to 'member_path.ext', a TLZC member holding
+    an FPS4 to 'member_path.dec.ext', the same directories parse_dec_ext
+    and parse_dat then parse_dec create, without writing the container.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Buffer holding the member
+    start : int
+    end : int
+        Member offsets in data
+    member_path : Path
+        Path the member would be written to
+    depth : int
+        Level of the member, 0 for the members of a DEC file
+    report : FPS4TreeReport
+    written_paths : list of Path
+        Extracted files are appended to it
+    max_depth : int
+        Deepest level to extract. Default FPS4_MAX_DEPTH.
+    member_filter : MemberFilter or None
+        Nested members to extract. Default None.
+
+    Returns
+    -------
+    bool
+        False if the member isn't a container and must be written as is
+
+    """
+    # A view, slicing bytes would copy the member
+    content = memoryview(data)[start:end]
+    magic = get_magic(content)
+    if magic not in CONTAINER_MAGICS:
+        return False
+    if depth >= max_depth:
+        report.truncated += 1
+        return False
+
+    tree_path = Path(f"{member_path}.ext")
+    if magic == MAGIC_TLZC:
+        try:
+            with instrument.span("decompress_tlzc", name=member_path.name, size=end - start):
+                content = decompress_tlzc(content)
+        except zlib.error:
+            logger.warning(f"Failed to decompress {member_path.name}, writing it as is.")
+            return False
+        if get_magic(content) != MAGIC_FPS4:
+            return False
+        tree_path = Path(f"{member_path}.dec.ext")
+
+    try:
+        extract_fps4_tree(content, tree_path, depth + 1, report, written_paths, max_depth, member_filter)
+    except struct.error:
+        logger.warning(f"Failed to parse nested FPS4 {member_path.name}, writing it as is.")
+        return False
+    return True
+
+
+def extract_fps4_tree(
+        data,
+        dir_path: Path,
+        depth: int = 0,
+        report: FPS4TreeReport = None,
+        written_paths: List[Path] = None,
+        max_depth: int = FPS4_MAX_DEPTH,
+        member_filter: MemberFilter = None,
+) -> FPS4TreeReport:
+    """Extract an in-memory FPS4 and every container nested in it.
+
+    Members are named as parse_dec_ext names them, nested containers are
+    parsed from slices of the same buffer instead of being written and
+    read back.
+
+    Parameters
+    ----------
+    data : bytes-like
+        FPS4 content
+    dir_path : Path
+        Output directory (e.g. 'path/to/PACKAGE.FPS4.ext')
+    depth : int
+        Level of the members of this FPS4. Default 0.
+    report : FPS4TreeReport or None
+        Report to add to. Default None creates one.
+    written_paths : list of Path or None
+        Extracted files are appended to it. Default None.
+    max_depth : int
+        Deepest level to extract. Default FPS4_MAX_DEPTH.
+    member_filter : MemberFilter or None
+        Members to extract, filtered from the FPS4 tables before any
+        write. Default None extracts every member.
+
+    Returns
+    -------
+    FPS4TreeReport
+
+    """
+    report = FPS4TreeReport() if report is None else report
+    written_paths = [] if written_paths is None else written_paths
+    member_filter = member_filter or MemberFilter()
+    data = memoryview(data)
+
+    g = BinaryUnpacker(data)
+    g.endian = ">"
+    node = Node()
+    parse_fps4(g, 0, node)
+
+    dir_path.mkdir(parents=True, exist_ok=True)
+    with instrument.span("extract_fps4", name=dir_path.name, depth=depth):
+        for k, v in node.data.items():
+            start, end = v["offset_start"], v["offset_end"]
+            member_path = get_member_path(dir_path, v["name"], k, data[start:end])
+            is_container = get_magic(data[start:end]) in CONTAINER_MAGICS
+            if not member_filter.is_wanted(member_path.name, end - start, is_container=is_container):
+                continue
+            report.add(depth)
+            if extract_nested(
+                    data,
+                    start,
+                    end,
+                    member_path,
+                    depth,
+                    report,
+                    written_paths,
+                    max_depth,
+                    member_filter,
+            ):
+                continue
+            with member_path.open("wb") as f:
+                f.write(data[start:end])
+            written_paths.append(member_path)
+            instrument.add(bytes_out=end - start, items=1)
+
+    return report
+
+
 def parse_dec_ext(
         dec_ext_path: str,
         verbose=False,
+        progress_callback: ProgressCallback = None,
+        recursive=False,
+        max_depth: int = FPS4_MAX_DEPTH,
+        member_filter: MemberFilter = None,
 ):
     """Parse unknown extracted files from parsed DAT.dec
 
@@ -875,6 +1491,15 @@ def parse_dec_ext(
     dec_ext_path : str
         Path to unknown file (e.g. 'path/to/PACKAGE.DAT.dec.ext/0000')
     verbose : bool
+    progress_callback : callable or None
+        Called with the written and total members after each member.
+    recursive : bool
+        Also extract the FPS4 and TLZC containers nested in it, see
+        extract_fps4_tree. Default False.
+    max_depth : int
+        Deepest level extracted when recursive. Default FPS4_MAX_DEPTH.
+    member_filter : MemberFilter or None
+        Members to extract, unwanted members are never written. Default None.
 
     Notes
     -----
@@ -883,27 +1508,49 @@ def parse_dec_ext(
     """
     dec_ext_path = Path(dec_ext_path)
 
-    binary_file = open(dec_ext_path, "rb")
+    with open(dec_ext_path, "rb") as dec_ext_file:
+        dec_ext_content = dec_ext_file.read()
+
+    if recursive:
+        report = extract_fps4_tree(
+            dec_ext_content,
+            Path(f"{dec_ext_path}.ext"),
+            max_depth=max_depth,
+            member_filter=member_filter,
+        )
+        logger.info({
+            "msg": f"Parse unknown files tree as {dec_ext_path.name}.ext completed.",
+            "items_per_level": report.items_per_level,
+            "truncated": report.truncated,
+        })
+        return
 
-    g = BinaryReader(binary_file)
+    g = BinaryUnpacker(dec_ext_content)
     g.endian = ">"
     n = 0
     node = Node()
     parse_fps4(g, n, node)
-    g.close()
-
-    with open(dec_ext_path, "rb") as dec_ext_file:
-        dec_ext_content = dec_ext_file.read()
 
     dec_ext_ext_path = Path(f"{dec_ext_path}.ext")
-    for k, v in node.data.items():
+    data_keys_total = len(node.data.keys())
+    member_filter = member_filter or MemberFilter()
+    for idx, (k, v) in enumerate(node.data.items()):
         name_ = v["name"]
-        unknown_file_path = dec_ext_ext_path / f"{name_}.{k}"
-        unknown_file_path.parent.mkdir(parents=True, exist_ok=True)
-        with unknown_file_path.open("wb") as f:
-            f.write(dec_ext_content[v["offset_start"]:v["offset_end"]])
-
-        rename_unknown_files_ext(str(dec_ext_ext_path))
+        member_data = dec_ext_content[v["offset_start"]:v["offset_end"]]
+        is_wanted = member_filter.is_wanted(
+            get_member_path(dec_ext_ext_path, name_, k, member_data).name,
+            len(member_data),
+            is_container=get_magic(member_data) in CONTAINER_MAGICS,
+        )
+        if is_wanted:
+            unknown_file_path = dec_ext_ext_path / f"{name_}.{k}"
+            unknown_file_path.parent.mkdir(parents=True, exist_ok=True)
+            with unknown_file_path.open("wb") as f:
+                f.write(member_data)
+
+            rename_unknown_files_ext(str(dec_ext_ext_path))
+        if progress_callback:
+            progress_callback(idx + 1, data_keys_total)
 
     logger.info(f"Parse unknown files as {dec_ext_ext_path.name}.dec.ext completed.")
 
@@ -911,6 +1558,7 @@ def parse_dec_ext(
 def get_package_names(
         file_path: Path,
         generic_pattern=False,
+        data: bytes = None,
 ) -> List[Package]:
     """Get package names
 
@@ -920,6 +1568,8 @@ def get_package_names(
         DEC file path (e.g. 'path/to/PACKAGE.DAT.dec')
     generic_pattern : bool
         Use generic regex pattern for package name. Default False.
+    data : bytes or None
+        Content of the DEC file if already read. Default None.
 
     Returns
     -------
@@ -955,8 +1605,9 @@ def get_package_names(
     #         "asset_name_underscore": asset_name_underscore,
     #     })
 
-    with file_path.open("rb") as f:
-        data = f.read()
+    if data is None:
+        with file_path.open("rb") as f:
+            data = f.read()
 
     package_names = []
     current_offset = 0
@@ -987,9 +1638,15 @@ def get_package_names(
     return package_names
 
 
+@instrument.instrumented("parse_dec")
 def parse_dec(
         dec_path: str,
         verbose=False,
+        force=False,
+        progress_callback: ProgressCallback = None,
+        recursive=False,
+        max_depth: int = FPS4_MAX_DEPTH,
+        member_filter: MemberFilter = None,
 ):
     """Parse DEC file from parsed DAT
 
@@ -998,6 +1655,25 @@ def parse_dec(
     dec_path : str
         Path to DEC file (e.g. 'path/to/PACKAGE.DAT.dec')
     verbose : bool
+    force : bool
+        Extract even if the manifest reports the DEC as unchanged. Default False.
+    progress_callback : callable or None
+        Called with the written and total members after each member.
+    recursive : bool
+        Extract the FPS4 and TLZC members, and the containers nested in
+        them, from the DEC buffer instead of writing them for parse_dec_ext.
+        Default False.
+    max_depth : int
+        Deepest level extracted when recursive, the DEC members being level
+        0. Default FPS4_MAX_DEPTH.
+    member_filter : MemberFilter or None
+        Members to extract, filtered from the FPS4 table before any write.
+        Nested containers are still extracted unless excluded. Default None.
+
+    Returns
+    -------
+    FPS4TreeReport or None
+        Members extracted per level, None if skipped as unchanged
 
     Notes
     -----
@@ -1005,29 +1681,34 @@ def parse_dec(
 
     """
     dec_path = Path(dec_path)
+    instrument.annotate(file=dec_path.name)
+    dec_ext_path = Path(f"{dec_path}.ext")
+    manifest = Manifest(dec_ext_path)
+    member_filter = member_filter or MemberFilter()
+    stage = member_filter.get_stage("dec_tree" if recursive else "dec")
+    if not force and manifest.is_up_to_date(stage, [dec_path]):
+        logger.info(f"Skipped DEC {dec_path.name} as it is unchanged.")
+        return
+
+    with open(dec_path, "rb") as dec_file:
+        dec_content = dec_file.read()
+    instrument.add(bytes_in=len(dec_content))
 
     # 1. Search for possible package names
-    package_names = get_package_names(dec_path)
+    package_names = get_package_names(dec_path, data=dec_content)
 
     # 2. Parse data
-    binary_file = open(dec_path, "rb")
-
-    g = BinaryReader(binary_file)
+    g = BinaryUnpacker(dec_content)
     g.endian = ">"
     n = 0
     node = Node()
     parse_fps4(g, n, node)
-    g.close()
 
     # 3. Write out parsed data
     is_tex_package = False
     if "TEX" in dec_path.name:
         is_tex_package = True
 
-    with open(dec_path, "rb") as dec_file:
-        dec_content = dec_file.read()
-
-    dec_ext_path = Path(f"{dec_path}.ext")
     dec_ext_path.mkdir(exist_ok=True)
 
     package_names_total = len(package_names)
@@ -1037,9 +1718,17 @@ def parse_dec(
         package_names = get_package_names(
             dec_path,
             generic_pattern=True,
+            data=dec_content,
         )[:data_keys_total]
 
+    # Classify every member at once, from the first bytes at its offset
+    offsets, _ = get_member_extents(node.data.values())
+    extensions = get_extensions(dec_content, offsets)
+    is_dds_list = find_dds_headers(dec_content, offsets)
+
     verify_fourcc = True
+    written_paths = []
+    report = FPS4TreeReport()
     for idx, (k, v) in enumerate(node.data.items()):
         idx: int
         k: str
@@ -1047,6 +1736,9 @@ def parse_dec(
 
         old_name = k
 
+        if progress_callback:
+            progress_callback(idx + 1, data_keys_total)
+
         if old_name == "_":
             # Skip as possible redundant bytes padding
             continue
@@ -1055,8 +1747,6 @@ def parse_dec(
             k = package_names[idx].name
             verify_fourcc = False
 
-        fourcc = dec_content[v["offset_start"]:v["offset_start"]+4].hex().upper()
-        fourcc_dds = dec_content[v["offset_start"]:v["offset_start"]+8].hex().upper()
         basename = k.split('.')[0]
 
         if is_tex_package:
@@ -1066,10 +1756,10 @@ def parse_dec(
                 input_file[1],
             ])
 
-        if verify_fourcc and fourcc in TYPE_2_EXT_PC.keys():
-            k = f"{basename}{TYPE_2_EXT_PC[fourcc]}"
+        if verify_fourcc and extensions[idx]:
+            k = f"{basename}{extensions[idx]}"
 
-        if DDS_HEADER.hex() in fourcc_dds:
+        if is_dds_list[idx]:
             k = f"{basename}.TXV"
 
         new_name = k
@@ -1078,7 +1768,292 @@ def parse_dec(
             "old_name": old_name,
             "new_name": new_name,
         })
-        with (dec_ext_path / k).open("wb") as f:
-            f.write(dec_content[v["offset_start"]:v["offset_end"]])
+        header = dec_content[v["offset_start"]:min(v["offset_start"] + 4, v["offset_end"])]
+        if member_filter and not member_filter.is_wanted(
+                k,
+                v["offset_end"] - v["offset_start"],
+                ".TXV" if is_dds_list[idx] else extensions[idx],
+                get_magic(header) in CONTAINER_MAGICS,
+        ):
+            continue
+
+        report.add(0)
+        if recursive and extract_nested(
+                dec_content,
+                v["offset_start"],
+                v["offset_end"],
+                dec_ext_path / k,
+                0,
+                report,
+                written_paths,
+                max_depth,
+                member_filter,
+        ):
+            continue
+        with instrument.span("write_member", name=k, size=v["offset_end"] - v["offset_start"]):
+            with (dec_ext_path / k).open("wb") as f:
+                f.write(dec_content[v["offset_start"]:v["offset_end"]])
+        written_paths.append(dec_ext_path / k)
+        instrument.add(bytes_out=v["offset_end"] - v["offset_start"], items=1)
+
+    manifest.record(stage, [dec_path], written_paths)
+    logger.info({
+        "msg": f"Parse DAT dec as {dec_path.name}.ext completed.",
+        "items_per_level": report.items_per_level,
+        "truncated": report.truncated,
+    })
+    return report
+
+
+def read_tlzc_head(chunks: Iterable[bytes]) -> Tuple[Tuple[int, ...], bytes]:
+    """Decompress a TLZC stream only as far as the FPS4 header and table inside it.
+
+    Parameters
+    ----------
+    chunks : iterable of bytes-like
+        The TLZC container from its first byte, e.g. read in chunks
+
+    Returns
+    -------
+    tuple
+        The five int32 of the TLZC header (the third one being the
+        decompressed size) and the decompressed head. The head holds the
+        FPS4 header, entry table and names, or the first decompressed bytes
+        if the content isn't an FPS4.
+
+    """
+    chunks = iter(chunks)
+    raw = b""
+    for chunk in chunks:
+        raw += bytes(chunk)
+        if len(raw) >= TLZC_HEADER_SIZE:
+            break
+    tlzc_header = struct.unpack_from("<5i", raw, 4)
+
+    decompressor = zlib.decompressobj()
+    head = bytearray()
+    pending = raw[TLZC_HEADER_SIZE:]
+
+    def decompress_until(size: int):
+        nonlocal pending
+        while len(head) < size and not decompressor.eof:
+            if not pending:
+                pending = bytes(next(chunks, b""))
+                if not pending:
+                    break
+            # Bounded, a chunk of zeros decompresses to a thousand times its size
+            head.extend(decompressor.decompress(pending, size - len(head)))
+            pending = decompressor.unconsumed_tail
+
+    decompress_until(FPS4_HEADER_SIZE)
+    if get_magic(head) == MAGIC_FPS4 and len(head) >= FPS4_HEADER_SIZE:
+        count, table_offset, data_offset, entry_size = struct.unpack_from(">3iH", head, 4)
+        decompress_until(max(data_offset, table_offset + count * entry_size))
+    return tlzc_header, bytes(head)
+
+
+def list_fps4(
+        data,
+        base_offset: int = 0,
+        depth: int = 0,
+        recursive=False,
+        max_depth: int = FPS4_MAX_DEPTH,
+) -> List[ListingEntry]:
+    """List the members of an in-memory FPS4 without extracting them.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Buffer holding the FPS4, e.g. a memory mapped DEC file. Members
+        past its end are listed without a type.
+    base_offset : int
+        Offset of the FPS4 in data. Default 0.
+    depth : int
+        Level of the members. Default 0.
+    recursive : bool
+        Also list the members of nested FPS4 and TLZC containers, after
+        the container. The offsets of members nested in a TLZC are relative
+        to its decompressed content. Default False.
+    max_depth : int
+        Deepest level listed when recursive. Default FPS4_MAX_DEPTH.
 
-    logger.info(f"Parse DAT dec as {dec_path.name}.ext completed.")
+    Returns
+    -------
+    list of ListingEntry
+
+    """
+    g = BinaryUnpacker(data)
+    g.endian = ">"
+    g.seek(base_offset)
+    fourcc = g.word(4)
+    if fourcc != "FPS4":
+        raise InvalidFourCCException("FPS4", fourcc)
+    A = g.unpack("3i2H2i")
+    g.seek(base_offset + A[1])
+    table = read_fps4_table(g, A[0], A[3], base_offset, data=data)
+
+    entries = []
+    for offset, size, real_size, name, member_type in zip(
+            table.offsets.tolist(),
+            table.sizes.tolist(),
+            table.real_sizes.tolist(),
+            table.names,
+            table.types,
+    ):
+        if offset <= 0:
+            continue
+        start = base_offset + offset
+        entry = ListingEntry(name, start, size, real_size, member_type, depth)
+        entries.append(entry)
+        if not recursive or depth >= max_depth or start + size > len(data):
+            continue
+
+        try:
+            if member_type == ".FPS4":
+                entries.extend(list_fps4(data, start, depth + 1, recursive, max_depth))
+            elif member_type == ".TLZC":
+                tlzc_header, head = read_tlzc_head([memoryview(data)[start:start + size]])
+                entry.real_size = tlzc_header[2]
+                if get_magic(head) == MAGIC_FPS4:
+                    # Only the head is decompressed, its members can't be listed
+                    entries.extend(list_fps4(head, 0, depth + 1))
+        except (struct.error, zlib.error, InvalidFourCCException):
+            logger.warning(f"Failed to list nested container {name} at {start}.")
+
+    return entries
+
+
+def list_svo(svo_path: str) -> ContainerListing:
+    """List the packages of an SVO without extracting them.
+
+    Only the table and the first bytes of each package are read.
+
+    Parameters
+    ----------
+    svo_path : str
+        Path to SVO file (e.g. 'path/to/PACKAGE.SVO')
+
+    Returns
+    -------
+    ContainerListing
+        The real size of TLZC packages is their decompressed size
+
+    """
+    check_fourcc("FPS4", svo_path)
+    svo_path = Path(svo_path)
+    svo_size = svo_path.stat().st_size
+
+    binary_file = open(svo_path, "rb")
+    g = BinaryReader(binary_file)
+    g.endian = ">"
+    g.word(4)
+    A = g.i(6)
+    table = read_fps4_table(g, A[0], SVO_ENTRY_SIZE, inline_names=True)
+
+    listing = ContainerListing(svo_path.name, "FPS4", svo_size, svo_size)
+    # Same member offsets as parse_svo
+    offset = A[2]
+    for name, size, real_size in zip(table.names, table.sizes.tolist(), table.real_sizes.tolist()):
+        g.seek(offset)
+        header = g.read(min(size, TLZC_HEADER_SIZE))
+        member_type = get_member_type(header)
+        if member_type == ".TLZC" and len(header) == TLZC_HEADER_SIZE:
+            real_size = struct.unpack_from("<5i", header, 4)[2]
+        if name:
+            listing.entries.append(ListingEntry(name, offset, size, real_size, member_type))
+        g.seek(offset + size)
+        g.seekpad(128)
+        offset = g.tell()
+
+    g.close()
+    return listing
+
+
+def list_dat(dat_path: str) -> ContainerListing:
+    """List the FPS4 members of a DAT without decompressing all of it.
+
+    The DAT is decompressed only as far as the FPS4 entry table, so most
+    members are listed without a type.
+
+    Parameters
+    ----------
+    dat_path : str
+        Path to DAT file (e.g. 'path/to/PACKAGE.DAT')
+
+    Returns
+    -------
+    ContainerListing
+        The real size is the decompressed size from the TLZC header
+
+    """
+    check_fourcc("TLZC", dat_path)
+    dat_path = Path(dat_path)
+    with open(dat_path, "rb") as dat_file:
+        tlzc_header, head = read_tlzc_head(iter(partial(dat_file.read, LISTING_CHUNK_SIZE), b""))
+
+    listing = ContainerListing(dat_path.name, "TLZC", dat_path.stat().st_size, tlzc_header[2])
+    if get_magic(head) == MAGIC_FPS4:
+        listing.entries = list_fps4(head)
+    return listing
+
+
+def list_dec(
+        dec_path: str,
+        recursive=False,
+        max_depth: int = FPS4_MAX_DEPTH,
+) -> ContainerListing:
+    """List the members of a DEC, or any FPS4 file, without extracting them.
+
+    The file is memory mapped, only its table and the first bytes of each
+    member are read.
+
+    Parameters
+    ----------
+    dec_path : str
+        Path to DEC file (e.g. 'path/to/PACKAGE.DAT.dec')
+    recursive : bool
+        Also list the members of nested containers, see list_fps4. Default False.
+    max_depth : int
+        Deepest level listed when recursive. Default FPS4_MAX_DEPTH.
+
+    Returns
+    -------
+    ContainerListing
+
+    """
+    check_fourcc("FPS4", dec_path)
+    dec_path = Path(dec_path)
+    dec_size = dec_path.stat().st_size
+    with open(dec_path, "rb") as dec_file:
+        with mmap.mmap(dec_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            entries = list_fps4(data, recursive=recursive, max_depth=max_depth)
+    return ContainerListing(dec_path.name, "FPS4", dec_size, dec_size, entries)
+
+
+def list_container(
+        file_path: str,
+        recursive=False,
+        max_depth: int = FPS4_MAX_DEPTH,
+) -> ContainerListing:
+    """List an SVO, DAT or DEC file, picking the lister from its FourCC and extension.
+
+    Parameters
+    ----------
+    file_path : str
+    recursive : bool
+        Also list nested containers of DEC files. Default False.
+    max_depth : int
+        Deepest level listed when recursive. Default FPS4_MAX_DEPTH.
+
+    Returns
+    -------
+    ContainerListing
+
+    """
+    with open(file_path, "rb") as f:
+        magic = get_magic(f.read(4))
+    if magic == MAGIC_TLZC:
+        return list_dat(file_path)
+    if Path(file_path).suffix.lower() == ".svo":
+        return list_svo(file_path)
+    return list_dec(file_path, recursive, max_depth)
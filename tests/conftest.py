@@ -0,0 +1,54 @@
+"""Synthetic containers shared by the extraction tests."""
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from benchmarks.synthetic import (
+    build_fps4,
+    build_spm_spv,
+    build_tlzc,
+    build_txm_txv,
+)
+from utils.manifest import MANIFEST_NAME
+
+
+@pytest.fixture(scope="session")
+def dec_content() -> bytes:
+    """DEC holding a mesh, a texture, a nested FPS4 and a nested TLZC.
+
+    Members are written as 0000.SPM, 0001.SPV, 0002.TXV, 0003.FPS4 (I.TXM,
+    I.TXV and the NEST FPS4 of D.SPM and D.SPV) and 0004, the TLZC of the
+    NEST FPS4.
+
+    """
+    spm, spv = build_spm_spv(meshes=1, vertices=8)
+    txm, txv = build_txm_txv(textures=1, dds_size=128)
+    deep = build_fps4([("D.SPM", spm), ("D.SPV", spv)])
+    inner = build_fps4([("I.TXM", txm), ("I.TXV", txv), ("NEST", deep)])
+    return build_fps4([
+        ("A.SPM", spm),
+        ("A.SPV", spv),
+        ("T.TXV", txv),
+        ("B", inner),
+        ("C", build_tlzc(deep)),
+    ])
+
+
+@pytest.fixture
+def dec_path(tmp_path, dec_content) -> Path:
+    dec_path = tmp_path / "PACK.DAT.dec"
+    dec_path.write_bytes(dec_content)
+    return dec_path
+
+
+@pytest.fixture(scope="session")
+def get_files():
+    """Get the files written in a directory keyed by relative path, without the manifest."""
+    def get_files(dir_path: Path) -> Dict[str, Path]:
+        return {
+            path.relative_to(dir_path).as_posix(): path
+            for path in sorted(dir_path.rglob("*"))
+            if path.is_file() and not path.name.startswith(MANIFEST_NAME)
+        }
+    return get_files
@@ -0,0 +1,52 @@
+import filecmp
+import logging
+
+import pytest
+
+from benchmarks.synthetic import build_spm_spv
+from utils.batch import export_meshes
+from utils.exporter import export_wavefront_obj
+
+PACKAGES = ("PACKAGE_A", "PACKAGE_B")
+
+
+@pytest.fixture
+def root_path(tmp_path):
+    root_path = tmp_path / "Data64"
+    for idx, package_name in enumerate(PACKAGES):
+        (root_path / package_name).mkdir(parents=True)
+        spm, spv = build_spm_spv(meshes=2 + idx, vertices=16)
+        (root_path / package_name / f"{package_name}.SPM").write_bytes(spm)
+        (root_path / package_name / f"{package_name}.SPV").write_bytes(spv)
+    return root_path
+
+
+@pytest.mark.parametrize("workers, shared_memory", [(1, False), (2, False), (2, True)])
+def test_export_meshes_matches_obj(root_path, tmp_path, get_files, workers, shared_memory):
+    report = export_meshes(str(root_path), str(tmp_path / "batch"), workers=workers, shared_memory=shared_memory)
+    assert (report.packages, report.exported, report.failures) == (len(PACKAGES), len(PACKAGES), [])
+
+    for package_name in PACKAGES:
+        export_wavefront_obj(str(root_path / package_name / f"{package_name}.SPM"), str(tmp_path / "single"))
+    batch = get_files(tmp_path / "batch")
+    single = get_files(tmp_path / "single")
+    assert list(batch) == list(single)
+    for path in batch:
+        assert filecmp.cmp(batch[path], single[path], shallow=False), path
+
+    # Unchanged packages are skipped on rerun
+    report = export_meshes(str(root_path), str(tmp_path / "batch"), workers=workers, shared_memory=shared_memory)
+    assert (report.packages, report.exported, report.skipped) == (len(PACKAGES), 0, len(PACKAGES))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_export_meshes_skips_failed(root_path, tmp_path, caplog, workers):
+    (root_path / "BROKEN.SPM").write_bytes(b"\x00" * 8)
+    (root_path / "BROKEN.SPV").write_bytes(b"\x00" * 8)
+
+    with caplog.at_level(logging.ERROR, logger="utils.batch"):
+        report = export_meshes(str(root_path), str(tmp_path / "batch"), workers=workers)
+    assert [spm_path for spm_path, _ in report.failures] == [str(root_path / "BROKEN.SPM")]
+    assert "BROKEN.SPM" in caplog.text
+    assert report.exported == len(PACKAGES)
+    assert not (tmp_path / "batch" / "BROKEN").exists()
@@ -0,0 +1,60 @@
+import io
+import struct
+
+import pytest
+
+from benchmarks.synthetic import build_fps4
+from parsers.models import Node
+from parsers.parser import parse_fps4
+from utils.binaries import (
+    STRING_TABLE_MAX_LENGTH,
+    BinaryReader,
+    BinaryUnpacker,
+)
+
+
+def test_find_memoryview():
+    data = b"N" * 250 + b"\x00" + b"TAIL"
+    g = BinaryUnpacker(memoryview(data))
+    assert g.find(size=100) == "N" * 250
+    assert g.tell() == 251
+    # Without terminator up to the end of the data
+    assert g.find(size=100) == "TAIL"
+    assert g.tell() == len(data)
+
+
+def test_parse_fps4_long_name():
+    long_name = "N" * (STRING_TABLE_MAX_LENGTH + 44) + ".SPM"
+    data = build_fps4([("A.SPM", b"\x01" * 16), (long_name, b"\x02" * 16)])
+    # As extract_fps4_tree parses nested containers
+    g = BinaryUnpacker(memoryview(data))
+    g.endian = ">"
+    node = Node()
+    parse_fps4(g, 0, node)
+    assert [v["name"] for k, v in node.data.items() if k != "_"] == ["A.SPM", long_name]
+
+
+@pytest.mark.parametrize("method, expected", [
+    ("half", [1.0, 1.0]),
+    ("short", [3.75, 3.75]),
+])
+def test_reader_short_read(method, expected):
+    g = BinaryReader(io.BytesIO(b"\x00\x3c" * 2 + b"\x00"))
+    assert getattr(g, method)(2) == expected
+    # The last value is cut short
+    with pytest.raises(struct.error):
+        getattr(g, method)(1)
+    g.input_file.seek(0)
+    with pytest.raises(struct.error):
+        getattr(g, method)(3)
+
+
+@pytest.mark.parametrize("method", ["half", "short"])
+def test_unpacker_short_read(method):
+    g = BinaryUnpacker(b"\x00\x3c" * 3)
+    with pytest.raises(struct.error):
+        getattr(g, method)(5)
+    # The offset doesn't move past a failed read
+    assert g.tell() == 0
+    assert len(getattr(g, method)(3)) == 3
+    assert g.tell() == 6
@@ -0,0 +1,81 @@
+import filecmp
+
+import pytest
+
+from benchmarks.synthetic import build_mtr, build_txm_txv
+from utils.pipeline import (
+    ASSET_STAGES,
+    STAGE_DDS,
+    STAGE_DEC,
+    STAGE_MTL,
+    PipelineOptions,
+    run_stage,
+)
+from utils.scheduler import Job
+
+NESTED_MEMBERS = ("._", "D.SPM.SPM", "D.SPV.SPV")
+
+
+def extract(dir_path, dec_content: bytes, get_files, **kwargs) -> dict:
+    """Run the pipeline from a DEC file and get the written files."""
+    dir_path.mkdir()
+    dec_path = dir_path / "PACK.DAT.dec"
+    dec_path.write_bytes(dec_content)
+    options = PipelineOptions(**kwargs)
+    queue = [Job(STAGE_DEC, str(dec_path))]
+    while queue:
+        for job in run_stage(options, queue.pop(0)):
+            if job.stage not in ASSET_STAGES:
+                queue.append(job)
+    return get_files(dir_path)
+
+
+def test_recursive_matches_manual(tmp_path, dec_content, get_files):
+    manual = extract(tmp_path / "manual", dec_content, get_files)
+    recursive = extract(tmp_path / "recursive", dec_content, get_files, recursive=True)
+
+    # Nested FPS4 containers are only written by the manual flow
+    containers = {path for path in manual if path.endswith(".FPS4")}
+    assert containers == {"PACK.DAT.dec.ext/0003.FPS4", "PACK.DAT.dec.ext/0003.FPS4.ext/NEST.FPS4"}
+    # The manual flow doesn't decompress TLZC members without a DAT extension
+    tlzc = "PACK.DAT.dec.ext/0004"
+    assert tlzc in manual
+    assert set(recursive) == set(manual) - containers - {tlzc} | {
+        f"PACK.DAT.dec.ext/0004.dec.ext/{name}" for name in NESTED_MEMBERS
+    }
+    for path in set(recursive) & set(manual):
+        assert filecmp.cmp(manual[path], recursive[path], shallow=False), path
+    for name in NESTED_MEMBERS:
+        assert filecmp.cmp(
+            recursive[f"PACK.DAT.dec.ext/0004.dec.ext/{name}"],
+            recursive[f"PACK.DAT.dec.ext/0003.FPS4.ext/NEST.FPS4.ext/{name}"],
+            shallow=False,
+        )
+
+
+def test_recursive_max_depth(tmp_path, dec_content, get_files):
+    recursive = extract(tmp_path / "recursive", dec_content, get_files, recursive=True, max_depth=1)
+    # Containers past the deepest level are written as is
+    assert "PACK.DAT.dec.ext/0003.FPS4.ext/NEST.FPS4" in recursive
+    assert not any("NEST.FPS4.ext" in path for path in recursive)
+
+
+@pytest.mark.parametrize("stage, files", [
+    (STAGE_DDS, dict(zip(("PACKAGE.TXM", "PACKAGE.TXV"), build_txm_txv(textures=2, dds_size=128)))),
+    (STAGE_MTL, {"PACKAGE.MTR": build_mtr(materials=2)}),
+])
+def test_asset_stages_skip_unchanged(tmp_path, get_files, stage, files):
+    for name, content in files.items():
+        (tmp_path / name).write_bytes(content)
+    job = Job(stage, str(tmp_path / next(iter(files))))
+
+    run_stage(PipelineOptions(), job)
+    written = get_files(tmp_path / "PACKAGE")
+    assert written
+    for path in written.values():
+        path.write_bytes(b"")
+    # Unchanged inputs are skipped unless forced
+    run_stage(PipelineOptions(), job)
+    assert all(not path.read_bytes() for path in written.values())
+    run_stage(PipelineOptions(force=True), job)
+    assert all(path.read_bytes() for path in written.values())
@@ -0,0 +1,71 @@
+import pytest
+
+from benchmarks.synthetic import build_fps4, build_svo, build_tlzc
+from parsers.parser import parse_dec, parse_svo
+from utils.filters import MemberFilter
+
+
+@pytest.mark.parametrize("member_filter, name, size, member_type, is_container, expected", [
+    (MemberFilter(), "A.SPM", 16, None, False, True),
+    (MemberFilter(include=("a*",)), "A.SPM", 16, None, False, True),
+    (MemberFilter(include=("B*",)), "A.SPM", 16, None, False, False),
+    (MemberFilter(types=("spm",)), "A.SPM", 16, None, False, True),
+    (MemberFilter(types=(".SPV",)), "A.SPM", 16, None, False, False),
+    # The detected type wins over the name extension
+    (MemberFilter(types=(".TXV",)), "A.SPM", 16, ".TXV", False, True),
+    (MemberFilter(min_size=16), "A.SPM", 15, None, False, False),
+    (MemberFilter(max_size=16), "A.SPM", 16, None, False, True),
+    (MemberFilter(max_size=0), "A.SPM", 1, None, False, False),
+    # Containers are kept to reach their members, unless excluded
+    (MemberFilter(types=(".SPM",), max_size=0), "B", 1024, None, True, True),
+    (MemberFilter(types=(".SPM",)), "B.FPS4", 1024, None, False, True),
+    (MemberFilter(include=("A*",), exclude=("*.SPM",)), "A.SPM", 16, None, False, False),
+    (MemberFilter(exclude=("B*",)), "B", 1024, None, True, False),
+])
+def test_is_wanted(member_filter, name, size, member_type, is_container, expected):
+    assert member_filter.is_wanted(name, size, member_type, is_container) is expected
+
+
+def test_get_stage():
+    assert MemberFilter().get_stage("dec") == "dec"
+    # Package globs don't change the members extracted from a DEC
+    assert MemberFilter(packages=("CH*",)).get_stage("dec") == "dec"
+    assert MemberFilter(types=(".SPM",)).get_stage("svo", packages=True) == "svo"
+    assert MemberFilter(types=("spm",)).get_stage("dec") == MemberFilter(types=(".SPM",)).get_stage("dec")
+    assert MemberFilter(max_size=0).get_stage("dec") != "dec"
+    assert MemberFilter(include=("A*",)).get_stage("dec") != MemberFilter(exclude=("A*",)).get_stage("dec")
+
+
+def test_parse_svo_packages(tmp_path, get_files):
+    dat = build_tlzc(build_fps4([("A.SPM", b"\x01" * 16)]))
+    svo_path = tmp_path / "PACK00.SVO"
+    svo_path.write_bytes(build_svo([(f"CH00_00{idx}.DAT", dat) for idx in range(3)]))
+    member_filter = MemberFilter(packages=("CH00_001*",))
+
+    parse_svo(str(svo_path), member_filter=member_filter)
+    assert list(get_files(tmp_path / "PACK00")) == ["CH00_001.DAT"]
+    dat_path = tmp_path / "PACK00" / "CH00_001.DAT"
+    assert dat_path.read_bytes() == dat
+
+    # Skipped on rerun with the same filter only
+    dat_path.write_bytes(b"")
+    parse_svo(str(svo_path), member_filter=member_filter)
+    assert dat_path.read_bytes() == b""
+    parse_svo(str(svo_path))
+    assert list(get_files(tmp_path / "PACK00")) == ["CH00_000.DAT", "CH00_001.DAT", "CH00_002.DAT"]
+    assert dat_path.read_bytes() == dat
+
+
+@pytest.mark.parametrize("recursive, expected", [
+    # Nested containers are written as is, for parse_dec_ext
+    (False, ["0000.SPM", "0003.FPS4"]),
+    (True, ["0000.SPM", "0003.FPS4.ext/NEST.FPS4.ext/D.SPM.SPM"]),
+])
+def test_parse_dec_members(dec_path, get_files, recursive, expected):
+    # Members are matched by the name they are written as
+    member_filter = MemberFilter(types=(".SPM",), exclude=("0004*",))
+
+    assert parse_dec(str(dec_path), recursive=recursive, member_filter=member_filter) is not None
+    assert list(get_files(dec_path.parent / "PACK.DAT.dec.ext")) == expected
+    assert parse_dec(str(dec_path), recursive=recursive, member_filter=member_filter) is None
+    assert parse_dec(str(dec_path), recursive=recursive) is not None
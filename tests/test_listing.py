@@ -0,0 +1,50 @@
+import pytest
+
+from benchmarks.synthetic import build_tlzc
+from parsers.parser import list_container, parse_dec
+from utils.filters import CONTAINER_TYPES, MemberFilter
+
+
+def test_list_dec(dec_path, dec_content):
+    listing = list_container(str(dec_path), recursive=True)
+    assert [(entry.name, entry.type, entry.depth) for entry in listing.entries] == [
+        ("A.SPM", ".SPM", 0),
+        ("A.SPV", ".SPV", 0),
+        ("T.TXV", ".TXV", 0),
+        ("B", ".FPS4", 0),
+        ("I.TXM", ".TXM", 1),
+        ("I.TXV", ".TXV", 1),
+        ("NEST", ".FPS4", 1),
+        ("D.SPM", ".SPM", 2),
+        ("D.SPV", ".SPV", 2),
+        ("C", ".TLZC", 0),
+        # Only the head of a TLZC is decompressed, its members have no type
+        ("D.SPM", None, 1),
+        ("D.SPV", None, 1),
+    ]
+    entry = listing.entries[2]
+    assert dec_content[entry.offset:entry.offset + 4] == b"DDS "
+
+
+def test_list_dat(tmp_path, dec_content):
+    dat_path = tmp_path / "PACK.DAT"
+    dat_path.write_bytes(build_tlzc(dec_content))
+    listing = list_container(str(dat_path))
+    assert listing.real_size == len(dec_content)
+    assert [entry.name for entry in listing.entries] == ["A.SPM", "A.SPV", "T.TXV", "B", "C"]
+
+
+@pytest.mark.parametrize("member_type", [".SPM", ".SPV", ".TXV"])
+def test_listed_types_filter(dec_path, get_files, member_type):
+    listed = [
+        entry for entry in list_container(str(dec_path)).entries
+        if entry.type == member_type
+    ]
+    assert listed
+
+    parse_dec(str(dec_path), member_filter=MemberFilter(types=(member_type,)))
+    extracted = [
+        path for path in get_files(dec_path.parent / "PACK.DAT.dec.ext").values()
+        if path.suffix not in CONTAINER_TYPES and path.suffix
+    ]
+    assert [path.suffix for path in extracted] == [member_type] * len(listed)
@@ -0,0 +1,67 @@
+import json
+import multiprocessing
+import threading
+
+from utils.manifest import MANIFEST_NAME, Manifest
+
+JOBS = 12
+RECORDS_PER_JOB = 5
+
+
+def record_inputs(dir_path: str, job: int):
+    for idx in range(RECORDS_PER_JOB):
+        input_path = f"{dir_path}/INPUT_{job:02}_{idx}.DAT"
+        with open(input_path, "wb") as f:
+            f.write(b"TLZC")
+        Manifest(dir_path).record("dat", [input_path], [])
+
+
+def get_entries(dir_path) -> dict:
+    with open(dir_path / MANIFEST_NAME) as f:
+        return json.load(f)["entries"]
+
+
+def test_skip_unchanged(tmp_path):
+    input_path = tmp_path / "PACKAGE.DAT"
+    output_path = tmp_path / "PACKAGE.DAT.dec"
+    input_path.write_bytes(b"TLZC")
+    output_path.write_bytes(b"FPS4")
+
+    manifest = Manifest(tmp_path)
+    assert not manifest.is_up_to_date("dat", [input_path])
+    manifest.record("dat", [input_path], [output_path])
+    assert Manifest(tmp_path).is_up_to_date("dat", [input_path])
+
+    output_path.unlink()
+    assert not Manifest(tmp_path).is_up_to_date("dat", [input_path])
+    # Nothing but the manifest is left in the output directory
+    assert sorted(path.name for path in tmp_path.iterdir()) == [MANIFEST_NAME, "PACKAGE.DAT"]
+
+
+def test_concurrent_processes(tmp_path):
+    context = multiprocessing.get_context()
+    processes = [
+        context.Process(target=record_inputs, args=(str(tmp_path), job))
+        for job in range(JOBS)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert len(get_entries(tmp_path)) == JOBS * RECORDS_PER_JOB
+
+
+def test_concurrent_threads(tmp_path):
+    threads = [
+        threading.Thread(target=record_inputs, args=(str(tmp_path), job))
+        for job in range(JOBS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(get_entries(tmp_path)) == JOBS * RECORDS_PER_JOB
+    assert not list(tmp_path.glob(f"{MANIFEST_NAME}.*.*"))
@@ -0,0 +1,60 @@
+import threading
+from collections.abc import Sized
+from dataclasses import make_dataclass
+
+import pytest
+
+from utils import memory
+
+THREADS = 4
+
+
+@pytest.fixture
+def profiling():
+    memory.enable(top_sites=3)
+    yield
+    memory.disable()
+    memory.reset()
+
+
+def open_spans(barrier: threading.Barrier, depths: list):
+    with memory.span("outer"):
+        # Every thread has its outer span open before nesting
+        barrier.wait()
+        with memory.span("inner"):
+            depths.append(len(memory.get_stack()))
+            barrier.wait()
+    depths.append(len(memory.get_stack()))
+
+
+def test_spans_nest_per_thread(profiling):
+    barrier = threading.Barrier(THREADS)
+    depths = []
+    threads = [threading.Thread(target=open_spans, args=(barrier, depths)) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(depths) == [0] * THREADS + [2] * THREADS
+    stages = [record.stage for record in memory.get_records()]
+    assert stages.count("outer") == THREADS
+    assert stages.count("inner") == THREADS
+
+
+def test_retained_sites(profiling):
+    with memory.span("dec") as record:
+        retained = [bytearray(1 << 20) for _ in range(4)]
+    assert retained
+    assert record.retained >= 4 << 20
+    assert record.retained_sites[0].filename == __file__
+    assert "Top retained allocation sites of dec" in memory.format_summary([record])
+
+
+def test_retained_sites_generated_code(profiling):
+    with memory.span("ext") as record:
+        # Methods compiled from strings, classes registered in abc caches
+        classes = [make_dataclass(f"Record{idx}", ["a", "b"]) for idx in range(32)]
+        retained = [issubclass(cls, Sized) for cls in classes]
+    assert retained
+    assert [site.filename for site in record.retained_sites if site.filename.startswith("<")] == []
@@ -0,0 +1,32 @@
+from parsers.models import Mesh, Node
+from utils import instrument
+from utils.meshes import write_to_obj
+
+
+def build_mesh(name: str) -> Mesh:
+    mesh = Mesh()
+    mesh.name = name
+    mesh.vertPosList = [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]
+    mesh.vertNormList = [[0.0, 0.0, 1.0]] * 3
+    mesh.vertUVList = [[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]]
+    mesh.triangleList = [{"group": 0, "triangle": [0, 1, 2]}]
+    return mesh
+
+
+def test_write_to_obj_bytes_out(tmp_path, monkeypatch):
+    written = []
+    monkeypatch.setattr(
+        instrument,
+        "add",
+        lambda bytes_in=0, bytes_out=0, items=0: written.append(bytes_out),
+    )
+
+    node = Node()
+    node.name = "PACKAGE"
+    node.data["mesh_list"] = [[build_mesh("BODY")]]
+    # Single submesh lists are appended to the OBJ of the same name
+    write_to_obj(node, str(tmp_path))
+    write_to_obj(node, str(tmp_path))
+
+    obj_size = (tmp_path / "PACKAGE" / "BODY.obj").stat().st_size
+    assert written == [obj_size // 2, obj_size // 2]
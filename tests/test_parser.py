@@ -0,0 +1,58 @@
+import filecmp
+
+import pytest
+
+from benchmarks.synthetic import (
+    LAYOUT_BG,
+    LAYOUT_SKINNED,
+    LAYOUT_UNSKINNED,
+    build_spm_spv,
+)
+from parsers.models import Node
+from parsers.parser import parse_mesh
+from utils.meshes import face_creation, write_to_obj
+
+MESH_ATTRIBUTES = ("name", "vertPosList", "vertNormList", "vertUVList", "triangleList")
+
+
+@pytest.fixture(params=[LAYOUT_SKINNED, LAYOUT_UNSKINNED, LAYOUT_BG])
+def spm_path(request, tmp_path) -> str:
+    spm, spv = build_spm_spv(layout=request.param, meshes=3, vertices=16)
+    (tmp_path / "PACKAGE.SPM").write_bytes(spm)
+    (tmp_path / "PACKAGE.SPV").write_bytes(spv)
+    return str(tmp_path / "PACKAGE.SPM")
+
+
+def export_mesh(spm_path: str, output_path, **kwargs) -> Node:
+    node = Node()
+    parse_mesh(spm_path, node, **kwargs)
+    face_creation(node)
+    write_to_obj(node, str(output_path))
+    return node
+
+
+def get_meshes(node: Node) -> list:
+    return [
+        [tuple(getattr(mesh, attribute) for attribute in MESH_ATTRIBUTES) for mesh in mesh_list]
+        for mesh_list in node.data["mesh_list"]
+    ]
+
+
+def assert_same_export(spm_path: str, tmp_path, **kwargs):
+    eager = export_mesh(spm_path, tmp_path / "eager")
+    node = export_mesh(spm_path, tmp_path / "other", **kwargs)
+    assert get_meshes(node) == get_meshes(eager)
+    comparison = filecmp.dircmp(tmp_path / "eager" / "PACKAGE", tmp_path / "other" / "PACKAGE")
+    assert comparison.left_list == comparison.right_list
+    _, mismatch, errors = filecmp.cmpfiles(
+        comparison.left, comparison.right, comparison.common_files, shallow=False,
+    )
+    assert not mismatch and not errors
+
+
+def test_parse_mesh_lazy(spm_path, tmp_path):
+    assert_same_export(spm_path, tmp_path, lazy=True)
+
+
+def test_parse_mesh_workers(spm_path, tmp_path):
+    assert_same_export(spm_path, tmp_path, workers=2)
@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from benchmarks.synthetic import build_spm_spv
+from utils import shared
+from utils.batch import export_meshes
+
+SHM_PATH = "/dev/shm"
+
+pytestmark = pytest.mark.skipif(not os.path.isdir(SHM_PATH), reason="Shared blocks aren't listed in /dev/shm")
+
+
+def get_blocks() -> set:
+    return set(os.listdir(SHM_PATH))
+
+
+def read(handle: shared.SharedBufferHandle) -> bytes:
+    data = bytes(shared.attach(handle))
+    shared.detach(handle)
+    return data
+
+
+def publish(data: bytes) -> shared.SharedBufferHandle:
+    return shared.publish([data[:2], data[2:]])
+
+
+def test_registry_references():
+    blocks = get_blocks()
+    with shared.SharedBufferRegistry() as registry:
+        handle = registry.put(b"\x01\x02\x03\x04", references=2)
+        assert bytes(registry.view(handle.slice(1, 2))) == b"\x02\x03"
+        registry.release(handle)
+        assert read(handle) == b"\x01\x02\x03\x04"
+        registry.release(handle)
+        assert not len(registry)
+        with pytest.raises(FileNotFoundError):
+            shared.open_block(handle.name)
+    assert get_blocks() == blocks
+
+
+def test_registry_workers():
+    blocks = get_blocks()
+    with shared.SharedBufferRegistry() as registry:
+        handle = registry.put(b"\x01\x02\x03\x04")
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(read, handle).result() == b"\x01\x02\x03\x04"
+            published = executor.submit(publish, b"\x05\x06\x07").result()
+        # Neither is unlinked when the worker exits
+        assert read(handle) == b"\x01\x02\x03\x04"
+        registry.adopt(published)
+        assert bytes(registry.view(published)) == b"\x05\x06\x07"
+        registry.release(published)
+        assert len(registry) == 1
+    assert get_blocks() == blocks
+
+
+def test_export_meshes_interrupted(tmp_path):
+    for idx in range(3):
+        spm, spv = build_spm_spv(meshes=1, vertices=8)
+        (tmp_path / f"PACKAGE_{idx}.SPM").write_bytes(spm)
+        (tmp_path / f"PACKAGE_{idx}.SPV").write_bytes(spv)
+
+    def on_result(result):
+        raise KeyboardInterrupt
+
+    blocks = get_blocks()
+    with pytest.raises(KeyboardInterrupt):
+        export_meshes(str(tmp_path), str(tmp_path / "output"), workers=2, on_result=on_result)
+    # The blocks published for the results never collected are unlinked
+    assert get_blocks() == blocks
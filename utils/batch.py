@@ -0,0 +1,531 @@
+"""Vesperia Tools Batch Mesh Export.
+
+Decode every SPM/SPV pair under a directory tree in a process pool and
+write them as Wavefront OBJ (or GLB with trimesh) in the parent process.
+
+Workers send their meshes back packed as raw arrays instead of pickled
+Mesh objects, which is far smaller and faster to transfer than lists of
+tuples. With shared memory (the default) the packed arrays are written to
+a shared block and only its handle is pickled, the parent reads the
+arrays in place and unlinks the block once the package is written.
+
+Usage example:
+
+    from utils.batch import export_meshes, format_report
+
+    report = export_meshes("path/to/Data64", "path/to/output", workers=8)
+    print(format_report(report))
+
+"""
+import logging
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    List,
+    NamedTuple,
+    Sequence,
+    Tuple,
+)
+
+from parsers.models import Mesh, Node
+from utils import instrument, shared
+from utils.manifest import Manifest
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_OBJ = "obj"
+FORMAT_GLB = "glb"
+EXPORT_FORMATS = (FORMAT_OBJ, FORMAT_GLB)
+
+PACK_MAGIC = b"VTMB"
+# Magic, submesh count
+PACK_HEADER = struct.Struct("<4sI")
+# Mesh list index, name size, vertex, normal, UV and face counts
+PACK_MESH_HEADER = struct.Struct("<6I")
+
+
+class PackedMesh(NamedTuple):
+    mesh_list_idx: int
+    name: str
+    vertices: "np.ndarray"
+    normals: "np.ndarray"
+    uvs: "np.ndarray"
+    faces: "np.ndarray"
+
+
+@dataclass
+class PackageResult:
+    spm_path: str
+    data: bytes = b""
+    handle: shared.SharedBufferHandle = None
+    error: str = ""
+    decode_time: float = 0.0
+
+
+@dataclass
+class BatchReport:
+    packages: int = 0
+    exported: int = 0
+    skipped: int = 0
+    meshes: int = 0
+    vertices: int = 0
+    triangles: int = 0
+    wall_time: float = 0.0
+    failures: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def discover_spm_files(
+        root_path: str,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+) -> List[str]:
+    """Find every SPM with its SPV under a directory tree.
+
+    Parameters
+    ----------
+    root_path : str
+        Directory to search or a single SPM file
+    include : list of str
+        Only keep SPM whose file name matches one of these globs
+    exclude : list of str
+        Drop SPM whose file name matches one of these globs
+
+    Returns
+    -------
+    list of str
+
+    """
+    # Imported here to share the CLI's glob matching
+    from utils.pipeline import match_globs
+
+    root_path = Path(root_path)
+    candidates = [root_path] if root_path.is_file() else sorted(root_path.rglob("*"))
+    spm_files = []
+    for file_path in candidates:
+        if file_path.suffix.upper() != ".SPM" or not file_path.is_file():
+            continue
+        if not file_path.with_suffix(".SPV").is_file():
+            logger.warning(f"Skipped {file_path.name} as its SPV is missing.")
+            continue
+        if exclude and match_globs(file_path.name, exclude):
+            continue
+        if include and not match_globs(file_path.name, include):
+            continue
+        spm_files.append(str(file_path))
+    return spm_files
+
+
+def pack_node_chunks(node: Node) -> List[bytes]:
+    """Pack the decoded meshes of a Node as raw array chunks.
+
+    Vertices and normals are stored as float32, as read from the SPM.
+    UVs are float64 as they are flipped (1.0 - v) after reading. Faces are
+    int32 (group, a, b, c).
+
+    Parameters
+    ----------
+    node : Node
+        Node with parsed meshes and created faces
+
+    Returns
+    -------
+    list of bytes
+        Chunks to write one after the other
+
+    """
+    meshes = [
+        (mesh_list_idx, mesh)
+        for mesh_list_idx, mesh_list in enumerate(node.data["mesh_list"])
+        for mesh in mesh_list
+    ]
+    # Imported here as numpy is slow to import and only needed for packing
+    import numpy as np
+
+    chunks = [PACK_HEADER.pack(PACK_MAGIC, len(meshes))]
+    for mesh_list_idx, mesh in meshes:
+        name = str(mesh.name).encode()
+        vertices = np.asarray(mesh.vertPosList, dtype="<f4").reshape(-1, 3)
+        normals = np.asarray(mesh.vertNormList, dtype="<f4").reshape(-1, 3)
+        uvs = np.asarray(mesh.vertUVList, dtype="<f8").reshape(-1, 2)
+        faces = np.array(
+            [[face["group"], *face["triangle"]] for face in mesh.triangleList],
+            dtype="<i4",
+        ).reshape(-1, 4)
+        chunks.append(PACK_MESH_HEADER.pack(
+            mesh_list_idx, len(name), len(vertices), len(normals), len(uvs), len(faces),
+        ))
+        chunks.append(name)
+        chunks.extend(array.tobytes() for array in (vertices, normals, uvs, faces))
+    return chunks
+
+
+def unpack_meshes(data) -> List[PackedMesh]:
+    """Unpack meshes packed by pack_node_chunks without copying the arrays.
+
+    Parameters
+    ----------
+    data : bytes or memoryview
+        The arrays keep a reference to it
+
+    Returns
+    -------
+    list of PackedMesh
+
+    """
+    # Imported here as numpy is slow to import and only needed for unpacking
+    import numpy as np
+
+    magic, count = PACK_HEADER.unpack_from(data, 0)
+    if magic != PACK_MAGIC:
+        raise ValueError(f"Invalid packed meshes magic {magic!r}")
+    offset = PACK_HEADER.size
+    meshes = []
+    for _ in range(count):
+        mesh_list_idx, name_size, vertices, normals, uvs, faces = PACK_MESH_HEADER.unpack_from(data, offset)
+        offset += PACK_MESH_HEADER.size
+        name = bytes(data[offset:offset + name_size]).decode()
+        offset += name_size
+        arrays = []
+        for dtype, rows, columns in (
+                ("<f4", vertices, 3),
+                ("<f4", normals, 3),
+                ("<f8", uvs, 2),
+                ("<i4", faces, 4),
+        ):
+            array = np.frombuffer(data, dtype=dtype, count=rows * columns, offset=offset)
+            arrays.append(array.reshape(rows, columns))
+            offset += array.nbytes
+        meshes.append(PackedMesh(mesh_list_idx, name, *arrays))
+    return meshes
+
+
+def to_node(name: str, meshes: Sequence[PackedMesh]) -> Node:
+    """Rebuild a Node from unpacked meshes for the OBJ writer.
+
+    Parameters
+    ----------
+    name : str
+        Package name
+    meshes : list of PackedMesh
+
+    Returns
+    -------
+    Node
+
+    """
+    node = Node()
+    node.name = name
+    mesh_lists = []
+    for packed in meshes:
+        while len(mesh_lists) <= packed.mesh_list_idx:
+            mesh_lists.append([])
+        mesh = Mesh()
+        mesh.name = packed.name
+        mesh.vertPosList = packed.vertices.tolist()
+        mesh.vertNormList = packed.normals.tolist()
+        mesh.vertUVList = packed.uvs.tolist()
+        mesh.triangleList = [
+            {"group": group, "triangle": [a, b, c]}
+            for group, a, b, c in packed.faces.tolist()
+        ]
+        mesh_lists[packed.mesh_list_idx].append(mesh)
+    node.data["mesh_list"] = mesh_lists
+    return node
+
+
+def decode_package(spm_path: str, shared_memory=False, mesh_cache_path: str = None) -> PackageResult:
+    """Parse an SPM/SPV pair and create its faces in a worker process.
+
+    Parameters
+    ----------
+    spm_path : str
+    shared_memory : bool
+        Publish the packed meshes in a shared block instead of returning
+        them as bytes. The caller must adopt the handle. Default False.
+    mesh_cache_path : str or None
+        Load the decoded meshes from (and store them in) this mesh cache. Default None.
+
+    Returns
+    -------
+    PackageResult
+        Packed meshes, or the error which stopped the parsing
+
+    """
+    # Imported here so the parent process doesn't pay for the parsers
+    from utils.mesh_cache import MeshCache, load_node
+
+    start = time.perf_counter()
+    try:
+        node = load_node(spm_path, cache=MeshCache(mesh_cache_path) if mesh_cache_path else None)
+        chunks = pack_node_chunks(node)
+        if shared_memory:
+            result = PackageResult(spm_path, handle=shared.publish(chunks))
+        else:
+            result = PackageResult(spm_path, data=b"".join(chunks))
+    except Exception as e:
+        logger.debug(f"Decoding {spm_path} failed", exc_info=True)
+        return PackageResult(spm_path, error=repr(e))
+    result.decode_time = time.perf_counter() - start
+    return result
+
+
+def write_obj(spm_path: str, meshes: Sequence[PackedMesh], output_path: str) -> List[str]:
+    """Write unpacked meshes as split and joined Wavefront OBJ files.
+
+    Parameters
+    ----------
+    spm_path : str
+    meshes : list of PackedMesh
+    output_path : str
+        Output directory, a directory per package is created in it
+
+    Returns
+    -------
+    list of str
+        Written OBJ files
+
+    """
+    from utils.exporter import join_obj_files
+    from utils.meshes import write_to_obj
+
+    name = Path(spm_path).stem
+    exported_obj_path = write_to_obj(to_node(name, meshes), output_path)
+    join_obj_files(exported_obj_path)
+    return [
+        os.path.join(exported_obj_path, file_name)
+        for file_name in os.listdir(exported_obj_path)
+        if file_name.endswith(".obj")
+    ]
+
+
+def write_glb(spm_path: str, meshes: Sequence[PackedMesh], output_path: str) -> List[str]:
+    """Write unpacked meshes as a binary glTF scene.
+
+    Requires trimesh.
+
+    Parameters
+    ----------
+    spm_path : str
+    meshes : list of PackedMesh
+    output_path : str
+        Output directory, a directory per package is created in it
+
+    Returns
+    -------
+    list of str
+        Written GLB file
+
+    """
+    # Imported here as trimesh is slow to import and only needed for GLB
+    import trimesh
+
+    name = Path(spm_path).stem
+    package_dir_path = os.path.join(output_path, name)
+    os.makedirs(package_dir_path, exist_ok=True)
+    scene = trimesh.Scene()
+    for idx, packed in enumerate(meshes):
+        if not len(packed.vertices) or not len(packed.faces):
+            continue
+        visual = None
+        if len(packed.uvs) == len(packed.vertices):
+            visual = trimesh.visual.TextureVisuals(uv=packed.uvs)
+        normals = packed.normals if len(packed.normals) == len(packed.vertices) else None
+        scene.add_geometry(
+            trimesh.Trimesh(
+                vertices=packed.vertices,
+                faces=packed.faces[:, 1:],
+                vertex_normals=normals,
+                visual=visual,
+                process=False,
+            ),
+            node_name=f"{packed.name}_{idx}",
+        )
+    glb_path = os.path.join(package_dir_path, f"{name}.glb")
+    scene.export(glb_path, file_type="glb")
+    return [glb_path]
+
+
+WRITERS = {
+    FORMAT_OBJ: write_obj,
+    FORMAT_GLB: write_glb,
+}
+
+
+def export_meshes(
+        root_path: str,
+        output_path: str,
+        workers: int = 1,
+        export_format: str = FORMAT_OBJ,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        force=False,
+        on_result: Callable[[PackageResult], None] = None,
+        shared_memory=True,
+        mesh_cache_path: str = None,
+) -> BatchReport:
+    """Export every SPM/SPV pair under a directory tree.
+
+    Packages are decoded in worker processes and written in this process
+    as their results arrive. A package failing to decode or write is
+    logged and reported, the others are still exported.
+
+    Parameters
+    ----------
+    root_path : str
+        Directory to search or a single SPM file
+    output_path : str
+        Output directory, a directory per package is created in it
+    workers : int
+        Number of worker processes. 1 decodes in the current process.
+    export_format : str
+        FORMAT_OBJ or FORMAT_GLB. Default FORMAT_OBJ.
+    include : list of str
+        Only export SPM whose file name matches one of these globs
+    exclude : list of str
+        Skip SPM whose file name matches one of these globs
+    force : bool
+        Export even if the manifest reports the package as unchanged. Default False.
+    on_result : callable or None
+        Called with every decoded or failed package.
+    shared_memory : bool
+        Transfer the packed meshes of worker processes through shared
+        memory instead of pickled bytes. Default True.
+    mesh_cache_path : str or None
+        Load the decoded meshes from (and store them in) this mesh cache. Default None.
+
+    Returns
+    -------
+    BatchReport
+
+    """
+    writer = WRITERS[export_format]
+    # Shares the "obj" manifest stage with export_wavefront_obj
+    stage = export_format
+    report = BatchReport()
+    start = time.perf_counter()
+
+    spm_files = []
+    for spm_path in discover_spm_files(root_path, include, exclude):
+        package_name = Path(spm_path).stem
+        manifest = Manifest(os.path.join(output_path, package_name))
+        input_paths = [spm_path, str(Path(spm_path).with_suffix(".SPV"))]
+        if not force and manifest.is_up_to_date(stage, input_paths):
+            logger.info(f"Skipped exporting {package_name} as it is unchanged.")
+            report.skipped += 1
+            continue
+        spm_files.append(spm_path)
+    report.packages = len(spm_files) + report.skipped
+
+    def collect(result: PackageResult):
+        if on_result:
+            on_result(result)
+        if result.error:
+            logger.error(f"Failed to decode {result.spm_path}: {result.error}")
+            report.failures.append((result.spm_path, result.error))
+            return
+        adopted = False
+        try:
+            if result.handle:
+                registry.adopt(result.handle)
+                adopted = True
+            data = registry.view(result.handle) if result.handle else result.data
+            meshes = unpack_meshes(data)
+            with instrument.span(f"write_{export_format}", file=os.path.basename(result.spm_path)):
+                written_paths = writer(result.spm_path, meshes, output_path)
+            mesh_count = len(meshes)
+            vertex_count = sum(len(mesh.vertices) for mesh in meshes)
+            triangle_count = sum(len(mesh.faces) for mesh in meshes)
+        except Exception as e:
+            logger.exception(f"Failed to write {result.spm_path}")
+            report.failures.append((result.spm_path, repr(e)))
+            return
+        finally:
+            # The arrays are views of the shared block
+            data = meshes = None
+            if adopted:
+                registry.release(result.handle)
+        package_name = Path(result.spm_path).stem
+        Manifest(os.path.join(output_path, package_name)).record(
+            stage,
+            [result.spm_path, str(Path(result.spm_path).with_suffix(".SPV"))],
+            written_paths,
+        )
+        report.exported += 1
+        report.meshes += mesh_count
+        report.vertices += vertex_count
+        report.triangles += triangle_count
+        logger.info(f"Exported {package_name} in {result.decode_time:.2f}s")
+
+    if workers <= 1:
+        for spm_path in spm_files:
+            collect(decode_package(spm_path, mesh_cache_path=mesh_cache_path))
+    else:
+        # Unlinks the blocks of results left over by an interrupted run
+        registry = shared.SharedBufferRegistry()
+        with registry:
+            pending = {}
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    pending = {
+                        executor.submit(decode_package, spm_path, shared_memory, mesh_cache_path): spm_path
+                        for spm_path in spm_files
+                    }
+                    for future in as_completed(pending):
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            # Worker process died
+                            result = PackageResult(pending[future], error=repr(e))
+                        collect(result)
+                        del pending[future]
+            finally:
+                # The executor waited for the remaining jobs, adopt the
+                # blocks published for results never collected
+                for future in pending:
+                    if not future.done() or future.cancelled() or future.exception():
+                        continue
+                    handle = future.result().handle
+                    if handle:
+                        try:
+                            registry.adopt(handle)
+                        except FileNotFoundError:
+                            # Released before the run was interrupted
+                            pass
+
+    report.wall_time = time.perf_counter() - start
+    return report
+
+
+def format_report(report: BatchReport) -> str:
+    """Format a batch export report as plain text.
+
+    Parameters
+    ----------
+    report : BatchReport
+
+    Returns
+    -------
+    str
+
+    """
+    wall_time = report.wall_time or float("inf")
+    lines = [
+        f"Packages: {report.packages} ({report.exported} exported, "
+        f"{report.skipped} unchanged, {len(report.failures)} failed)",
+        f"Meshes: {report.meshes} ({report.meshes / wall_time:.1f}/s)",
+        f"Vertices: {report.vertices} ({report.vertices / wall_time:.0f}/s)",
+        f"Triangles: {report.triangles} ({report.triangles / wall_time:.0f}/s)",
+        f"Wall time: {report.wall_time:.2f}s",
+    ]
+    for spm_path, error in report.failures:
+        lines.append(f"FAILED {spm_path}: {error}")
+    return "\n".join(lines)
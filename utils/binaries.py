@@ -1,9 +1,22 @@
 import array
 import logging
+import re
 import struct
+from collections import deque
+from typing import (
+    Dict,
+    Iterable,
+)
 
 logger = logging.getLogger(__name__)
 
+# Bytes read past the last string offset of a string table. Longer strings
+# are completed by a regular BinaryReader.find.
+STRING_TABLE_MAX_LENGTH = 256
+
+# Reads kept by a tracing BinaryUnpacker
+UNPACKER_TRACE_SIZE = 1000
+
 
 def half_to_float(h):
     s = int((h >> 15) & 0x00000001)  # sign
@@ -36,107 +49,338 @@ def convert_half_to_float(h):
     return struct.unpack('f', structure)[0]
 
 
+def decode_half(data: bytes, endian: str = '<'):
+    """Decode IEEE 754 half floats in bulk.
+
+    Same values as convert_half_to_float per element, including
+    subnormals, infinities and NaN.
+
+    Parameters
+    ----------
+    data : bytes
+    endian : str
+        '<' or '>'. Default '<'.
+
+    Returns
+    -------
+    numpy.ndarray
+        float32 array
+
+    """
+    # Imported here as numpy is slow to import and only needed for compressed data
+    import numpy as np
+
+    return np.frombuffer(data, dtype=endian + 'f2').astype(np.float32)
+
+
+def decode_fixed_point(data: bytes, endian: str = '<', h: str = 'h', exp: int = 12):
+    """Decode fixed-point shorts in bulk.
+
+    Parameters
+    ----------
+    data : bytes
+    endian : str
+        '<' or '>'. Default '<'.
+    h : str
+        'h' for signed or 'H' for unsigned shorts. Default 'h'.
+    exp : int
+        Number of fractional bits, values are scaled by 2 ** -exp. Default 12.
+
+    Returns
+    -------
+    numpy.ndarray
+        float64 array
+
+    """
+    # Imported here as numpy is slow to import and only needed for compressed data
+    import numpy as np
+
+    return np.frombuffer(data, dtype=endian + h).astype(np.float64) * 2.0 ** -exp
+
+
+def check_short_buffer(data, n: int, name: str):
+    """Raise struct.error, as struct.unpack does, if data doesn't hold n 16-bit values."""
+    if len(data) != n * 2:
+        raise struct.error(f"{name} requires a buffer of {n * 2} bytes (actual buffer size is {len(data)})")
+
+
+def xor_bytes(data: bytes, key: bytes, offset: int = 0) -> bytes:
+    """XOR data with a repeating key in one big integer operation.
+
+    Parameters
+    ----------
+    data : bytes
+    key : bytes
+    offset : int
+        Key offset of the first byte of data. Default 0.
+
+    Returns
+    -------
+    bytes
+
+    """
+    size = len(data)
+    if not size:
+        return b""
+    offset %= len(key)
+    rotated_key = key[offset:] + key[:offset]
+    stream = (rotated_key * (size // len(key) + 1))[:size]
+    return (int.from_bytes(data, "little") ^ int.from_bytes(stream, "little")).to_bytes(size, "little")
+
+
 class BinaryUnpacker():
+    """In-memory counterpart of BinaryReader.
+
+    Reads with struct.unpack_from on a memoryview of the buffer, so reads
+    don't copy slices of it. Parsers written against BinaryReader (e.g.
+    parse_fps4) can run over a buffer already in memory, such as a
+    decompressed DAT.
+
+    Parameters
+    ----------
+    data : bytes or bytearray
+    log : bool or int or None
+        Record (offset, type, values) of every read in a ring buffer,
+        True for UNPACKER_TRACE_SIZE entries or an int for a custom size.
+        Default None (disabled).
+
+    """
+
     def __init__(self, data, log=None):
         self.endian = '<'
         self.offset = 0
         self.data = data
+        self.view = memoryview(data)
         self.len = len(data) - self.offset
-        self.log = True
-        self.logData = ""
-
-    def q(self, n):
-        data = struct.unpack(self.endian + n * 'q', self.data[self.offset:self.offset + (n * 8)])
+        self.log = bool(log)
+        self.trace = None
+        if log:
+            self.trace = deque(maxlen=UNPACKER_TRACE_SIZE if log is True else log)
+
+    @property
+    def logData(self) -> str:
+        if not self.trace:
+            return ""
+        return "".join(f"{offset} {type} {data}\n" for offset, type, data in self.trace)
+
+    def unpack_from(self, type, n, size):
+        data = struct.unpack_from(f"{self.endian}{n}{type}", self.view, self.offset)
         if self.log:
-            self.logData += str(self.offset) + ' ' + str(data) + '\n'
-        self.offset += n * 8
+            self.trace.append((self.offset, type, data))
+        self.offset += n * size
         return data
 
+    def q(self, n):
+        return self.unpack_from('q', n, 8)
+
     def i(self, n):
-        data = struct.unpack(self.endian + n * 'i', self.data[self.offset:self.offset + (n * 4)])
-        if self.log:
-            self.logData += str(self.offset) + ' ' + str(data) + '\n'
-        self.offset += n * 4
-        return data
+        return self.unpack_from('i', n, 4)
 
     def I(self, n):
-        data = struct.unpack(self.endian + n * 'I', self.data[self.offset:self.offset + (n * 4)])
-        if self.log:
-            self.logData += str(self.offset) + ' ' + str(data) + '\n'
-        self.offset += n * 4
-        return data
+        return self.unpack_from('I', n, 4)
 
     def B(self, n):
-        data = struct.unpack(self.endian + n * 'B', self.data[self.offset:self.offset + (n * 1)])
-        if self.log:
-            self.logData += str(self.offset) + ' ' + str(data) + '\n'
-        self.offset += n * 1
-        return data
+        return self.unpack_from('B', n, 1)
 
     def b(self, n):
-        data = struct.unpack(self.endian + n * 'b', self.data[self.offset:self.offset + (n * 1)])
-        if self.log:
-            self.logData += str(self.offset) + ' ' + str(data) + '\n'
-        self.offset += n * 1
-        return data
+        return self.unpack_from('b', n, 1)
 
     def h(self, n):
-        data = struct.unpack(self.endian + n * 'h', self.data[self.offset:self.offset + (n * 2)])
-        if self.log:
-            self.logData += str(self.offset) + ' ' + str(data) + '\n'
-        self.offset += n * 2
-        return data
+        return self.unpack_from('h', n, 2)
 
     def H(self, n):
-        data = struct.unpack(self.endian + n * 'H', self.data[self.offset:self.offset + (n * 2)])
-        if self.log:
-            self.logData += str(self.offset) + ' ' + str(data) + '\n'
-        self.offset += n * 2
-        return data
+        return self.unpack_from('H', n, 2)
 
     def f(self, n):
-        data = struct.unpack(self.endian + n * 'f', self.data[self.offset:self.offset + (n * 4)])
-        if self.log:
-            self.logData += str(self.offset) + ' ' + str(data) + '\n'
-        self.offset += n * 4
-        return data
+        return self.unpack_from('f', n, 4)
 
     def d(self, n):
-        data = struct.unpack(self.endian + n * 'd', self.data[self.offset:self.offset + (n * 8)])
-        if self.log:
-            self.logData += str(self.offset) + ' ' + str(data) + '\n'
-        self.offset += n * 8
+        return self.unpack_from('d', n, 8)
+
+    def shorts(self, n, name):
+        """Get the next n 16-bit values as a view, bounds-checked as unpack_from does."""
+        end = self.offset + n * 2
+        if end > len(self.view):
+            raise struct.error(
+                f"{name} requires a buffer of at least {end} bytes for unpacking {n * 2} bytes "
+                f"at offset {self.offset} (actual buffer size is {len(self.view)})"
+            )
+        data = self.view[self.offset:end]
+        self.offset = end
         return data
 
     def half(self, n, h='h'):
-        data = []
-        for id in range(n):
-            data.append(convert_half_to_float(struct.unpack(self.endian + h, self.data[self.offset:self.offset + 2])[0]))
-            self.offset += 2
+        offset = self.offset
+        data = self.half_array(n).tolist()
         if self.log:
-            self.logData += str(self.offset - n * 2) + ' ' + str(data) + '\n'
+            self.trace.append((offset, 'half', data))
         return data
 
+    def half_array(self, n):
+        """Decode n half floats as a float32 numpy array."""
+        return decode_half(self.shorts(n, "half_array"), self.endian)
+
     def short(self, n, h='h', exp=12):
-        data = []
-        for id in range(n):
-            data.append(struct.unpack(self.endian + h, self.data[self.offset:self.offset + 2]) * 2 ** -exp)
+        offset = self.offset
+        data = self.short_array(n, h, exp).tolist()
         if self.log:
-            self.logData += str(self.offset - n * 2) + ' ' + str(data) + '\n'
+            self.trace.append((offset, 'short', data))
+        return data
+
+    def short_array(self, n, h='h', exp=12):
+        """Decode n fixed-point shorts scaled by 2 ** -exp as a float64 numpy array."""
+        return decode_fixed_point(self.shorts(n, "short_array"), self.endian, h, exp)
+
+    def read(self, count):
+        data = self.view[self.offset:self.offset + count].tobytes()
+        self.offset += len(data)
         return data
 
+    def bytes(self, count):
+        return self.read(count)
+
+    def word(self, long):
+        data = self.read(long)
+        return data.replace(b"\x00", b"").decode()
+
+    def find(self, values=b"\x00", size=100, all=None):
+        # Search the view by chunks as data may be a memoryview, which has no find
+        end = -1
+        start = self.offset
+        while start < len(self.view):
+            off = self.view[start:start + size + len(values)].tobytes().find(values)
+            if off >= 0:
+                end = start + off
+                break
+            start += size
+        if end < 0:
+            end = len(self.data)
+            data = self.view[self.offset:end].tobytes()
+            self.offset = end
+        else:
+            data = self.view[self.offset:end].tobytes()
+            self.offset = end + len(values)
+        return data.decode()
+
+    def string_table(self, offsets: Iterable[int], values=b"\x00", max_length=STRING_TABLE_MAX_LENGTH) -> "StringTable":
+        """Get the null-terminated strings at offsets, see BinaryReader.string_table."""
+        offsets = list(offsets)
+        if not offsets:
+            return StringTable(b"", terminator=values, reader=self)
+        start = min(offsets)
+        end = min(max(offsets) + max_length, len(self.data))
+        return StringTable(self.view[start:end].tobytes(), start, terminator=values, reader=self)
+
+    def unpack(self, values):
+        # "5i6hi"
+        out = []
+        for count, type in re.findall(r"(\d*)([a-zA-Z_])", values):
+            count = int(count) if count else 1
+            if type == '_':
+                self.seek(count, 1)
+            else:
+                out.extend(getattr(self, type)(count))
+        return out
+
     def seek(self, off, a=0):
         if a == 0:
             self.offset = off
         if a == 1:
             self.offset += off
+        if a == 2:
+            self.offset = len(self.data) + off
+
+    def seekpad(self, pad, type=0):
+        """ 16-byte chunk alignment"""
+        seek = (pad - (self.offset % pad)) % pad
+        if type == 1:
+            if seek == 0:
+                seek += pad
+        self.offset += seek
 
     def dataSize(self):
         return len(self.data)
 
+    def fileSize(self):
+        return len(self.data)
+
     def tell(self):
         return self.offset
 
+    def close(self):
+        # Nothing to close, the buffer belongs to the caller
+        pass
+
+
+class StringTable():
+    """Null-terminated strings of a name region split in one pass.
+
+    Strings are keyed by their absolute file offset and only decoded on
+    lookup, padding and binary data between names are never decoded.
+
+    """
+
+    def __init__(self, data: bytes, base: int = 0, terminator: bytes = b"\x00", reader=None):
+        self.data = data
+        self.base = base
+        self.terminator = terminator
+        self.reader = reader
+        self.raw: Dict[int, bytes] = {}
+        self.strings: Dict[int, str] = {}
+
+        offset = base
+        chunks = data.split(terminator)
+        # The last chunk isn't terminated within the region
+        for chunk in chunks[:-1]:
+            self.raw[offset] = chunk
+            offset += len(chunk) + len(terminator)
+
+    def get(self, offset: int) -> str:
+        """Get the string starting at a file offset.
+
+        Parameters
+        ----------
+        offset : int
+            Absolute file offset
+
+        Returns
+        -------
+        str
+
+        """
+        name = self.strings.get(offset)
+        if name is None:
+            raw = self.raw.get(offset)
+            if raw is None:
+                raw = self.find_raw(offset)
+            if raw is None:
+                name = self.read_string(offset)
+            else:
+                name = raw.decode()
+            self.strings[offset] = name
+        return name
+
+    def find_raw(self, offset: int):
+        """Find a string starting in the middle of another one."""
+        start = offset - self.base
+        if start < 0 or start >= len(self.data):
+            return None
+        end = self.data.find(self.terminator, start)
+        if end < 0:
+            return None
+        return self.data[start:end]
+
+    def read_string(self, offset: int) -> str:
+        """Read a string outside of the region from the file."""
+        if self.reader is None:
+            start = max(offset - self.base, 0)
+            return self.data[start:].decode()
+        back = self.reader.tell()
+        self.reader.seek(offset)
+        name = self.reader.find(self.terminator)
+        self.reader.seek(back)
+        return name
+
 
 class BinaryReader():
     """general BinaryReader"""
@@ -150,22 +394,22 @@ class BinaryReader():
         self.log = False
         self.xorKey = None
         self.xorOffset = 0
-        self.xorData = ''
+        self.xorData = b''
         self.logskip = False
         self.ARRAY = False
+        self.file_size = None
 
     def close(self):
         self.input_file.close()
 
     def XOR(self, data):
-        self.xorData = ''
-        for m in range(len(data)):
-            ch = ord(chr(data[m] ^ self.xorKey[self.xorOffset]))
-            self.xorData += struct.pack('B', ch)
-            if self.xorOffset == len(self.xorKey) - 1:
-                self.xorOffset = 0
-            else:
-                self.xorOffset += 1
+        """Decode data with the rolling xorKey into xorData.
+
+        The key offset carries over to the next call.
+
+        """
+        self.xorData = xor_bytes(bytes(data), bytes(self.xorKey), self.xorOffset)
+        self.xorOffset = (self.xorOffset + len(data)) % len(self.xorKey)
 
     def q(self, n):
         offset = self.input_file.tell()
@@ -191,8 +435,7 @@ class BinaryReader():
                     if self.endian == ">":
                         data.byteswap()
             else:
-                data = struct.unpack(self.endian + n * 4 * 'B', self.input_file.read(n * 4))
-                self.XOR(data)
+                self.XOR(self.input_file.read(n * 4))
                 data = struct.unpack(self.endian + n * 'i', self.xorData)
 
             if self.debug:
@@ -214,8 +457,7 @@ class BinaryReader():
         if self.xorKey is None:
             data = struct.unpack(self.endian + n * 'I', self.input_file.read(n * 4))
         else:
-            data = struct.unpack(self.endian + n * 4 * 'B', self.input_file.read(n * 4))
-            self.XOR(data)
+            self.XOR(self.input_file.read(n * 4))
             data = struct.unpack(self.endian + n * 'I', self.xorData)
         if self.debug:
             logger.debug({
@@ -239,8 +481,7 @@ class BinaryReader():
 
 
             else:
-                data = struct.unpack(self.endian + n * 'B', self.input_file.read(n))
-                self.XOR(data)
+                self.XOR(self.input_file.read(n))
                 data = struct.unpack(self.endian + n * 'B', self.xorData)
             if self.debug:
                 logger.debug({
@@ -266,8 +507,7 @@ class BinaryReader():
                     data.fromfile(self.input_file, n)
                     if self.endian == ">": data.byteswap()
             else:
-                data = struct.unpack(self.endian + n * 'b', self.input_file.read(n))
-                self.XOR(data)
+                self.XOR(self.input_file.read(n))
                 data = struct.unpack(self.endian + n * 'b', self.xorData)
             if self.debug:
                 logger.debug({
@@ -295,8 +535,7 @@ class BinaryReader():
 
 
             else:
-                data = struct.unpack(self.endian + n * 2 * 'B', self.input_file.read(n * 2))
-                self.XOR(data)
+                self.XOR(self.input_file.read(n * 2))
                 data = struct.unpack(self.endian + n * 'h', self.xorData)
             if self.debug:
                 logger.debug({
@@ -323,8 +562,7 @@ class BinaryReader():
                     if self.endian == ">":
                         data.byteswap()
             else:
-                data = struct.unpack(self.endian + n * 2 * 'B', self.input_file.read(n * 2))
-                self.XOR(data)
+                self.XOR(self.input_file.read(n * 2))
                 data = struct.unpack(self.endian + n * 'H', self.xorData)
             if self.debug:
                 logger.debug({
@@ -351,8 +589,7 @@ class BinaryReader():
                     if self.endian == ">": data.byteswap()
 
             else:
-                data = struct.unpack(self.endian + n * 4 * 'B', self.input_file.read(n * 4))
-                self.XOR(data)
+                self.XOR(self.input_file.read(n * 4))
                 data = struct.unpack(self.endian + n * 'f', self.xorData)
             if self.debug:
                 logger.debug({
@@ -374,8 +611,7 @@ class BinaryReader():
             if self.xorKey is None:
                 data = struct.unpack(self.endian + n * 'd', self.input_file.read(n * 8))
             else:
-                data = struct.unpack(self.endian + n * 4 * 'B', self.input_file.read(n * 8))
-                self.XOR(data)
+                self.XOR(self.input_file.read(n * 8))
                 data = struct.unpack(self.endian + n * 'd', self.xorData)
             if self.debug:
                 logger.debug({
@@ -391,10 +627,8 @@ class BinaryReader():
                 self.input_file.write(data)
 
     def half(self, n, h='h'):
-        array = []
         offset = self.input_file.tell()
-        for id in range(n):
-            array.append(convert_half_to_float(struct.unpack(self.endian + h, self.input_file.read(2))[0]))
+        array = self.half_array(n).tolist()
         if self.debug:
             logger.debug({
                 "array": array,
@@ -405,10 +639,8 @@ class BinaryReader():
         return array
 
     def short(self, n, h='h', exp=12):
-        array = []
         offset = self.input_file.tell()
-        for id in range(n):
-            array.append(struct.unpack(self.endian + h, self.input_file.read(2))[0] * 2 ** -exp)
+        array = self.short_array(n, h, exp).tolist()
         if self.debug:
             logger.debug({
                 "array": array,
@@ -418,6 +650,54 @@ class BinaryReader():
                 self.logfile.write('offset ' + str(offset) + '	' + str(array) + '\n')
         return array
 
+    def half_array(self, n):
+        """Read n half floats as a float32 numpy array.
+
+        Parameters
+        ----------
+        n : int
+            Number of values
+
+        Returns
+        -------
+        numpy.ndarray
+
+        Raises
+        ------
+        struct.error
+            If the file ends before the n values
+
+        """
+        data = self.read(n * 2)
+        check_short_buffer(data, n, "half_array")
+        return decode_half(data, self.endian)
+
+    def short_array(self, n, h='h', exp=12):
+        """Read n fixed-point shorts scaled by 2 ** -exp as a float64 numpy array.
+
+        Parameters
+        ----------
+        n : int
+            Number of values
+        h : str
+            'h' for signed or 'H' for unsigned shorts. Default 'h'.
+        exp : int
+            Number of fractional bits. Default 12.
+
+        Returns
+        -------
+        numpy.ndarray
+
+        Raises
+        ------
+        struct.error
+            If the file ends before the n values
+
+        """
+        data = self.read(n * 2)
+        check_short_buffer(data, n, "short_array")
+        return decode_fixed_point(data, self.endian, h, exp)
+
     def i12(self, n):
         array = []
         offset = self.input_file.tell()
@@ -438,35 +718,23 @@ class BinaryReader():
 
     def find(self, values=b"\x00", size=100, all=None):
         start = self.input_file.tell()
-        s = ""
-        while True:
-            data = self.input_file.read(size + len(values))
-            off = data.find(values)
-
-            if start >= self.fileSize():
-                logger.debug({
-                    "msg": "start >= fileSize",
-                    "start": start,
-                    "fileSize": self.fileSize(),
-                })
-                break
+        file_size = self.fileSize()
+        data = b""
+        while start < file_size:
+            chunk = self.input_file.read(size + len(values))
+            off = chunk.find(values)
             if off >= 0:
-                decoded_name = data[:off].decode()
-                s += decoded_name
+                data += chunk[:off]
                 self.input_file.seek(start + off + len(values))
-                logger.debug({
-                    "msg": "off >= 0",
-                    "off": off,
-                })
                 break
-            else:
-                self.input_file.seek(-len(values), 1)
-                s += data
-                start += size
-                logger.debug({
-                    "s": s,
-                    "start": start,
-                })
+            if len(chunk) <= size:
+                # Reached the end of file without terminator
+                data += chunk
+                break
+            data += chunk[:size]
+            start += size
+            self.input_file.seek(start)
+        s = data.decode()
 
         if self.debug:
             logger.debug({
@@ -477,6 +745,36 @@ class BinaryReader():
                 self.logfile.write('offset ' + str(start) + '	' + s + '\n')
         return s
 
+    def string_table(self, offsets: Iterable[int], values=b"\x00", max_length=STRING_TABLE_MAX_LENGTH) -> StringTable:
+        """Read the region holding the null-terminated strings at offsets in one read.
+
+        The current offset is left unchanged.
+
+        Parameters
+        ----------
+        offsets : list of int
+            Absolute offsets of the strings
+        values : bytes
+            String terminator. Default null byte.
+        max_length : int
+            Bytes read past the last offset. Default STRING_TABLE_MAX_LENGTH.
+
+        Returns
+        -------
+        StringTable
+
+        """
+        offsets = list(offsets)
+        if not offsets:
+            return StringTable(b"", terminator=values, reader=self)
+        start = min(offsets)
+        end = min(max(offsets) + max_length, self.fileSize())
+        back = self.input_file.tell()
+        self.input_file.seek(start)
+        data = self.input_file.read(max(end - start, 0))
+        self.input_file.seek(back)
+        return StringTable(data, start, terminator=values, reader=self)
+
     def string(self, values="\x00", size=100):
         start = self.input_file.tell()
         s = ""
@@ -520,11 +818,16 @@ class BinaryReader():
         return found_list
 
     def fileSize(self):
+        if self.file_size is not None:
+            return self.file_size
         back = self.input_file.tell()
         self.input_file.seek(0, 2)
         tell = self.input_file.tell()
         # self.inputFile.seek(0)
         self.input_file.seek(back)
+        if self.input_file.mode == 'rb':
+            # Read only files don't change size, skip the seeks next time
+            self.file_size = tell
         return tell
 
     def seek(self, off, a=0):
@@ -544,8 +847,7 @@ class BinaryReader():
         if self.xorKey is None:
             return self.input_file.read(count)
         else:
-            data = struct.unpack(self.endian + count * 'B', self.input_file.read(count))
-            self.XOR(data)
+            self.XOR(self.input_file.read(count))
             return self.xorData
 
     def bytes(self, count):
@@ -553,8 +855,7 @@ class BinaryReader():
         if self.xorKey is None:
             return self.input_file.read(count)
         else:
-            data = struct.unpack(self.endian + count * 'B', self.input_file.read(count))
-            self.XOR(data)
+            self.XOR(self.input_file.read(count))
             return self.xorData
 
     def unpack(self, values):
@@ -620,8 +921,7 @@ class BinaryReader():
                     if self.xorKey is None:
                         lit = struct.unpack('c', self.input_file.read(1))[0]
                     else:
-                        data = struct.unpack(self.endian + 'B', self.input_file.read(1))
-                        self.XOR(data)
+                        self.XOR(self.input_file.read(1))
                         lit = struct.unpack(self.endian + 'c', self.xorData)[0]
                     lit = lit.decode()
                     if ord(lit) != 0:
@@ -4,12 +4,14 @@ import logging
 import os
 
 from parsers.parser import (
+    ProgressCallback,
     debug_mesh,
     parse_mesh,
     parse_material,
     parse_textures,
 )
 from parsers.models import Node
+from utils.manifest import Manifest
 from utils.materials import write_to_mtl
 from utils.meshes import (
     face_creation,
@@ -66,10 +68,27 @@ def export_wavefront_mtl(
         output_path: str,
         node: Node = None,
         verbose=False,
+        progress_callback: ProgressCallback = None,
+        force=False,
 ):
+    package_name = os.path.splitext(os.path.basename(input_path))[0]
+    manifest = Manifest(os.path.join(output_path, package_name))
+    if not force and manifest.is_up_to_date("mtl", [input_path]):
+        logger.info(f"Skipped exporting {package_name} materials as they are unchanged.")
+        return
+
     node = Node() if node is None else node
     parse_material(input_path, node, verbose=False)
-    write_to_mtl(node, output_path)
+    if progress_callback:
+        progress_callback(1, 2)
+    mtl_path = write_to_mtl(node, output_path)
+    manifest.record("mtl", [input_path], [
+        os.path.join(mtl_path, material["mtl"]) + ".mtl"
+        for material_list in node.data["material_list"]
+        for material in material_list
+    ])
+    if progress_callback:
+        progress_callback(2, 2)
 
 
 def join_obj_files(obj_files_path: str, obj_name: str = None):
@@ -99,7 +118,7 @@ def join_obj_files(obj_files_path: str, obj_name: str = None):
     # lines.append("mtllib all.mtl\n")
 
     for file_name in file_names:
-        if file_name.endswith("all.obj"):
+        if file_name.endswith("all.obj") or not file_name.endswith(".obj"):
             continue
         v = vt = vn = 0
 
@@ -147,6 +166,10 @@ def export_wavefront_obj(
         output_path: str,
         node: Node = None,
         verbose=False,
+        force=False,
+        progress_callback: ProgressCallback = None,
+        workers=1,
+        cache=None,
 ):
     """Export parsed meshes as Wavefront OBJ files.
 
@@ -160,14 +183,42 @@ def export_wavefront_obj(
         Node object. Default None.
     verbose : bool
         Set True for verbose debug mesh output. Default False.
+    force : bool
+        Export even if the manifest reports the SPM/SPV as unchanged. Default False.
+    progress_callback : callable or None
+        Called with the completed and total export steps after each step.
+    workers : int
+        Number of processes decoding the meshes of the SPM. Default 1.
+    cache : MeshCache or None
+        Load the decoded meshes from (and store them in) this cache. Default None.
 
     """
+    spm_path = os.path.splitext(input_path)[0] + ".SPM"
+    spv_path = os.path.splitext(input_path)[0] + ".SPV"
+    package_name = os.path.splitext(os.path.basename(spm_path))[0]
+    manifest = Manifest(os.path.join(output_path, package_name))
+    if not force and manifest.is_up_to_date("obj", [spm_path, spv_path]):
+        logger.info(f"Skipped exporting {package_name} as it is unchanged.")
+        return
+
     node = Node() if node is None else node
-    parse_mesh(input_path, node, verbose=False)
-    face_creation(node, verbose=False)
+    if cache is not None:
+        # Imported here as numpy is slow to import and only needed for the cache
+        from utils.mesh_cache import load_node
+
+        load_node(input_path, node, cache=cache, workers=workers)
+    else:
+        parse_mesh(input_path, node, verbose=False, workers=workers)
+        if progress_callback:
+            progress_callback(1, 4)
+        face_creation(node, verbose=False)
+    if progress_callback:
+        progress_callback(2, 4)
     if verbose:
         debug_mesh(node)
     exported_obj_path = write_to_obj(node, output_path=output_path)
+    if progress_callback:
+        progress_callback(3, 4)
     logger.debug({
         "msg": "Successfully export Wavefront OBJs",
         "file_path": input_path,
@@ -178,6 +229,74 @@ def export_wavefront_obj(
         "msg": "Successfully joined OBJs as all.obj",
         "exported_obj_path": exported_obj_path,
     })
+    exported_obj_files = [
+        os.path.join(exported_obj_path, file_name)
+        for file_name in os.listdir(exported_obj_path)
+        if file_name.endswith(".obj")
+    ]
+    manifest.record("obj", [spm_path, spv_path], exported_obj_files)
+    if progress_callback:
+        progress_callback(4, 4)
+
+
+def export_lods(
+        input_path: str,
+        output_path: str,
+        node: Node = None,
+        force=False,
+        cache=None,
+) -> str:
+    """Export decimated LOD levels of parsed meshes as a numpy .npz archive.
+
+    The archive is written next to the exported Wavefront OBJ files
+    (e.g. 'output/PACKAGE/PACKAGE.lod.npz').
+
+    Parameters
+    ----------
+    input_path : str
+        Path to SPM package.
+    output_path : str
+        Path to exported OBJ files.
+    node : Node or None
+        Node object. Default None.
+    force : bool
+        Export even if the manifest reports the SPM/SPV as unchanged. Default False.
+    cache : MeshCache or None
+        Load the decoded meshes from (and store them in) this cache. Default None.
+
+    Returns
+    -------
+    str
+        The .npz archive path.
+
+    """
+    # Imported here as numpy is slow to import and only needed for LODs
+    from utils.lod import (
+        build_lods,
+        get_lod_path,
+        get_mesh_arrays,
+        write_lods,
+    )
+    from utils.mesh_cache import load_node
+
+    spm_path = os.path.splitext(input_path)[0] + ".SPM"
+    spv_path = os.path.splitext(input_path)[0] + ".SPV"
+    package_name = os.path.splitext(os.path.basename(spm_path))[0]
+    lod_path = get_lod_path(output_path, package_name)
+    manifest = Manifest(os.path.dirname(lod_path))
+    if not force and manifest.is_up_to_date("lod", [spm_path, spv_path]):
+        return lod_path
+
+    if node is None:
+        node = load_node(input_path, cache=cache)
+    write_lods(build_lods(get_mesh_arrays(node)), lod_path)
+    manifest.record("lod", [spm_path, spv_path], [lod_path])
+    logger.debug({
+        "msg": "Successfully export LODs",
+        "file_path": input_path,
+        "lod_path": lod_path,
+    })
+    return lod_path
 
 
 def export_dds_textures(
@@ -185,7 +304,25 @@ def export_dds_textures(
         output_path: str,
         node: Node = None,
         verbose=False,
+        progress_callback: ProgressCallback = None,
+        force=False,
 ):
+    txm_path = os.path.splitext(input_path)[0] + ".TXM"
+    txv_path = os.path.splitext(input_path)[0] + ".TXV"
+    package_name = os.path.splitext(os.path.basename(txm_path))[0]
+    manifest = Manifest(os.path.join(output_path, package_name))
+    if not force and manifest.is_up_to_date("dds", [txm_path, txv_path]):
+        logger.info(f"Skipped extracting {package_name} textures as they are unchanged.")
+        return
+
     node = Node() if node is None else node
     parse_textures(input_path, node, verbose=False)
+    if progress_callback:
+        progress_callback(1, 2)
     write_to_dds(node, output_path)
+    manifest.record("dds", [txm_path, txv_path], [
+        os.path.join(output_path, node.name, image["texture_name"])
+        for image in node.data["image_list"]
+    ])
+    if progress_callback:
+        progress_callback(2, 2)
@@ -4,14 +4,19 @@ import os
 from pathlib import Path
 from typing import Sequence
 
-from constants import tales
 from exceptions.files import (
     InvalidFileException,
     InvalidFourCCException,
 )
+from utils.magic import (
+    MAGIC_SIZE,
+    get_extension,
+    get_magic,
+)
 
 logger = logging.getLogger(__name__)
-log_handler = logging.FileHandler("vesperia_tools_debug.log")
+# Delay opening the log file until the first record is emitted
+log_handler = logging.FileHandler("vesperia_tools_debug.log", delay=True)
 log_handler.setLevel(logging.DEBUG)
 logger.addHandler(log_handler)
 
@@ -33,8 +38,7 @@ def get_fourcc(file_path: str):
     if not os.path.isfile(file_path):
         raise InvalidFileException(file_path)
     with open(file_path, "rb") as f:
-        file_header = f.read(32)
-    file_fourcc = file_header[:4]
+        file_fourcc = f.read(MAGIC_SIZE)
     return file_fourcc.decode("utf-8")
 
 
@@ -53,10 +57,10 @@ def check_fourcc(fourcc: str, file_path: str):
         raise InvalidFileException(file_path)
     with open(file_path, "rb") as f:
         file_header = f.read(32)
-    file_fourcc = file_header[:4].decode("utf-8")
 
-    # Check file's FourCC with expected FourCC in bytes representation
-    if file_fourcc != fourcc:
+    # Compare as integers, the header may not even be text
+    if get_magic(file_header) != get_magic(fourcc.encode()):
+        file_fourcc = file_header[:MAGIC_SIZE].decode("utf-8", errors="replace")
         logger.warning({
             "msg": f"Not an {fourcc} file!",
             "fourcc": str(file_fourcc),
@@ -76,13 +80,10 @@ def rename_unknown_files_ext(dir_path: str):
     for file_path in Path(dir_path).rglob("*"):
         if file_path.is_file() and file_path.suffix:
             with file_path.open("rb") as f:
-                file_header = f.read(4).hex()
+                file_header = f.read(MAGIC_SIZE)
 
             # Default to TXV as TXV header has slight variation for 2nd and 3rd bytes
-            extension = ".TXV"
-            file_header = file_header.upper()
-            if file_header in tales.TYPE_2_EXT_PC.keys():
-                extension = tales.TYPE_2_EXT_PC[file_header]
+            extension = get_extension(file_header) or ".TXV"
 
             logger.debug({
                 "file_path": file_path,
@@ -0,0 +1,159 @@
+"""Vesperia Tools Member Filters.
+
+Select the members of SVO, DEC and FPS4 containers from their entry table,
+before any member data is read or written.
+
+Exclude globs apply to every member. Include globs, types and the size
+range only restrict the asset members, nested FPS4/TLZC containers are
+still extracted to reach the members inside them. SVO members (the DAT
+packages) are selected by the package globs.
+
+Usage example:
+
+    from utils.filters import MemberFilter
+
+    member_filter = MemberFilter(include=("CH_YUR*",), types=(".SPM", ".SPV", ".TXV"))
+    parse_dec("path/to/PACKAGE.DAT.dec", member_filter=member_filter)
+
+"""
+import hashlib
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import (
+    Optional,
+    Sequence,
+)
+
+CONTAINER_TYPES = (".FPS4", ".TLZC")
+
+
+def match_globs(name: str, patterns: Sequence[str]) -> bool:
+    name = name.upper()
+    return any(fnmatchcase(name, pattern.upper()) for pattern in patterns)
+
+
+def normalize_type(member_type: str) -> str:
+    """Get a type as an upper case extension (e.g. 'spm' -> '.SPM')."""
+    member_type = member_type.upper()
+    return member_type if member_type.startswith(".") else f".{member_type}"
+
+
+@dataclass(frozen=True)
+class MemberFilter:
+    """Name, type and size filters of container members.
+
+    Parameters
+    ----------
+    include : list of str
+        Member name globs (e.g. 'CH_YUR*'). Default () keeps every name.
+    exclude : list of str
+        Name globs of members and packages to skip.
+    types : list of str
+        Detected types (e.g. '.SPM' or 'TXV'). Default () keeps every type.
+    min_size : int
+        Minimum member size in bytes. Default 0.
+    max_size : int or None
+        Maximum member size in bytes. Default None.
+    packages : list of str
+        Name globs of the SVO members to extract (e.g. 'CH_YUR*.DAT').
+        Default () extracts every package.
+
+    """
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+    types: Sequence[str] = ()
+    min_size: int = 0
+    max_size: Optional[int] = None
+    packages: Sequence[str] = ()
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.include
+            or self.exclude
+            or self.types
+            or self.min_size
+            or self.max_size is not None
+            or self.packages
+        )
+
+    def is_wanted(
+            self,
+            name: str,
+            size: int,
+            member_type: str = None,
+            is_container=False,
+    ) -> bool:
+        """Check if a member must be extracted.
+
+        Parameters
+        ----------
+        name : str
+            Name the member would be written as
+        size : int
+            Member size in bytes
+        member_type : str or None
+            Detected type. Default None uses the name extension.
+        is_container : bool
+            The member is an FPS4 or TLZC container. Default False.
+
+        Returns
+        -------
+        bool
+
+        """
+        if self.exclude and match_globs(name, self.exclude):
+            return False
+        member_type = normalize_type(member_type or Path(name).suffix or ".")
+        if is_container or member_type in CONTAINER_TYPES:
+            return True
+        if self.include and not match_globs(name, self.include):
+            return False
+        if self.types and member_type not in {normalize_type(t) for t in self.types}:
+            return False
+        if size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        return True
+
+    def is_package_wanted(self, name: str) -> bool:
+        """Check if an SVO member (a DAT package) must be extracted."""
+        if self.exclude and match_globs(name, self.exclude):
+            return False
+        return not self.packages or match_globs(name, self.packages)
+
+    def get_stage(self, stage: str, packages=False) -> str:
+        """Get the manifest stage name of a filtered extraction.
+
+        Extractions with different filters write different members, so
+        they must not skip each other.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name (e.g. 'svo', 'dec')
+        packages : bool
+            Only the package filters apply to the stage (e.g. 'svo'). Default False.
+
+        Returns
+        -------
+        str
+
+        """
+        if packages:
+            filters = (sorted(self.exclude), sorted(self.packages))
+            defaults = ([], [])
+        else:
+            filters = (
+                sorted(self.include),
+                sorted(self.exclude),
+                sorted(normalize_type(t) for t in self.types),
+                self.min_size,
+                self.max_size,
+            )
+            defaults = ([], [], [], 0, None)
+        if filters == defaults:
+            return stage
+        digest = hashlib.sha1(repr(filters).encode()).hexdigest()
+        return f"{stage}[{digest[:8]}]"
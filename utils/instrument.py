@@ -0,0 +1,284 @@
+"""Vesperia Tools Stage Instrumentation.
+
+Record wall time, CPU time, bytes in/out and item counts of parsers and
+exporters. Disabled by default, in which case instrumented functions cost
+a single flag check.
+
+Usage example:
+
+    from utils import instrument
+
+    instrument.enable("profile.jsonl")
+    parse_svo("path/to/PACKAGE.SVO")
+    print(instrument.format_summary(instrument.summarize(instrument.get_records())))
+
+"""
+import functools
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+)
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_records: List["StageRecord"] = []
+_jsonl_file = None
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    start: float = 0.0
+    wall: float = 0.0
+    cpu: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    items: int = 0
+    pid: int = 0
+    tid: int = 0
+    args: Dict = field(default_factory=dict)
+
+
+@dataclass
+class StageSummary:
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    items: int = 0
+
+
+def enable(jsonl_path: str = None):
+    """Enable instrumentation.
+
+    Parameters
+    ----------
+    jsonl_path : str or None
+        Append every record as a JSON line to this file. Default None.
+
+    """
+    global _enabled, _jsonl_file
+    with _lock:
+        if _jsonl_file:
+            _jsonl_file.close()
+            _jsonl_file = None
+        if jsonl_path:
+            _jsonl_file = open(jsonl_path, "a", buffering=1)
+        _enabled = True
+
+
+def disable():
+    global _enabled, _jsonl_file
+    with _lock:
+        _enabled = False
+        if _jsonl_file:
+            _jsonl_file.close()
+            _jsonl_file = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _records.clear()
+
+
+def get_records() -> List[StageRecord]:
+    with _lock:
+        return list(_records)
+
+
+def _get_stack() -> List[StageRecord]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class Span:
+    """Context manager recording a stage while enabled."""
+    __slots__ = ("record", "cpu_start")
+
+    def __init__(self, stage: str, **args):
+        self.record = StageRecord(stage=stage, args=args)
+        self.cpu_start = 0.0
+
+    def __enter__(self):
+        _get_stack().append(self.record)
+        self.record.pid = os.getpid()
+        self.record.tid = threading.get_native_id()
+        self.cpu_start = time.thread_time()
+        self.record.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc_info):
+        self.record.wall = time.perf_counter() - self.record.start
+        self.record.cpu = time.thread_time() - self.cpu_start
+        _get_stack().pop()
+        line = json.dumps(asdict(self.record), default=str) + "\n"
+        with _lock:
+            _records.append(self.record)
+            if _jsonl_file:
+                _jsonl_file.write(line)
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(stage: str, **args):
+    """Record a block of code as a stage.
+
+    Parameters
+    ----------
+    stage : str
+        Stage name (e.g. 'parse_svo')
+    **args
+        Extra values stored with the record (e.g. file name)
+
+    """
+    if not _enabled:
+        return NULL_SPAN
+    return Span(stage, **args)
+
+
+def instrumented(stage: str) -> Callable:
+    """Decorator recording every call of a function as a stage.
+
+    Parameters
+    ----------
+    stage : str
+        Stage name (e.g. 'parse_svo')
+
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add(bytes_in: int = 0, bytes_out: int = 0, items: int = 0):
+    """Add counts to the innermost running stage of the current thread.
+
+    Parameters
+    ----------
+    bytes_in : int
+        Bytes read
+    bytes_out : int
+        Bytes written
+    items : int
+        Processed items (e.g. members, meshes, textures)
+
+    """
+    if not _enabled:
+        return
+    stack = _get_stack()
+    if stack:
+        record = stack[-1]
+        record.bytes_in += bytes_in
+        record.bytes_out += bytes_out
+        record.items += items
+
+
+def annotate(**args):
+    """Store extra values (e.g. file name) with the innermost running stage.
+
+    Parameters
+    ----------
+    **args
+        Values stored with the record
+
+    """
+    if not _enabled:
+        return
+    stack = _get_stack()
+    if stack:
+        stack[-1].args.update(args)
+
+
+def load_records(jsonl_path: str) -> List[StageRecord]:
+    """Load records written as JSON lines (e.g. by worker processes).
+
+    Parameters
+    ----------
+    jsonl_path : str
+
+    Returns
+    -------
+    list of StageRecord
+
+    """
+    records = []
+    with open(jsonl_path, "r") as f:
+        for line in f:
+            if line.strip():
+                records.append(StageRecord(**json.loads(line)))
+    return records
+
+
+def summarize(records: Iterable[StageRecord]) -> Dict[str, StageSummary]:
+    summaries: Dict[str, StageSummary] = {}
+    for record in records:
+        summary = summaries.setdefault(record.stage, StageSummary())
+        summary.calls += 1
+        summary.wall += record.wall
+        summary.cpu += record.cpu
+        summary.bytes_in += record.bytes_in
+        summary.bytes_out += record.bytes_out
+        summary.items += record.items
+    return summaries
+
+
+def format_summary(summaries: Dict[str, StageSummary]) -> str:
+    """Format stage summaries as a plain text table.
+
+    Parameters
+    ----------
+    summaries : dict
+        StageSummary keyed by stage name
+
+    Returns
+    -------
+    str
+
+    """
+    lines = [
+        f"{'stage':<16}{'calls':>8}{'wall (s)':>10}{'cpu (s)':>10}"
+        f"{'in (MB)':>10}{'out (MB)':>10}{'MB/s':>9}{'items':>9}{'items/s':>10}",
+    ]
+    for stage, summary in sorted(summaries.items(), key=lambda item: -item[1].wall):
+        megabytes = max(summary.bytes_in, summary.bytes_out) / 1e6
+        throughput = megabytes / summary.wall if summary.wall else 0.0
+        items_rate = summary.items / summary.wall if summary.wall else 0.0
+        lines.append(
+            f"{stage:<16}{summary.calls:>8}{summary.wall:>10.3f}{summary.cpu:>10.3f}"
+            f"{summary.bytes_in / 1e6:>10.2f}{summary.bytes_out / 1e6:>10.2f}"
+            f"{throughput:>9.1f}{summary.items:>9}{items_rate:>10.0f}"
+        )
+    return "\n".join(lines)
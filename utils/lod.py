@@ -0,0 +1,232 @@
+"""Level-of-detail utilities for viewing large meshes.
+
+Meshes are decimated by vertex clustering: vertices are snapped to a grid
+shared by every mesh of the package, merged per grid cell and faces
+collapsing to a line or a point are dropped.
+
+"""
+import logging
+import os
+from typing import (
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+import numpy as np
+
+from parsers.models import Node
+
+logger = logging.getLogger(__name__)
+
+# Grid resolution along the package's largest extent for LOD 1, 2, ...
+# LOD 0 is always the full detail mesh.
+LOD_RESOLUTIONS = (256, 64)
+LOD_FULL = 0
+LOD_COARSE = len(LOD_RESOLUTIONS)
+
+
+class MeshArrays(NamedTuple):
+    name: str
+    vertices: np.ndarray
+    faces: np.ndarray
+    normals: Optional[np.ndarray] = None
+
+
+def get_mesh_arrays(node: Node) -> List[MeshArrays]:
+    """Convert a Node's vertex and triangle lists to numpy arrays.
+
+    Parameters
+    ----------
+    node : Node
+        Node with parsed meshes and created faces.
+
+    Returns
+    -------
+    list of MeshArrays
+        One per submesh with vertices and valid faces.
+
+    """
+    mesh_arrays = []
+    for mesh_list in node.data["mesh_list"]:
+        for mesh in mesh_list:
+            if not mesh.vertPosList or not mesh.triangleList:
+                continue
+            vertices = np.asarray(mesh.vertPosList, dtype=np.float32)
+            faces = np.array(
+                [face["triangle"] for face in mesh.triangleList],
+                dtype=np.int64,
+            )
+            # Drop faces referencing vertices outside the submesh
+            faces = faces[(faces < len(vertices)).all(axis=1)]
+            if not len(faces):
+                continue
+
+            normals = None
+            if len(mesh.vertNormList) == len(vertices):
+                normals = np.asarray(mesh.vertNormList, dtype=np.float32)
+            mesh_arrays.append(MeshArrays(str(mesh.name), vertices, faces, normals))
+    return mesh_arrays
+
+
+def cluster_decimate(
+        vertices: np.ndarray,
+        faces: np.ndarray,
+        origin: np.ndarray,
+        cell_size: float,
+):
+    """Decimate a mesh by merging the vertices sharing a grid cell.
+
+    Parameters
+    ----------
+    vertices : np.ndarray
+        (N, 3) vertex positions.
+    faces : np.ndarray
+        (M, 3) vertex indices.
+    origin : np.ndarray
+        (3,) grid origin.
+    cell_size : float
+        Grid cell size.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The decimated (vertices, faces).
+
+    """
+    if not len(vertices) or cell_size <= 0:
+        return vertices, faces
+
+    cells = np.floor((vertices - origin) / cell_size).astype(np.int64)
+    _, cluster_idx, counts = np.unique(
+        cells,
+        axis=0,
+        return_inverse=True,
+        return_counts=True,
+    )
+    cluster_idx = cluster_idx.reshape(-1)
+    clusters = len(counts)
+    new_vertices = np.stack(
+        [
+            np.bincount(cluster_idx, weights=vertices[:, axis], minlength=clusters)
+            for axis in range(3)
+        ],
+        axis=1,
+    ) / counts[:, None]
+
+    new_faces = cluster_idx[faces]
+    is_valid = (
+        (new_faces[:, 0] != new_faces[:, 1])
+        & (new_faces[:, 1] != new_faces[:, 2])
+        & (new_faces[:, 0] != new_faces[:, 2])
+    )
+    new_faces = new_faces[is_valid]
+    if len(new_faces):
+        # Keep the first of the faces merged onto the same vertices
+        _, unique_idx = np.unique(np.sort(new_faces, axis=1), axis=0, return_index=True)
+        new_faces = new_faces[np.sort(unique_idx)]
+
+    return new_vertices.astype(np.float32), new_faces
+
+
+def build_lods(
+        mesh_arrays: Sequence[MeshArrays],
+        resolutions: Sequence[int] = LOD_RESOLUTIONS,
+) -> List[List[MeshArrays]]:
+    """Build the LOD levels of a package's meshes.
+
+    Parameters
+    ----------
+    mesh_arrays : list of MeshArrays
+        Full detail meshes.
+    resolutions : list of int
+        Grid resolution along the largest extent for each coarser level.
+
+    Returns
+    -------
+    list
+        Meshes per level, from full detail (LOD 0) to the coarsest level.
+
+    """
+    lods = [list(mesh_arrays)]
+    if not mesh_arrays:
+        return lods + [[] for _ in resolutions]
+
+    all_vertices = np.concatenate([mesh.vertices for mesh in mesh_arrays])
+    origin = all_vertices.min(axis=0)
+    extent = float((all_vertices.max(axis=0) - origin).max())
+    for resolution in resolutions:
+        cell_size = extent / resolution
+        level = []
+        for mesh in mesh_arrays:
+            vertices, faces = cluster_decimate(mesh.vertices, mesh.faces, origin, cell_size)
+            if len(faces):
+                level.append(MeshArrays(mesh.name, vertices, faces))
+        lods.append(level)
+        logger.debug({
+            "msg": "Built LOD",
+            "resolution": resolution,
+            "meshes": len(level),
+            "faces": sum(len(mesh.faces) for mesh in level),
+        })
+    return lods
+
+
+def get_lod_path(output_path: str, package_name: str) -> str:
+    return os.path.join(output_path, package_name, f"{package_name}.lod.npz")
+
+
+def write_lods(lods: Sequence[Sequence[MeshArrays]], lod_path: str) -> str:
+    """Write the LOD levels as a numpy .npz archive.
+
+    Parameters
+    ----------
+    lods : list
+        Meshes per level, from full detail (LOD 0) to the coarsest level.
+    lod_path : str
+        Path to the .npz archive.
+
+    Returns
+    -------
+    str
+        The .npz archive path.
+
+    """
+    arrays = {"levels": np.array(len(lods))}
+    for level, meshes in enumerate(lods):
+        arrays[f"{level}_names"] = np.array([mesh.name for mesh in meshes], dtype=str)
+        for idx, mesh in enumerate(meshes):
+            arrays[f"{level}_{idx}_v"] = mesh.vertices
+            arrays[f"{level}_{idx}_f"] = mesh.faces.astype(np.uint32)
+
+    os.makedirs(os.path.dirname(lod_path), exist_ok=True)
+    np.savez(lod_path, **arrays)
+    return lod_path
+
+
+def read_lod(lod_path: str, level: int) -> List[MeshArrays]:
+    """Read one LOD level from a .npz archive.
+
+    Parameters
+    ----------
+    lod_path : str
+        Path to the .npz archive.
+    level : int
+        LOD level. Clamped to the available levels.
+
+    Returns
+    -------
+    list of MeshArrays
+
+    """
+    with np.load(lod_path) as data:
+        level = min(level, int(data["levels"]) - 1)
+        return [
+            MeshArrays(
+                str(name),
+                data[f"{level}_{idx}_v"],
+                data[f"{level}_{idx}_f"].astype(np.int64),
+            )
+            for idx, name in enumerate(data[f"{level}_names"])
+        ]
@@ -1,29 +1,114 @@
+import collections
+import re
+import threading
+from typing import List
+
 from PySide2 import (
+    QtCore,
     QtWidgets,
     QtGui,
 )
 
+from constants.ui import (
+    LOG_BUFFER_SIZE,
+    LOG_FLUSH_INTERVAL,
+    LOG_MAX_BLOCK_COUNT,
+    LOG_PROGRESS_PATTERN,
+)
+
+progress_pattern = re.compile(LOG_PROGRESS_PATTERN)
+
+
+def collapse_lines(lines: List[str]) -> List[str]:
+    """Collapse progress and repeated lines of a flushed batch.
+
+    Only the last of the progress lines is kept and consecutive
+    identical lines are shown once with a repeat count.
+
+    Parameters
+    ----------
+    lines : list of str
+
+    Returns
+    -------
+    list of str
+
+    """
+    last_progress_idx = None
+    for idx, line in enumerate(lines):
+        if progress_pattern.search(line):
+            last_progress_idx = idx
+
+    collapsed = []
+    repeat = 0
+    for idx, line in enumerate(lines):
+        if idx != last_progress_idx and progress_pattern.search(line):
+            continue
+        if collapsed and line == collapsed[-1]:
+            repeat += 1
+            continue
+        if repeat:
+            collapsed[-1] += f" (repeated {repeat + 1}x)"
+            repeat = 0
+        collapsed.append(line)
+    if repeat:
+        collapsed[-1] += f" (repeated {repeat + 1}x)"
+    return collapsed
 
-class OutLog():
-    def __init__(self, edit: QtWidgets.QTextEdit, out=None, color=None):
-        """Redirect stdout to QTextEdit widget.
+
+class OutLog(QtCore.QObject):
+    def __init__(
+            self,
+            edit: QtWidgets.QPlainTextEdit,
+            out=None,
+            color=None,
+            buffer_size: int = LOG_BUFFER_SIZE,
+            flush_interval: int = LOG_FLUSH_INTERVAL,
+            max_block_count: int = LOG_MAX_BLOCK_COUNT,
+    ):
+        """Redirect stdout to QPlainTextEdit widget.
+
+        Writes may come from worker threads and can be very frequent, so
+        they are kept in a bounded ring buffer and flushed to the widget
+        in batches by a timer running in the GUI thread.
 
         Parameters
         ----------
-        edit : QtWidgets.QTextEdit
-            QTextEdit object.
+        edit : QtWidgets.QPlainTextEdit
+            QPlainTextEdit object.
         out : object or None
             Alternate stream (can be the original sys.stdout).
         color : QtGui.QColor or None
             QColor object (i.e. color stderr a different color).
+        buffer_size : int
+            Maximum pending writes. The oldest are dropped when full.
+        flush_interval : int
+            Milliseconds between flushes to the widget.
+        max_block_count : int
+            Maximum lines kept by the widget.
 
         """
+        super(OutLog, self).__init__(edit)
         self.edit = edit
         self.out = out
         self.color = color
+        self.buffer = collections.deque(maxlen=buffer_size)
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.partial_line = ""
+
+        self.edit.setMaximumBlockCount(max_block_count)
+        self.text_format = QtGui.QTextCharFormat()
+        if self.color:
+            self.text_format.setForeground(self.color)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(flush_interval)
+        self.timer.timeout.connect(self.flush_to_widget)
+        self.timer.start()
 
     def write(self, text: str):
-        """Write stdout print values to QTextEdit widget.
+        """Queue stdout print values for the QPlainTextEdit widget.
 
         Parameters
         ----------
@@ -31,13 +116,37 @@ class OutLog():
             Print values from stdout.
 
         """
-        if self.color:
-            text_color = self.edit.textColor()
-            self.edit.setTextColor(text_color)
         if self.out:
             self.out.write(text)
-        self.edit.moveCursor(QtGui.QTextCursor.End)
-        self.edit.insertPlainText(text)
+        with self.lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(text)
+
+    def flush_to_widget(self):
+        """Append the queued writes to the widget in the GUI thread."""
+        with self.lock:
+            if not self.buffer:
+                return
+            chunks = list(self.buffer)
+            self.buffer.clear()
+            dropped = self.dropped
+            self.dropped = 0
+
+        # Keep the trailing incomplete line for the next flush
+        lines = (self.partial_line + "".join(chunks)).split("\n")
+        self.partial_line = lines.pop()
+        if not lines:
+            return
+
+        lines = collapse_lines(lines)
+        if dropped:
+            lines.insert(0, f"... {dropped} log messages dropped ...")
+
+        cursor = self.edit.textCursor()
+        cursor.movePosition(QtGui.QTextCursor.End)
+        cursor.insertText("\n".join(lines) + "\n", self.text_format)
+        self.edit.ensureCursorVisible()
 
     def flush(self):
         """Flush Outlog when process terminates.
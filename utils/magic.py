@@ -0,0 +1,356 @@
+"""Vesperia Tools File Type Detection.
+
+Classify files from their leading bytes with integer keyed tables built
+once from constants.tales: the PC and 360 type tables, the TLZC/FPS4/DDS
+signatures and the LONG_TYPES headers. Every lookup works on raw bytes,
+the *_table functions classify every member of an FPS4 table at once.
+
+Usage example:
+
+    from utils.magic import classify, get_extensions
+
+    classify(b"FPS4...")  # '.FPS4'
+    get_extensions(dec_content, offsets)  # ['.SPM', '.SPV', None, ...]
+
+"""
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from constants.tales import (
+    DDS_HEADER,
+    LONG_TYPES,
+    PLATFORM_PC,
+    PLATFORM_X360,
+    TYPE_2_EXT_360,
+    TYPE_2_EXT_PC,
+)
+
+MAGIC_SIZE = 4
+# parse_dec looks for the DDS header in the first 8 bytes of a member
+DDS_SEARCH_SIZE = 8
+
+MAGIC_FPS4 = int.from_bytes(b"FPS4", "big")
+MAGIC_TLZC = int.from_bytes(b"TLZC", "big")
+MAGIC_DDS = int.from_bytes(DDS_HEADER, "big")
+
+
+class MagicTable:
+    """Extensions keyed by the big-endian integer of a fixed size header."""
+    def __init__(self, size: int, extensions: Dict[int, str]):
+        self.size = size
+        self.extensions = extensions
+        self.keys = sorted(extensions)
+        self.values = [extensions[key] for key in self.keys]
+
+    def get(self, header: bytes) -> Optional[str]:
+        if len(header) < self.size:
+            return None
+        return self.extensions.get(int.from_bytes(header[:self.size], "big"))
+
+    def lookup(self, magics, available) -> List[Optional[str]]:
+        """Look up headers read by read_magics.
+
+        Parameters
+        ----------
+        magics : np.ndarray
+            uint64 of the first 8 bytes of every member
+        available : np.ndarray
+            Number of bytes read per member
+
+        Returns
+        -------
+        list of str or None
+
+        """
+        # Imported here as numpy is slow to import and only needed for tables
+        import numpy as np
+
+        if not self.keys or not len(magics):
+            return [None] * len(magics)
+        keys = np.array(self.keys, dtype=np.uint64)
+        headers = magics >> np.uint64(8 * (DDS_SEARCH_SIZE - self.size))
+        idx = np.minimum(np.searchsorted(keys, headers), len(keys) - 1)
+        found = (keys[idx] == headers) & (available >= self.size)
+        return [
+            self.values[i] if is_found else None
+            for i, is_found in zip(idx.tolist(), found.tolist())
+        ]
+
+
+def from_hex_table(table: Dict[str, str]) -> MagicTable:
+    return MagicTable(MAGIC_SIZE, {int(key, 16): value for key, value in table.items()})
+
+
+EXTENSIONS = {
+    PLATFORM_PC: from_hex_table(TYPE_2_EXT_PC),
+    PLATFORM_X360: from_hex_table(TYPE_2_EXT_360),
+}
+SIGNATURES = MagicTable(MAGIC_SIZE, {
+    MAGIC_FPS4: ".FPS4",
+    MAGIC_TLZC: ".TLZC",
+    MAGIC_DDS: ".DDS",
+})
+
+
+def build_long_type_tables() -> List[MagicTable]:
+    by_size: Dict[int, Dict[int, str]] = {}
+    for long_type in LONG_TYPES:
+        header = long_type.encode()
+        by_size.setdefault(len(header), {})[int.from_bytes(header, "big")] = f".{long_type}"
+    # Longest first so a header never matches a shorter type it starts with
+    return [MagicTable(size, by_size[size]) for size in sorted(by_size, reverse=True)]
+
+
+LONG_TYPE_TABLES = build_long_type_tables()
+
+
+def get_magic(header: bytes) -> int:
+    """Get the big-endian integer of the first 4 bytes (e.g. 0x46505334 for FPS4)."""
+    return int.from_bytes(header[:MAGIC_SIZE], "big")
+
+
+def get_extension(header: bytes, platform: int = PLATFORM_PC) -> Optional[str]:
+    """Get the extension of a Vesperia file from the type table of a platform.
+
+    Parameters
+    ----------
+    header : bytes
+        At least the first 4 bytes of the file
+    platform : int
+        PLATFORM_PC or PLATFORM_X360. Default PLATFORM_PC.
+
+    Returns
+    -------
+    str or None
+        The extension (e.g. '.SPM'), None for unknown types
+
+    """
+    return EXTENSIONS[platform].get(header)
+
+
+def has_dds_header(header: bytes) -> bool:
+    # Searched on the hex string, as parse_dec always did
+    return DDS_HEADER.hex() in header[:DDS_SEARCH_SIZE].hex()
+
+
+def classify(header: bytes, platform: int = PLATFORM_PC) -> Optional[str]:
+    """Classify a file from its header.
+
+    TLZC, FPS4 and DDS signatures come first, then the LONG_TYPES headers
+    and the type table of the platform.
+
+    Parameters
+    ----------
+    header : bytes
+        At least the first 8 bytes of the file
+    platform : int
+        PLATFORM_PC or PLATFORM_X360. Default PLATFORM_PC.
+
+    Returns
+    -------
+    str or None
+        The extension (e.g. '.TLZC', '.T8BTMO' or '.SPM'), None for unknown types
+
+    """
+    for table in (SIGNATURES, *LONG_TYPE_TABLES, EXTENSIONS[platform]):
+        extension = table.get(header)
+        if extension:
+            return extension
+    return None
+
+
+def get_member_type(header: bytes, platform: int = PLATFORM_PC) -> Optional[str]:
+    """Get the type of a container member as parse_dec names it.
+
+    Members holding a DDS header are TXV textures, FPS4 and TLZC members
+    are containers and the other types come from the platform type table.
+
+    Parameters
+    ----------
+    header : bytes
+        At least the first 8 bytes of the member
+    platform : int
+        PLATFORM_PC or PLATFORM_X360. Default PLATFORM_PC.
+
+    Returns
+    -------
+    str or None
+        The extension (e.g. '.TXV', '.FPS4' or '.SPM'), None for unknown types
+
+    """
+    if has_dds_header(header):
+        return ".TXV"
+    return SIGNATURES.get(header) or get_extension(header, platform)
+
+
+def read_magics(data: bytes, offsets: Sequence[int], sizes: Sequence[int] = None):
+    """Read the first 8 bytes of every member of a table at once.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Container content (e.g. a DEC file)
+    offsets : list of int
+        Member offsets
+    sizes : list of int or None
+        Member sizes. Default None reads up to the end of data, even past
+        the end of a member.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The big-endian uint64 of the first 8 bytes, zero padded, and the
+        number of bytes read per member
+
+    """
+    # Imported here as numpy is slow to import and only needed for tables
+    import numpy as np
+
+    offsets = np.asarray(offsets, dtype=np.int64).reshape(-1)
+    available = np.clip(len(data) - offsets, 0, DDS_SEARCH_SIZE)
+    if sizes is not None:
+        available = np.minimum(available, np.clip(np.asarray(sizes, dtype=np.int64), 0, None))
+    if not len(data) or not len(offsets):
+        return np.zeros(len(offsets), dtype=np.uint64), available
+
+    columns = np.arange(DDS_SEARCH_SIZE)
+    # Bytes past the end of data or of a member are zeroed below
+    idx = np.minimum(np.clip(offsets, 0, None)[:, None] + columns, len(data) - 1)
+    values = np.frombuffer(data, dtype=np.uint8)[idx].astype(np.uint64)
+    values[columns >= available[:, None]] = 0
+    shifts = (8 * (DDS_SEARCH_SIZE - 1 - columns)).astype(np.uint64)
+    magics = np.bitwise_or.reduce(values << shifts, axis=1)
+    return magics, available
+
+
+def get_extensions(
+        data: bytes,
+        offsets: Sequence[int],
+        sizes: Sequence[int] = None,
+        platform: int = PLATFORM_PC,
+) -> List[Optional[str]]:
+    """Get the extension of every member of a table from the platform type table.
+
+    Parameters
+    ----------
+    data : bytes-like
+    offsets : list of int
+    sizes : list of int or None
+        See read_magics
+    platform : int
+        PLATFORM_PC or PLATFORM_X360. Default PLATFORM_PC.
+
+    Returns
+    -------
+    list of str or None
+
+    """
+    magics, available = read_magics(data, offsets, sizes)
+    return EXTENSIONS[platform].lookup(magics, available)
+
+
+def find_dds_headers(data: bytes, offsets: Sequence[int], sizes: Sequence[int] = None) -> List[bool]:
+    """Check which members of a table hold a DDS header in their first 8 bytes.
+
+    Same result as has_dds_header on every member, including matches not
+    aligned on a byte of the hex string.
+
+    Parameters
+    ----------
+    data : bytes-like
+    offsets : list of int
+    sizes : list of int or None
+        See read_magics
+
+    Returns
+    -------
+    list of bool
+
+    """
+    # Imported here as numpy is slow to import and only needed for tables
+    import numpy as np
+
+    magics, available = read_magics(data, offsets, sizes)
+    found = np.zeros(len(magics), dtype=bool)
+    nibbles = 2 * DDS_SEARCH_SIZE
+    window = 2 * len(DDS_HEADER)
+    for position in range(nibbles - window + 1):
+        shift = np.uint64(4 * (nibbles - window - position))
+        is_match = ((magics >> shift) & np.uint64(0xFFFFFFFF)) == np.uint64(MAGIC_DDS)
+        found |= is_match & (position + window <= 2 * available)
+    return found.tolist()
+
+
+def classify_table(
+        data: bytes,
+        offsets: Sequence[int],
+        sizes: Sequence[int] = None,
+        platform: int = PLATFORM_PC,
+) -> List[Optional[str]]:
+    """Classify every member of a table at once, as classify does.
+
+    Parameters
+    ----------
+    data : bytes-like
+    offsets : list of int
+    sizes : list of int or None
+        See read_magics
+    platform : int
+        PLATFORM_PC or PLATFORM_X360. Default PLATFORM_PC.
+
+    Returns
+    -------
+    list of str or None
+
+    """
+    magics, available = read_magics(data, offsets, sizes)
+    extensions: List[Optional[str]] = [None] * len(magics)
+    for table in (SIGNATURES, *LONG_TYPE_TABLES, EXTENSIONS[platform]):
+        for idx, extension in enumerate(table.lookup(magics, available)):
+            if extensions[idx] is None:
+                extensions[idx] = extension
+    return extensions
+
+
+def get_member_types(
+        data: bytes,
+        offsets: Sequence[int],
+        sizes: Sequence[int] = None,
+        platform: int = PLATFORM_PC,
+) -> List[Optional[str]]:
+    """Get the type of every member of a table at once, as get_member_type does.
+
+    Parameters
+    ----------
+    data : bytes-like
+    offsets : list of int
+    sizes : list of int or None
+        See read_magics
+    platform : int
+        PLATFORM_PC or PLATFORM_X360. Default PLATFORM_PC.
+
+    Returns
+    -------
+    list of str or None
+
+    """
+    magics, available = read_magics(data, offsets, sizes)
+    signatures = SIGNATURES.lookup(magics, available)
+    extensions = EXTENSIONS[platform].lookup(magics, available)
+    is_dds_list = find_dds_headers(data, offsets, sizes)
+    return [
+        ".TXV" if is_dds else signature or extension
+        for is_dds, signature, extension in zip(is_dds_list, signatures, extensions)
+    ]
+
+
+def get_member_extents(members: Sequence[Dict]) -> Tuple[List[int], List[int]]:
+    """Get the offsets and sizes of FPS4 members parsed into node.data."""
+    offsets = [member["offset_start"] for member in members]
+    sizes = [member["offset_end"] - member["offset_start"] for member in members]
+    return offsets, sizes
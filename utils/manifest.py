@@ -0,0 +1,247 @@
+"""Vesperia Tools Incremental Extraction Manifest."""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Sequence,
+)
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+from constants.version import VERSION
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".vesperia_manifest.json"
+# Lock files live in the temp directory, named by output directory, to
+# keep them out of the extracted trees
+MANIFEST_LOCK_NAME = "vesperia_manifest_{}.lock"
+HASH_CHUNK_SIZE = 1 << 20
+
+# Threads of one process lock a manifest here before locking its file
+_locks: Dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def hash_file(file_path: str) -> str:
+    """Hash file content with SHA-1 in fixed size chunks.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to file
+
+    Returns
+    -------
+    str
+        The hex digest of the file content
+
+    """
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def lock_manifest(dir_path: Path):
+    """Hold the manifest of a directory for a reload-modify-save.
+
+    SVO and DAT stages share an output directory, so jobs running in other
+    processes or threads may update the same manifest at once.
+
+    """
+    key = os.path.normcase(os.path.abspath(dir_path))
+    with _locks_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    lock_name = MANIFEST_LOCK_NAME.format(hashlib.sha1(key.encode()).hexdigest())
+    with lock:
+        with open(os.path.join(tempfile.gettempdir(), lock_name), "a+b") as lock_file:
+            if os.name == "nt":
+                # Blocks for 10 seconds at most, then raises
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if os.name == "nt":
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def stat_file(file_path: str, with_hash=True) -> Dict:
+    """Collect the manifest record of an input file.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to input file
+    with_hash : bool
+        Hash the file content. Default True.
+
+    Returns
+    -------
+    dict
+        Path, size, mtime and (optional) hash of the file
+
+    """
+    stat = os.stat(file_path)
+    record = {
+        "path": str(Path(file_path).resolve()),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+    }
+    if with_hash:
+        record["hash"] = hash_file(file_path)
+    return record
+
+
+class Manifest:
+    """Per output directory record of processed stages.
+
+    Each entry is keyed by stage and input file name, and holds the input
+    files records, the written output files and the tool version. A stage
+    is up to date when its inputs match the recorded size and mtime (or
+    content hash when only the mtime changed), its outputs still exist and
+    it was produced by the current tool version.
+
+    """
+    def __init__(self, dir_path: str):
+        self.dir_path = Path(dir_path)
+        self.file_path = self.dir_path / MANIFEST_NAME
+        self.entries: Dict[str, Dict] = self.load()
+
+    def load(self) -> Dict[str, Dict]:
+        if not self.file_path.is_file():
+            return {}
+        try:
+            with self.file_path.open("r") as f:
+                return json.load(f).get("entries", {})
+        except (OSError, ValueError):
+            logger.warning({
+                "msg": "Ignoring unreadable manifest",
+                "file_path": str(self.file_path),
+            })
+            return {}
+
+    @staticmethod
+    def get_key(stage: str, input_paths: Sequence[str]) -> str:
+        return f"{stage}:{Path(input_paths[0]).name}"
+
+    def is_up_to_date(self, stage: str, input_paths: Sequence[str]) -> bool:
+        """Check if a stage can be skipped.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name (e.g. 'svo', 'dat', 'dec', 'obj')
+        input_paths : list or tuple
+            Input files of the stage. The first one is the primary input.
+
+        Returns
+        -------
+        bool
+            True if the inputs are unchanged and the outputs exist
+
+        """
+        key = self.get_key(stage, input_paths)
+        entry = self.entries.get(key)
+        if not entry or entry.get("version") != VERSION:
+            return False
+
+        records = entry.get("inputs", [])
+        if len(records) != len(input_paths):
+            return False
+
+        is_touched = False
+        for input_path, record in zip(input_paths, records):
+            if not os.path.isfile(input_path):
+                return False
+            current = stat_file(input_path, with_hash=False)
+            if current["path"] != record["path"] or current["size"] != record["size"]:
+                return False
+            if current["mtime"] != record["mtime"]:
+                # Same size but touched. Only the content hash can tell.
+                if hash_file(input_path) != record["hash"]:
+                    return False
+                record["mtime"] = current["mtime"]
+                is_touched = True
+
+        for output_path in entry.get("outputs", []):
+            if not (self.dir_path / output_path).exists():
+                return False
+
+        if is_touched:
+            self.update(key, entry)
+        return True
+
+    def record(
+            self,
+            stage: str,
+            input_paths: Sequence[str],
+            output_paths: Iterable[str],
+    ):
+        """Record a completed stage and save the manifest.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name (e.g. 'svo', 'dat', 'dec', 'obj')
+        input_paths : list or tuple
+            Input files of the stage. The first one is the primary input.
+        output_paths : list or tuple
+            Written output files
+
+        """
+        outputs: List[str] = []
+        for output_path in output_paths:
+            output_path = Path(output_path)
+            try:
+                output_path = output_path.relative_to(self.dir_path)
+            except ValueError:
+                pass
+            outputs.append(output_path.as_posix())
+
+        self.update(self.get_key(stage, input_paths), {
+            "inputs": [stat_file(input_path) for input_path in input_paths],
+            "outputs": outputs,
+            "version": VERSION,
+        })
+
+    def update(self, key: str, entry: Dict):
+        """Set an entry and save the manifest, keeping entries saved by other jobs."""
+        with lock_manifest(self.dir_path):
+            # Reload as other stages may share the same output directory
+            self.entries = self.load()
+            self.entries[key] = entry
+            self.save()
+
+    def save(self):
+        self.dir_path.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(
+            {
+                "version": VERSION,
+                "entries": self.entries,
+            },
+            indent=4,
+            sort_keys=True,
+        )
+        temp_file_path = self.file_path.with_name(f"{MANIFEST_NAME}.{os.getpid()}.{threading.get_ident()}")
+        with temp_file_path.open("w") as f:
+            f.write(data)
+        os.replace(temp_file_path, self.file_path)
@@ -0,0 +1,341 @@
+"""Vesperia Tools Memory Profiling.
+
+Record the tracemalloc peak of pipeline stages per input file, and the
+allocation sites still holding the most memory when each stage ends.
+Disabled by default, in which case spans cost a single flag check.
+tracemalloc slows allocations down noticeably, only enable it for
+profiling runs.
+
+The sites are retained sites: tracemalloc can't snapshot at the peak, so
+temporary buffers freed before the end of a stage count in its peak but
+not in its sites.
+
+tracemalloc traces the whole process, run one stage per process (e.g. the
+CLI worker processes) to keep peaks attributable to their stage. Spans
+nest per thread.
+
+Usage example:
+
+    from utils import memory
+
+    memory.enable("memory.jsonl")
+    with memory.span("dec", "path/to/CH000.DAT.dec"):
+        parse_dec("path/to/CH000.DAT.dec")
+    print(memory.format_summary(memory.get_records()))
+
+"""
+import json
+import linecache
+import os
+import threading
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import (
+    Dict,
+    Iterable,
+    List,
+)
+
+DEFAULT_TOP_SITES = 10
+
+_enabled = False
+_top_sites = DEFAULT_TOP_SITES
+_lock = threading.Lock()
+_local = threading.local()
+_records: List["MemoryRecord"] = []
+_jsonl_file = None
+
+
+@dataclass
+class AllocationSite:
+    filename: str
+    lineno: int
+    size: int
+    count: int
+    line: str = ""
+
+
+@dataclass
+class MemoryRecord:
+    stage: str
+    path: str = ""
+    peak: int = 0
+    retained: int = 0
+    pid: int = 0
+    retained_sites: List[AllocationSite] = field(default_factory=list)
+
+
+@dataclass
+class MemorySummary:
+    calls: int = 0
+    peak: int = 0
+    peak_path: str = ""
+    total_peak: int = 0
+
+
+def enable(jsonl_path: str = None, top_sites: int = DEFAULT_TOP_SITES):
+    """Start tracemalloc and record memory spans.
+
+    Parameters
+    ----------
+    jsonl_path : str or None
+        Append every record as a JSON line to this file. Default None.
+    top_sites : int
+        Number of retained allocation sites stored per record, 0 to skip
+        the (slow) snapshots. Default 10.
+
+    """
+    global _enabled, _jsonl_file, _top_sites
+    with _lock:
+        if _jsonl_file:
+            _jsonl_file.close()
+            _jsonl_file = None
+        if jsonl_path:
+            _jsonl_file = open(jsonl_path, "a", buffering=1)
+        _top_sites = top_sites
+        _enabled = True
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _enabled, _jsonl_file
+    with _lock:
+        _enabled = False
+        if _jsonl_file:
+            _jsonl_file.close()
+            _jsonl_file = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _records.clear()
+
+
+def get_records() -> List[MemoryRecord]:
+    with _lock:
+        return list(_records)
+
+
+def get_stack() -> List["MemorySpan"]:
+    """Get the open spans of the current thread."""
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+def get_top_sites(start: tracemalloc.Snapshot, end: tracemalloc.Snapshot, limit: int) -> List[AllocationSite]:
+    """Get the sites which retained the most memory between two snapshots.
+
+    Parameters
+    ----------
+    start : tracemalloc.Snapshot
+    end : tracemalloc.Snapshot
+    limit : int
+
+    Returns
+    -------
+    list of AllocationSite
+
+    """
+    # Leave out the profiler itself, modules imported during the stage and
+    # classes created by them (abc registries, dataclass methods compiled
+    # from strings). Modules imported on first use should be loaded before
+    # the span, see utils.pipeline.import_stage_modules.
+    filters = (
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<frozen abc>"),
+        tracemalloc.Filter(False, "<string>"),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, linecache.__file__),
+        tracemalloc.Filter(False, __file__),
+    )
+    start = start.filter_traces(filters)
+    end = end.filter_traces(filters)
+    sites = []
+    for stat in end.compare_to(start, "lineno")[:limit]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        sites.append(AllocationSite(
+            filename=frame.filename,
+            lineno=frame.lineno,
+            size=stat.size_diff,
+            count=stat.count_diff,
+            line=linecache.getline(frame.filename, frame.lineno).strip(),
+        ))
+    return sites
+
+
+class MemorySpan:
+    """Context manager recording the memory peak of a stage while enabled.
+
+    Nested spans reset the tracemalloc peak, the peak seen before a nested
+    span is carried over to its parent.
+
+    """
+    __slots__ = ("record", "start_size", "observed_peak", "snapshot")
+
+    def __init__(self, stage: str, path: str = ""):
+        self.record = MemoryRecord(stage=stage, path=path)
+        self.start_size = 0
+        self.observed_peak = 0
+        self.snapshot = None
+
+    def __enter__(self):
+        self.record.pid = os.getpid()
+        if _top_sites:
+            self.snapshot = tracemalloc.take_snapshot()
+        size, peak = tracemalloc.get_traced_memory()
+        stack = get_stack()
+        if stack:
+            parent = stack[-1]
+            parent.observed_peak = max(parent.observed_peak, peak)
+        stack.append(self)
+        self.start_size = size
+        tracemalloc.reset_peak()
+        return self.record
+
+    def __exit__(self, *exc_info):
+        size, peak = tracemalloc.get_traced_memory()
+        stack = get_stack()
+        stack.pop()
+        if stack:
+            parent = stack[-1]
+            parent.observed_peak = max(parent.observed_peak, peak)
+        self.record.peak = max(peak, self.observed_peak) - self.start_size
+        self.record.retained = size - self.start_size
+        if self.snapshot:
+            self.record.retained_sites = get_top_sites(self.snapshot, tracemalloc.take_snapshot(), _top_sites)
+            self.snapshot = None
+        line = json.dumps(asdict(self.record)) + "\n"
+        with _lock:
+            _records.append(self.record)
+            if _jsonl_file:
+                _jsonl_file.write(line)
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(stage: str, path: str = ""):
+    """Record the memory peak of a block of code.
+
+    Parameters
+    ----------
+    stage : str
+        Stage name (e.g. 'dec')
+    path : str
+        Input file of the stage
+
+    """
+    if not _enabled:
+        return NULL_SPAN
+    return MemorySpan(stage, path)
+
+
+def load_records(jsonl_path: str) -> List[MemoryRecord]:
+    """Load records written as JSON lines (e.g. by worker processes).
+
+    Parameters
+    ----------
+    jsonl_path : str
+
+    Returns
+    -------
+    list of MemoryRecord
+
+    """
+    records = []
+    with open(jsonl_path, "r") as f:
+        for line in f:
+            if line.strip():
+                data = json.loads(line)
+                data["retained_sites"] = [AllocationSite(**site) for site in data.get("retained_sites", [])]
+                records.append(MemoryRecord(**data))
+    return records
+
+
+def summarize(records: Iterable[MemoryRecord]) -> Dict[str, MemorySummary]:
+    summaries: Dict[str, MemorySummary] = {}
+    for record in records:
+        summary = summaries.setdefault(record.stage, MemorySummary())
+        summary.calls += 1
+        summary.total_peak += record.peak
+        if record.peak >= summary.peak:
+            summary.peak = record.peak
+            summary.peak_path = record.path
+    return summaries
+
+
+def format_summary(records: Iterable[MemoryRecord], top_files: int = 5) -> str:
+    """Format a memory report as plain text.
+
+    Lists the peak per stage, the input files with the highest peaks and
+    the retained allocation sites of the highest peak of each stage.
+
+    Parameters
+    ----------
+    records : list of MemoryRecord
+    top_files : int
+        Number of input files listed. Default 5.
+
+    Returns
+    -------
+    str
+
+    """
+    records = list(records)
+    summaries = summarize(records)
+    lines = [
+        f"{'stage':<16}{'calls':>8}{'peak (MB)':>12}{'mean (MB)':>12}  peak file",
+    ]
+    for stage, summary in sorted(summaries.items(), key=lambda item: -item[1].peak):
+        mean = summary.total_peak / summary.calls if summary.calls else 0
+        lines.append(
+            f"{stage:<16}{summary.calls:>8}{summary.peak / 1e6:>12.2f}{mean / 1e6:>12.2f}"
+            f"  {summary.peak_path}"
+        )
+
+    lines.append("")
+    lines.append(f"{'file':<60}{'stage':>8}{'peak (MB)':>12}")
+    for record in sorted(records, key=lambda record: -record.peak)[:top_files]:
+        lines.append(f"{record.path[-60:]:<60}{record.stage:>8}{record.peak / 1e6:>12.2f}")
+
+    for stage in sorted(summaries, key=lambda stage: -summaries[stage].peak):
+        worst = max(
+            (record for record in records if record.stage == stage),
+            key=lambda record: record.peak,
+        )
+        if not worst.retained_sites:
+            continue
+        lines.append("")
+        lines.append(
+            f"Top retained allocation sites of {stage} at its end ({os.path.basename(worst.path)}):"
+        )
+        for site in worst.retained_sites:
+            lines.append(
+                f"{site.size / 1e6:>10.2f} MB {site.count:>8} blocks  "
+                f"{os.path.basename(site.filename)}:{site.lineno}  {site.line}"
+            )
+    return "\n".join(lines)
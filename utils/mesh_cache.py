@@ -0,0 +1,402 @@
+"""Vesperia Tools Mesh Cache.
+
+On-disk cache of decoded SPM/SPV packages (vertices, normals, UVs, skin
+data, indices and created faces), so exporting the same package again (OBJ
+then GLB, LODs, the viewer) skips parse_mesh and face_creation.
+
+Entries are keyed by the SPM and SPV content hash, the tool version and
+MESH_CACHE_VERSION. Each entry is a single file holding a JSON index
+followed by raw arrays, read back through a memory map. The least recently
+used entries are evicted once the cache exceeds its size cap.
+
+Usage example:
+
+    from utils.mesh_cache import MeshCache, load_node
+
+    cache = MeshCache("path/to/cache")
+    node = load_node("path/to/PACKAGE.SPM", cache=cache)
+
+"""
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+
+from constants.version import VERSION
+from parsers.models import Mesh, Node
+from utils import instrument
+from utils.manifest import hash_file
+
+logger = logging.getLogger(__name__)
+
+# Bump when parse_mesh or create_face change their output
+MESH_CACHE_VERSION = 1
+MESH_CACHE_EXT = ".vtmc"
+DEFAULT_MESH_CACHE_SIZE = 2 << 30
+
+CACHE_MAGIC = b"VTMC"
+# Magic, cache version, index size
+CACHE_HEADER = struct.Struct("<4sIQ")
+CACHE_ALIGNMENT = 16
+
+# Mesh attribute, dtype and number of columns
+MESH_ARRAYS = (
+    ("vertPosList", "<f4", 3),
+    ("vertNormList", "<f4", 3),
+    ("vertUVList", "<f8", 2),
+    ("indiceList", "<u2", 1),
+    ("skinIndiceList", "<u1", 4),
+    ("skinWeightList", "<f8", 4),
+    ("matIDList", "<i4", 1),
+)
+CACHED_MESH_ATTRIBUTES = tuple(attribute for attribute, _, _ in MESH_ARRAYS) + ("triangleList",)
+
+# Content hash of input files keyed by (path, size, mtime)
+_hashes: Dict[Tuple[str, int, int], str] = {}
+
+
+def get_package_paths(file_path: str) -> Tuple[str, str]:
+    prefix_path = os.path.splitext(file_path)[0]
+    return prefix_path + ".SPM", prefix_path + ".SPV"
+
+
+def get_content_hash(file_path: str) -> str:
+    """Hash a file once per process as long as its size and mtime hold."""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    content_hash = _hashes.get(key)
+    if content_hash is None:
+        content_hash = _hashes[key] = hash_file(file_path)
+    return content_hash
+
+
+def to_array(values: list, dtype: str, columns: int) -> np.ndarray:
+    array = np.asarray(values, dtype=dtype)
+    return array.reshape(-1, columns) if columns > 1 else array.reshape(-1)
+
+
+def pack_node(node: Node) -> bytes:
+    """Pack the decoded meshes of a Node as a cache entry.
+
+    Parameters
+    ----------
+    node : Node
+        Node with parsed meshes and created faces
+
+    Returns
+    -------
+    bytes
+
+    """
+    arrays = []
+    offset = 0
+
+    def add(array: np.ndarray) -> List:
+        nonlocal offset
+        arrays.append(array)
+        entry = [array.dtype.str, list(array.shape), offset]
+        offset += -(-array.nbytes // CACHE_ALIGNMENT) * CACHE_ALIGNMENT
+        return entry
+
+    mesh_lists = []
+    for mesh_list in node.data["mesh_list"]:
+        meshes = []
+        for mesh in mesh_list:
+            entry = {
+                "name": mesh.name,
+                "diffuseID": getattr(mesh, "diffuseID", None),
+                "vertUVCount": mesh.vertUVCount,
+                "arrays": {
+                    attribute: add(to_array(getattr(mesh, attribute), dtype, columns))
+                    for attribute, dtype, columns in MESH_ARRAYS
+                },
+            }
+            faces = np.array(
+                [[face["group"], *face["triangle"]] for face in mesh.triangleList],
+                dtype="<i4",
+            ).reshape(-1, 4)
+            entry["arrays"]["triangleList"] = add(faces)
+            meshes.append(entry)
+        mesh_lists.append(meshes)
+
+    index = json.dumps({
+        "name": node.name,
+        "hash_list": list(node.data.get("hash_list", [])),
+        "mesh_list": mesh_lists,
+    }).encode()
+    data_offset = -(-(CACHE_HEADER.size + len(index)) // CACHE_ALIGNMENT) * CACHE_ALIGNMENT
+    chunks = [
+        CACHE_HEADER.pack(CACHE_MAGIC, MESH_CACHE_VERSION, len(index)),
+        index,
+        bytes(data_offset - CACHE_HEADER.size - len(index)),
+    ]
+    for array in arrays:
+        chunks.append(array.tobytes())
+        chunks.append(bytes(-array.nbytes % CACHE_ALIGNMENT))
+    return b"".join(chunks)
+
+
+class CachedMesh(Mesh):
+    """Mesh converting the arrays of a cache entry to lists on first access.
+
+    The arrays are views of the memory mapped entry, so a cache hit only
+    pays for the attributes actually used.
+
+    """
+    def __init__(self, arrays: Dict[str, np.ndarray] = None):
+        super().__init__()
+        for attribute in CACHED_MESH_ATTRIBUTES:
+            delattr(self, attribute)
+        self.arrays = arrays or {}
+
+    def __getattr__(self, name):
+        # Only called for missing attributes, i.e. not converted yet
+        arrays = self.__dict__.get("arrays")
+        if not arrays or name not in arrays:
+            raise AttributeError(name)
+        array = arrays.pop(name)
+        if name == "triangleList":
+            value = [
+                {"group": group, "triangle": [a, b, c]}
+                for group, a, b, c in array.tolist()
+            ]
+        else:
+            value = array.tolist()
+        setattr(self, name, value)
+        return value
+
+
+def read_node(entry_path: str, node: Node = None) -> Node:
+    """Read a cache entry through a memory map.
+
+    Parameters
+    ----------
+    entry_path : str
+    node : Node or None
+        Node to fill. Default None creates one.
+
+    Returns
+    -------
+    Node
+        Node of CachedMesh
+
+    """
+    data = np.memmap(entry_path, dtype=np.uint8, mode="r")
+    magic, version, index_size = CACHE_HEADER.unpack_from(data, 0)
+    if magic != CACHE_MAGIC or version != MESH_CACHE_VERSION:
+        raise ValueError(f"Invalid mesh cache entry {entry_path}")
+    index = json.loads(bytes(data[CACHE_HEADER.size:CACHE_HEADER.size + index_size]))
+    data_offset = -(-(CACHE_HEADER.size + index_size) // CACHE_ALIGNMENT) * CACHE_ALIGNMENT
+
+    def get(dtype: str, shape: List[int], offset: int) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        start = data_offset + offset
+        end = start + dtype.itemsize * int(np.prod(shape))
+        return data[start:end].view(dtype).reshape(shape)
+
+    node = Node() if node is None else node
+    node.name = index["name"]
+    node.data["hash_list"] = tuple(index["hash_list"])
+    node.data["mesh_list"] = []
+    for entries in index["mesh_list"]:
+        mesh_list = []
+        for entry in entries:
+            mesh = CachedMesh({
+                attribute: get(*array)
+                for attribute, array in entry["arrays"].items()
+            })
+            mesh.name = entry["name"]
+            if entry["diffuseID"] is not None:
+                mesh.diffuseID = entry["diffuseID"]
+            mesh.vertUVCount = entry["vertUVCount"]
+            mesh_list.append(mesh)
+        node.data["mesh_list"].append(mesh_list)
+    return node
+
+
+class MeshCache:
+    """Size capped directory of decoded packages.
+
+    The mtime of an entry is bumped on every hit, eviction removes the
+    entries with the oldest mtime first. Entries are written to a temp
+    file and renamed, so processes can share a cache directory.
+
+    """
+    def __init__(self, dir_path: str, max_size: int = DEFAULT_MESH_CACHE_SIZE):
+        self.dir_path = dir_path
+        self.max_size = max_size
+
+    def get_key(self, spm_path: str, spv_path: str) -> str:
+        digest = hashlib.sha1()
+        digest.update(f"{VERSION}:{MESH_CACHE_VERSION}".encode())
+        for file_path in (spm_path, spv_path):
+            digest.update(get_content_hash(file_path).encode())
+        return digest.hexdigest()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.dir_path, key + MESH_CACHE_EXT)
+
+    def load(self, spm_path: str, node: Node = None) -> Optional[Node]:
+        """Load a package from the cache.
+
+        Parameters
+        ----------
+        spm_path : str
+            Path to SPM file
+        node : Node or None
+            Node to fill. Default None creates one.
+
+        Returns
+        -------
+        Node or None
+            None on a cache miss
+
+        """
+        entry_path = self.get_path(self.get_key(*get_package_paths(spm_path)))
+        if not os.path.isfile(entry_path):
+            return None
+        try:
+            with instrument.span("mesh_cache_load", file=os.path.basename(spm_path)):
+                node = read_node(entry_path, node)
+            # Identical packages share an entry
+            node.name = os.path.splitext(os.path.basename(spm_path))[0]
+        except (OSError, ValueError, KeyError, struct.error):
+            logger.warning({
+                "msg": "Ignoring unreadable mesh cache entry",
+                "entry_path": entry_path,
+            })
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return node
+
+    def store(self, spm_path: str, node: Node) -> str:
+        """Store a decoded package and evict the least recently used entries.
+
+        Parameters
+        ----------
+        spm_path : str
+            Path to SPM file
+        node : Node
+            Node with parsed meshes and created faces
+
+        Returns
+        -------
+        str
+            The cache entry path
+
+        """
+        entry_path = self.get_path(self.get_key(*get_package_paths(spm_path)))
+        os.makedirs(self.dir_path, exist_ok=True)
+        with instrument.span("mesh_cache_store", file=os.path.basename(spm_path)):
+            data = pack_node(node)
+            # Per thread, the GUI shares its cache between the viewer and export jobs
+            temp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, entry_path)
+        self.evict()
+        return entry_path
+
+    def get_entries(self) -> List[Tuple[float, int, str]]:
+        """List the entries as (mtime, size, path), least recently used first."""
+        entries = []
+        if not os.path.isdir(self.dir_path):
+            return entries
+        for entry in os.scandir(self.dir_path):
+            if not entry.name.endswith(MESH_CACHE_EXT):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def get_size(self) -> int:
+        return sum(size for _, size, _ in self.get_entries())
+
+    def evict(self):
+        entries = self.get_entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                # Already evicted, or still mapped on Windows
+                pass
+            total_size -= size
+            logger.debug({
+                "msg": "Evicted mesh cache entry",
+                "entry_path": entry_path,
+                "size": size,
+            })
+
+    def clear(self):
+        for _, _, entry_path in self.get_entries():
+            try:
+                os.remove(entry_path)
+            except OSError:
+                # Already evicted, or still mapped on Windows
+                pass
+
+
+def load_node(
+        file_path: str,
+        node: Node = None,
+        cache: MeshCache = None,
+        workers=1,
+) -> Node:
+    """Parse an SPM/SPV package and create its faces, through the cache if any.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to SPM or SPV file (e.g. 'path/to/PACKAGE.SPM')
+    node : Node or None
+        Node to fill. Default None creates one.
+    cache : MeshCache or None
+        Default None always parses the package.
+    workers : int
+        Number of processes decoding the meshes on a cache miss. Default 1.
+
+    Returns
+    -------
+    Node
+        Node with parsed meshes and created faces
+
+    """
+    # Imported here so cache hits don't pay for the parsers
+    from parsers.parser import parse_mesh
+    from utils.meshes import face_creation
+
+    spm_path, _ = get_package_paths(file_path)
+    node = Node() if node is None else node
+    if cache is not None and cache.load(spm_path, node) is not None:
+        return node
+
+    parse_mesh(spm_path, node, verbose=False, workers=workers)
+    face_creation(node, verbose=False)
+    if cache is not None:
+        try:
+            cache.store(spm_path, node)
+        except OSError:
+            logger.warning({
+                "msg": "Failed to store mesh cache entry",
+                "file_path": spm_path,
+            }, exc_info=True)
+    return node
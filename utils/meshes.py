@@ -4,6 +4,7 @@ import os
 import re
 
 from parsers.models import Node
+from utils import instrument
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +63,7 @@ def round_float_value(value: float, decimal: int):
     return rounded_value.format(value)
 
 
+@instrument.instrumented("write_to_obj")
 def write_to_obj(node: Node, output_path: str):
     """Write out decoded mesh as Wavefront OBJ file.
 
@@ -132,7 +134,10 @@ def write_to_obj(node: Node, output_path: str):
             })
 
             # Write mesh attributes into OBJ file
-            with open(write_output_path, write_mode) as f:
+            mesh_span = instrument.span("write_mesh", name=valid_mesh_name, faces=len(faces))
+            with mesh_span, open(write_output_path, write_mode) as f:
+                # Appending starts at the end of the previous submeshes
+                start_size = f.tell()
                 f.write(f"# submesh {mesh_idx+1}: {valid_mesh_name}" + "\n")
                 f.write(f"o {valid_mesh_name}" + "\n")
                 f.write("s 1" + "\n")
@@ -164,6 +169,10 @@ def write_to_obj(node: Node, output_path: str):
                     c = face['triangle'][2] + 1
                     f.write(f"f {a}/{a}/{a} {b}/{b}/{b} {c}/{c}/{c}" + "\n")
 
+                written_size = f.tell() - start_size
+
+            instrument.add(bytes_out=written_size, items=1)
+
             logger.debug("Export %s submesh successful" % write_output_path)
 
         logger.debug("Done exporting %s" % node.name)
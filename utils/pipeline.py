@@ -0,0 +1,224 @@
+"""Vesperia Tools Extraction Pipeline.
+
+Stages and their dependencies:
+
+    SVO -> DAT -> DEC -> EXT (nested FPS4) -> OBJ (SPM/SPV), DDS (TXM/TXV), MTL (MTR)
+
+"""
+import importlib
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    List,
+    Sequence,
+)
+
+from constants.tales import FPS4_MAX_DEPTH
+from utils import instrument, memory
+from utils.filters import MemberFilter, match_globs
+from utils.scheduler import Job
+
+logger = logging.getLogger(__name__)
+
+STAGE_SVO = "svo"
+STAGE_DAT = "dat"
+STAGE_DEC = "dec"
+STAGE_EXT = "ext"
+STAGE_OBJ = "obj"
+STAGE_DDS = "dds"
+STAGE_MTL = "mtl"
+ASSET_STAGES = (STAGE_OBJ, STAGE_DDS, STAGE_MTL)
+
+# Modules the stages import on first use
+STAGE_MODULES = (
+    "numpy",
+    "parsers.parser",
+    "utils.exporter",
+    "utils.mesh_cache",
+)
+
+
+@dataclass(frozen=True)
+class PipelineOptions:
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+    force: bool = False
+    mesh_workers: int = 1
+    mesh_cache_path: str = ""
+    recursive: bool = False
+    max_depth: int = FPS4_MAX_DEPTH
+    member_filter: MemberFilter = field(default_factory=MemberFilter)
+
+
+def is_wanted(job: Job, options: PipelineOptions) -> bool:
+    """Apply include/exclude globs on a job input file name.
+
+    Exclude globs apply to every stage. Include globs only restrict the
+    asset export stages, so containers are still traversed to reach them.
+
+    """
+    name = Path(job.path).name
+    if options.exclude and match_globs(name, options.exclude):
+        return False
+    if options.include and job.stage in ASSET_STAGES:
+        return match_globs(name, options.include)
+    return True
+
+
+def discover_svo_jobs(game_path: str) -> List[Job]:
+    """Find every SVO under a game directory.
+
+    Parameters
+    ----------
+    game_path : str
+        Path to the game directory or a single SVO file
+
+    Returns
+    -------
+    list of Job
+
+    """
+    game_path = Path(game_path)
+    if game_path.is_file():
+        return [Job(STAGE_SVO, str(game_path))]
+    return [
+        Job(STAGE_SVO, str(file_path))
+        for file_path in sorted(game_path.rglob("*"))
+        if file_path.is_file() and file_path.suffix.lower() == ".svo"
+    ]
+
+
+def discover_extracted_jobs(dir_path: Path, recursive=False) -> List[Job]:
+    """Find follow-up jobs in an extracted DEC or FPS4 directory.
+
+    Parameters
+    ----------
+    dir_path : Path
+        The extracted directory (e.g. 'path/to/PACKAGE.DAT.dec.ext')
+    recursive : bool
+        The directory holds a tree extracted by parse_dec(recursive=True).
+        Nested '.ext' directories are searched as well and FPS4 files left
+        at the depth limit aren't extracted. Default False.
+
+    Returns
+    -------
+    list of Job
+
+    """
+    jobs = []
+    if not dir_path.is_dir():
+        return jobs
+    for file_path in sorted(dir_path.iterdir()):
+        if recursive and file_path.is_dir() and file_path.suffix == ".ext":
+            jobs.extend(discover_extracted_jobs(file_path, recursive))
+            continue
+        if not file_path.is_file():
+            continue
+        suffix = file_path.suffix.upper()
+        if suffix == ".FPS4":
+            if recursive:
+                continue
+            jobs.append(Job(STAGE_EXT, str(file_path)))
+        elif suffix == ".SPM" and file_path.with_suffix(".SPV").is_file():
+            jobs.append(Job(STAGE_OBJ, str(file_path)))
+        elif suffix == ".TXM" and file_path.with_suffix(".TXV").is_file():
+            jobs.append(Job(STAGE_DDS, str(file_path)))
+        elif suffix == ".MTR":
+            jobs.append(Job(STAGE_MTL, str(file_path)))
+    return jobs
+
+
+def import_stage_modules():
+    """Import the modules the stages load on first use.
+
+    Called before opening a memory span, so that the allocations made while
+    importing them aren't reported as the retained sites of the first stage
+    run by a process.
+
+    """
+    for module_name in STAGE_MODULES:
+        importlib.import_module(module_name)
+
+
+def run_stage(options: PipelineOptions, job: Job) -> List[Job]:
+    """Run a pipeline stage and return its follow-up jobs.
+
+    Parameters
+    ----------
+    options : PipelineOptions
+    job : Job
+
+    Returns
+    -------
+    list of Job
+        Wanted jobs depending on the output of this job
+
+    """
+    if memory.is_enabled():
+        import_stage_modules()
+    with instrument.span(f"job:{job.stage}", path=job.path), memory.span(job.stage, job.path):
+        children = run_stage_job(options, job)
+    return [child for child in children if is_wanted(child, options)]
+
+
+def run_stage_job(options: PipelineOptions, job: Job) -> List[Job]:
+    # Imported here so worker processes only load what their stage needs
+    from parsers.parser import (
+        parse_dat,
+        parse_dec,
+        parse_dec_ext,
+        parse_svo,
+    )
+    from utils.exporter import (
+        export_dds_textures,
+        export_wavefront_mtl,
+        export_wavefront_obj,
+    )
+
+    file_path = Path(job.path)
+    output_path = str(file_path.parent)
+    children = []
+    if job.stage == STAGE_SVO:
+        parse_svo(job.path, force=options.force, member_filter=options.member_filter)
+        svo_dir_path = file_path.parent / file_path.name.split('.')[0]
+        children = [
+            Job(STAGE_DAT, str(dat_path))
+            for dat_path in sorted(svo_dir_path.glob("*"))
+            if dat_path.suffix.lower() == ".dat"
+        ]
+    elif job.stage == STAGE_DAT:
+        parse_dat(job.path, force=options.force)
+        children = [Job(STAGE_DEC, f"{job.path}.dec")]
+    elif job.stage == STAGE_DEC:
+        parse_dec(
+            job.path,
+            force=options.force,
+            recursive=options.recursive,
+            max_depth=options.max_depth,
+            member_filter=options.member_filter,
+        )
+        children = discover_extracted_jobs(Path(f"{job.path}.ext"), options.recursive)
+    elif job.stage == STAGE_EXT:
+        parse_dec_ext(job.path, member_filter=options.member_filter)
+        children = discover_extracted_jobs(Path(f"{job.path}.ext"))
+    elif job.stage == STAGE_OBJ:
+        cache = None
+        if options.mesh_cache_path:
+            from utils.mesh_cache import MeshCache
+            cache = MeshCache(options.mesh_cache_path)
+        export_wavefront_obj(
+            job.path,
+            output_path,
+            force=options.force,
+            workers=options.mesh_workers,
+            cache=cache,
+        )
+    elif job.stage == STAGE_DDS:
+        export_dds_textures(job.path, output_path, force=options.force)
+    elif job.stage == STAGE_MTL:
+        export_wavefront_mtl(job.path, output_path, force=options.force)
+    else:
+        raise ValueError(f"Unknown stage: {job.stage}")
+
+    return children
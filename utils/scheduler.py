@@ -0,0 +1,192 @@
+"""Vesperia Tools Stage Scheduler."""
+import logging
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, field
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Job:
+    stage: str
+    path: str
+
+
+@dataclass
+class JobResult:
+    job: Job
+    elapsed: float = 0.0
+    children: List[Job] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class StageSummary:
+    count: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    slowest: float = 0.0
+
+
+def run_jobs(
+        jobs: Iterable[Job],
+        runner: Callable[[Job], JobResult],
+        workers: int = 1,
+        initializer: Callable = None,
+        on_result: Callable[[JobResult], None] = None,
+) -> List[JobResult]:
+    """Run jobs as a dependency graph expanded from finished jobs.
+
+    A job only becomes known once the job producing its input has finished
+    (e.g. the DAT jobs of an SVO), so the graph is expanded from the
+    children returned by the runner. Independent jobs run concurrently.
+
+    Parameters
+    ----------
+    jobs : iterable of Job
+        The root jobs (e.g. one per SVO).
+    runner : callable
+        Picklable function running a job and returning its JobResult.
+    workers : int
+        Number of worker processes. 1 runs every job in the current process.
+    initializer : callable or None
+        Worker process initializer (e.g. to set up logging).
+    on_result : callable or None
+        Called in the parent process for every finished job.
+
+    Returns
+    -------
+    list of JobResult
+        Results in completion order.
+
+    """
+    results: List[JobResult] = []
+    pending: List[Job] = list(jobs)
+    seen = set(pending)
+
+    def collect(result: JobResult):
+        results.append(result)
+        if on_result:
+            on_result(result)
+        for child in result.children:
+            if child not in seen:
+                seen.add(child)
+                pending.append(child)
+
+    if workers <= 1:
+        if initializer:
+            initializer()
+        while pending:
+            collect(runner(pending.pop(0)))
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+        running: Dict[Future, Job] = {}
+        while pending or running:
+            while pending:
+                job = pending.pop(0)
+                running[executor.submit(runner, job)] = job
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Worker process died or runner raised outside its guard
+                    result = JobResult(job=job, error=repr(e))
+                collect(result)
+
+    return results
+
+
+def summarize(results: Iterable[JobResult]) -> Dict[str, StageSummary]:
+    """Aggregate job results per stage.
+
+    Parameters
+    ----------
+    results : iterable of JobResult
+
+    Returns
+    -------
+    dict
+        StageSummary keyed by stage name
+
+    """
+    summaries: Dict[str, StageSummary] = {}
+    for result in results:
+        summary = summaries.setdefault(result.job.stage, StageSummary())
+        summary.count += 1
+        summary.elapsed += result.elapsed
+        summary.slowest = max(summary.slowest, result.elapsed)
+        if result.error:
+            summary.failed += 1
+    return summaries
+
+
+def format_summary(summaries: Dict[str, StageSummary], wall_time: float) -> str:
+    """Format stage summaries as a plain text table.
+
+    Parameters
+    ----------
+    summaries : dict
+        StageSummary keyed by stage name
+    wall_time : float
+        Total wall time of the run in seconds
+
+    Returns
+    -------
+    str
+
+    """
+    lines = [
+        f"{'stage':<8}{'jobs':>8}{'failed':>8}{'total (s)':>12}{'slowest (s)':>14}",
+    ]
+    for stage, summary in summaries.items():
+        lines.append(
+            f"{stage:<8}{summary.count:>8}{summary.failed:>8}"
+            f"{summary.elapsed:>12.2f}{summary.slowest:>14.2f}"
+        )
+    lines.append(f"Wall time: {wall_time:.2f}s")
+    return "\n".join(lines)
+
+
+def timed(runner: Callable[[Job], List[Job]], job: Job) -> JobResult:
+    """Run a job, timing it and capturing its error instead of raising.
+
+    Parameters
+    ----------
+    runner : callable
+        Function running a job and returning its child jobs.
+    job : Job
+
+    Returns
+    -------
+    JobResult
+
+    """
+    start = time.perf_counter()
+    result = JobResult(job=job)
+    try:
+        result.children = runner(job)
+    except Exception as e:
+        logger.exception({
+            "msg": "Job failed",
+            "stage": job.stage,
+            "path": job.path,
+        })
+        result.error = repr(e)
+    result.elapsed = time.perf_counter() - start
+    return result
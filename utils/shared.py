@@ -0,0 +1,252 @@
+"""Vesperia Tools Shared Memory Transport.
+
+Move large buffers (decompressed containers, packed mesh arrays) between
+processes through multiprocessing.shared_memory instead of pickling them.
+Only a small SharedBufferHandle crosses the process boundary, the data is
+copied once into the shared block and read in place by the receiver.
+
+The process owning a block (the one which created or adopted it) counts
+its references and unlinks the block when the last one is released. Other
+processes only attach and detach.
+
+Usage example:
+
+    from utils import shared
+
+    # Parent
+    registry = shared.SharedBufferRegistry()
+    handle = registry.put(dec_content)
+    executor.submit(worker, handle.slice(offset, size))
+    ...
+    registry.release(handle)
+
+    # Worker
+    def worker(handle):
+        data = shared.attach(handle)
+        ...
+        shared.detach(handle)
+
+"""
+import logging
+import sys
+import threading
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Blocks attached by the current process, keyed by block name
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+_lock = threading.RLock()
+
+
+@dataclass(frozen=True)
+class SharedBufferHandle:
+    """Picklable reference to a range of a shared memory block."""
+    name: str
+    size: int
+    offset: int = 0
+    length: int = -1
+
+    def slice(self, offset: int, length: int) -> "SharedBufferHandle":
+        """Get a handle to a range of this handle's range.
+
+        Parameters
+        ----------
+        offset : int
+            Offset relative to this handle's range
+        length : int
+
+        Returns
+        -------
+        SharedBufferHandle
+
+        """
+        return SharedBufferHandle(self.name, self.size, self.offset + offset, length)
+
+    @property
+    def end(self) -> int:
+        return self.size if self.length < 0 else self.offset + self.length
+
+
+def create(size: int) -> shared_memory.SharedMemory:
+    # Zero sized blocks aren't allowed
+    return shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+
+def open_block(name: str, track=False) -> shared_memory.SharedMemory:
+    """Attach an existing shared block.
+
+    Only the owner of a block needs it registered with the resource
+    tracker, which unlinks it if the owner exits without doing so. Before
+    Python 3.13 attaching always registers the block. The registry starts
+    the tracker before any worker is forked, so workers share it with the
+    owner and registering an already registered block does nothing.
+
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=track)
+    return shared_memory.SharedMemory(name=name)
+
+
+def publish(data) -> SharedBufferHandle:
+    """Copy data to a new shared block to send it to another process.
+
+    The receiving process must adopt the handle with
+    SharedBufferRegistry.adopt, which takes over its cleanup. The block
+    stays registered with the resource tracker until then, which unlinks
+    it when the processes sharing the tracker have exited.
+
+    Parameters
+    ----------
+    data : bytes-like or list of bytes-like
+        Buffer, or chunks written one after the other
+
+    Returns
+    -------
+    SharedBufferHandle
+
+    """
+    chunks = data if isinstance(data, (list, tuple)) else [data]
+    size = sum(len(chunk) for chunk in chunks)
+    block = create(size)
+    offset = 0
+    for chunk in chunks:
+        block.buf[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    handle = SharedBufferHandle(block.name, size)
+    # The sender doesn't keep the block mapped
+    block.close()
+    return handle
+
+
+def attach(handle: SharedBufferHandle) -> memoryview:
+    """Map a shared block and get the handle's range without copying.
+
+    Parameters
+    ----------
+    handle : SharedBufferHandle
+
+    Returns
+    -------
+    memoryview
+        Release it (and every numpy array created from it) before detach.
+
+    """
+    with _lock:
+        block = _attached.get(handle.name)
+        if block is None:
+            block = open_block(handle.name)
+            _attached[handle.name] = block
+    return block.buf[handle.offset:handle.end]
+
+
+def detach(handle: SharedBufferHandle):
+    """Unmap a shared block attached by this process."""
+    with _lock:
+        block = _attached.pop(handle.name, None)
+    if block is not None:
+        block.close()
+
+
+def detach_all():
+    with _lock:
+        blocks = list(_attached.values())
+        _attached.clear()
+    for block in blocks:
+        block.close()
+
+
+class SharedBufferRegistry:
+    """Reference counted shared blocks owned by this process.
+
+    A block is unlinked once every reference is released. Use it as a
+    context manager to unlink every remaining block on exit (e.g. when a
+    run is aborted).
+
+    """
+
+    def __init__(self):
+        # Started before any worker is forked so that workers share it
+        resource_tracker.ensure_running()
+        self.blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.references: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def put(self, data, references: int = 1) -> SharedBufferHandle:
+        """Copy data to a new shared block.
+
+        Parameters
+        ----------
+        data : bytes-like
+        references : int
+            Initial reference count (e.g. the number of jobs using it). Default 1.
+
+        Returns
+        -------
+        SharedBufferHandle
+
+        """
+        block = create(len(data))
+        block.buf[:len(data)] = data
+        with self.lock:
+            self.blocks[block.name] = block
+            self.references[block.name] = references
+        return SharedBufferHandle(block.name, len(data))
+
+    def adopt(self, handle: SharedBufferHandle, references: int = 1):
+        """Take over the cleanup of a block published by another process."""
+        block = open_block(handle.name, track=True)
+        with self.lock:
+            self.blocks[handle.name] = block
+            self.references[handle.name] = references
+
+    def view(self, handle: SharedBufferHandle) -> memoryview:
+        """Get the handle's range of an owned block without copying."""
+        return self.blocks[handle.name].buf[handle.offset:handle.end]
+
+    def acquire(self, handle: SharedBufferHandle, count: int = 1):
+        with self.lock:
+            self.references[handle.name] += count
+
+    def release(self, handle: SharedBufferHandle):
+        """Drop a reference, unlinking the block with the last one.
+
+        Views of the block (and numpy arrays created from them) must be
+        released before the last reference.
+
+        """
+        with self.lock:
+            self.references[handle.name] -= 1
+            if self.references[handle.name] > 0:
+                return
+            del self.references[handle.name]
+            block = self.blocks.pop(handle.name)
+        self.unlink(block)
+
+    def unlink(self, block: shared_memory.SharedMemory):
+        try:
+            block.close()
+        except BufferError:
+            # A view is still alive, the mapping goes away with it
+            logger.warning(f"Shared block {block.name} still has views, unlinking without closing")
+        block.unlink()
+
+    def close(self):
+        with self.lock:
+            blocks = list(self.blocks.values())
+            self.blocks.clear()
+            self.references.clear()
+        for block in blocks:
+            self.unlink(block)
+
+    def __len__(self) -> int:
+        return len(self.blocks)
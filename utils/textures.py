@@ -3,10 +3,12 @@ import logging
 from pathlib import Path
 
 from parsers.models import Node
+from utils import instrument
 
 logger = logging.getLogger(__name__)
 
 
+@instrument.instrumented("write_to_dds")
 def write_to_dds(node: Node, output_path: str):
     output_path = Path(output_path)
 
@@ -18,6 +20,8 @@ def write_to_dds(node: Node, output_path: str):
         texture_path = output_path / texture_name
         texture_path.parent.mkdir(exist_ok=True)
         dds_content = image["dds_content"]
-        texture_path.write_bytes(dds_content)
+        with instrument.span("write_texture", name=texture_name, size=len(dds_content)):
+            texture_path.write_bytes(dds_content)
+        instrument.add(bytes_out=len(dds_content), items=1)
 
     logger.info("Writing DDS textures completed.")
@@ -0,0 +1,100 @@
+"""Vesperia Tools Chrome Trace Export.
+
+Convert instrumentation records to the Chrome Trace Event JSON format,
+viewable offline with Perfetto (https://ui.perfetto.dev) or chrome://tracing.
+
+"""
+import json
+import os
+from typing import (
+    Dict,
+    List,
+    Sequence,
+)
+
+from utils.instrument import StageRecord
+
+
+def to_trace_events(records: Sequence[StageRecord]) -> List[Dict]:
+    """Convert records to Trace Event complete ('X') events.
+
+    Parameters
+    ----------
+    records : list of StageRecord
+
+    Returns
+    -------
+    list of dict
+
+    """
+    if not records:
+        return []
+
+    origin = min(record.start for record in records)
+    events = []
+    threads = set()
+    for record in records:
+        args = dict(record.args)
+        args.update({
+            "cpu_ms": round(record.cpu * 1000, 3),
+            "bytes_in": record.bytes_in,
+            "bytes_out": record.bytes_out,
+            "items": record.items,
+        })
+        events.append({
+            "name": record.stage,
+            "cat": record.stage.split(":")[0],
+            "ph": "X",
+            "ts": round((record.start - origin) * 1e6, 3),
+            "dur": round(record.wall * 1e6, 3),
+            "pid": record.pid,
+            "tid": record.tid,
+            "args": args,
+        })
+        threads.add((record.pid, record.tid))
+
+    # Label lanes by worker process and thread
+    main_pid = os.getpid()
+    for pid in sorted({pid for pid, _ in threads}):
+        process_name = "main" if pid == main_pid else f"worker {pid}"
+        events.append({
+            "name": "process_name",
+            "ph": "M",
+            "pid": pid,
+            "args": {"name": process_name},
+        })
+    for pid, tid in sorted(threads):
+        events.append({
+            "name": "thread_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": tid,
+            "args": {"name": f"thread {tid}"},
+        })
+    return events
+
+
+def write_chrome_trace(records: Sequence[StageRecord], trace_path: str) -> str:
+    """Write records as a Chrome Trace Event JSON file.
+
+    Parameters
+    ----------
+    records : list of StageRecord
+    trace_path : str
+        Path to the trace file (e.g. 'path/to/trace.json')
+
+    Returns
+    -------
+    str
+        The trace file path.
+
+    """
+    with open(trace_path, "w") as f:
+        json.dump(
+            {
+                "traceEvents": to_trace_events(records),
+                "displayTimeUnit": "ms",
+            },
+            f,
+        )
+    return trace_path
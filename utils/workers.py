@@ -0,0 +1,161 @@
+"""Vesperia Tools GUI Workers.
+
+Run parsers and exporters on a QThreadPool so the GUI stays responsive.
+The wrapped function must accept a ``progress_callback`` keyword argument,
+which is also where cancellation takes effect.
+
+"""
+import itertools
+import logging
+import threading
+from typing import (
+    Callable,
+    Dict,
+)
+
+from PySide2 import QtCore
+
+from exceptions.jobs import JobCancelledException
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerSignals(QtCore.QObject):
+    """Signals emitted by Worker. Carry the job ID as first argument."""
+    started = QtCore.Signal(int, str)
+    progress = QtCore.Signal(int, int, int)
+    finished = QtCore.Signal(int)
+    failed = QtCore.Signal(int, str)
+    cancelled = QtCore.Signal(int)
+
+
+class Worker(QtCore.QRunnable):
+    def __init__(
+            self,
+            job_id: int,
+            name: str,
+            fn: Callable,
+            *args,
+            **kwargs,
+    ):
+        """Run a parser or exporter function on a QThreadPool thread.
+
+        Parameters
+        ----------
+        job_id : int
+            Unique ID of the job.
+        name : str
+            Display name of the job.
+        fn : callable
+            The parser or exporter function.
+        *args
+            Positional arguments of the function.
+        **kwargs
+            Keyword arguments of the function.
+
+        """
+        super(Worker, self).__init__()
+        self.job_id = job_id
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self.cancel_event = threading.Event()
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def report_progress(self, processed: int, total: int):
+        if self.cancel_event.is_set():
+            raise JobCancelledException(self.name)
+        self.signals.progress.emit(self.job_id, processed, total)
+
+    def run(self):
+        if self.cancel_event.is_set():
+            self.signals.cancelled.emit(self.job_id)
+            return
+
+        self.signals.started.emit(self.job_id, self.name)
+        try:
+            self.fn(*self.args, progress_callback=self.report_progress, **self.kwargs)
+        except JobCancelledException:
+            logger.warning(f"{self.name} cancelled.")
+            self.signals.cancelled.emit(self.job_id)
+        except Exception as e:
+            logger.exception(f"{self.name} failed.")
+            self.signals.failed.emit(self.job_id, str(e))
+        else:
+            self.signals.finished.emit(self.job_id)
+
+
+class JobQueue(QtCore.QObject):
+    """Queue of Worker jobs running on a QThreadPool.
+
+    Jobs beyond the pool's max thread count wait in the pool's queue and
+    start as soon as a thread is free.
+
+    """
+    job_started = QtCore.Signal(int, str)
+    job_progress = QtCore.Signal(int, int, int)
+    job_done = QtCore.Signal(int)
+    jobs_changed = QtCore.Signal(int)
+
+    def __init__(self, max_thread_count: int = None, parent=None):
+        super(JobQueue, self).__init__(parent)
+        self.pool = QtCore.QThreadPool(self)
+        if max_thread_count:
+            self.pool.setMaxThreadCount(max_thread_count)
+        self.workers: Dict[int, Worker] = {}
+        self.job_ids = itertools.count(1)
+
+    def submit(self, name: str, fn: Callable, *args, **kwargs) -> int:
+        """Queue a parser or exporter function.
+
+        Parameters
+        ----------
+        name : str
+            Display name of the job.
+        fn : callable
+            The parser or exporter function.
+        *args
+            Positional arguments of the function.
+        **kwargs
+            Keyword arguments of the function.
+
+        Returns
+        -------
+        int
+            The job ID.
+
+        """
+        job_id = next(self.job_ids)
+        worker = Worker(job_id, name, fn, *args, **kwargs)
+        worker.signals.started.connect(self.job_started)
+        worker.signals.progress.connect(self.job_progress)
+        worker.signals.finished.connect(self.on_job_done)
+        worker.signals.failed.connect(self.on_job_done)
+        worker.signals.cancelled.connect(self.on_job_done)
+        self.workers[job_id] = worker
+        logger.info(f"Queued {name}.")
+        self.pool.start(worker)
+        self.jobs_changed.emit(len(self.workers))
+        return job_id
+
+    def cancel(self, job_id: int):
+        worker = self.workers.get(job_id)
+        if worker:
+            worker.cancel()
+
+    def cancel_all(self):
+        for worker in self.workers.values():
+            worker.cancel()
+
+    def on_job_done(self, job_id: int, *args):
+        self.workers.pop(job_id, None)
+        self.job_done.emit(job_id)
+        self.jobs_changed.emit(len(self.workers))
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        return self.pool.waitForDone(msecs)
@@ -1,20 +1,89 @@
+import collections
+import os
+from typing import List, Sequence
+
 import pyrender
 import trimesh
 
+from parsers.models import Node
+from utils.exporter import export_lods
+from utils.lod import (
+    LOD_COARSE,
+    LOD_FULL,
+    MeshArrays,
+    get_mesh_arrays,
+    read_lod,
+)
+from utils.mesh_cache import MeshCache, get_package_paths, load_node
+
 WIDTH = 640
 HEIGHT = 480
 BG_COLOR = (0.5, 0.5, 0.5, 0.5)
+NODE_CACHE_SIZE = 8
 
+# Nodes viewed in this process keyed by SPM/SPV paths, sizes and mtimes,
+# reopening an unchanged package skips hashing it for the mesh cache
+node_cache = collections.OrderedDict()
 
-def show_viewer(obj_path=None):
-    obj_trimesh = trimesh.load(obj_path)
-    if isinstance(obj_trimesh, trimesh.scene.scene.Scene):
-        scene = pyrender.Scene.from_trimesh_scene(obj_trimesh)
-    else:
-        mesh = pyrender.Mesh.from_trimesh(obj_trimesh)
-        scene = pyrender.Scene()
-        scene.add(mesh)
 
+def get_node(spm_path: str, cache: MeshCache = None) -> Node:
+    """Load an SPM/SPV package, reusing the Node last viewed if unchanged.
+
+    Parameters
+    ----------
+    spm_path : str
+        Path to SPM or SPV file (e.g. 'path/to/PACKAGE.SPM')
+    cache : MeshCache or None
+        Load the decoded meshes from (and store them in) this cache. Default None.
+
+    Returns
+    -------
+    Node
+        Node with parsed meshes and created faces.
+
+    """
+    key = []
+    for file_path in get_package_paths(os.path.abspath(spm_path)):
+        stat = os.stat(file_path)
+        key.extend((file_path, stat.st_size, stat.st_mtime_ns))
+    key = tuple(key)
+    node = node_cache.get(key)
+    if node is not None:
+        node_cache.move_to_end(key)
+        return node
+
+    node = load_node(spm_path, cache=cache)
+    node_cache[key] = node
+    if len(node_cache) > NODE_CACHE_SIZE:
+        node_cache.popitem(last=False)
+    return node
+
+
+def to_trimeshes(mesh_arrays: Sequence[MeshArrays]) -> List[trimesh.Trimesh]:
+    """Build trimesh meshes from vertex and face arrays.
+
+    Parameters
+    ----------
+    mesh_arrays : list of MeshArrays
+
+    Returns
+    -------
+    list of trimesh.Trimesh
+
+    """
+    return [
+        trimesh.Trimesh(
+            vertices=mesh.vertices,
+            faces=mesh.faces,
+            vertex_normals=mesh.normals,
+            metadata={"name": mesh.name},
+            process=False,
+        )
+        for mesh in mesh_arrays
+    ]
+
+
+def show_scene(scene: pyrender.Scene):
     scene.bg_color = BG_COLOR
     scene.ambient_light = (1.0, 1.0, 1.0)
     kwargs = {
@@ -27,3 +96,71 @@ def show_viewer(obj_path=None):
         },
         **kwargs,
     )
+
+
+def show_viewer(obj_path=None):
+    obj_trimesh = trimesh.load(obj_path)
+    if isinstance(obj_trimesh, trimesh.scene.scene.Scene):
+        scene = pyrender.Scene.from_trimesh_scene(obj_trimesh)
+    else:
+        mesh = pyrender.Mesh.from_trimesh(obj_trimesh)
+        scene = pyrender.Scene()
+        scene.add(mesh)
+
+    show_scene(scene)
+
+
+def show_mesh_viewer(mesh_arrays: Sequence[MeshArrays]):
+    """View meshes from vertex and face arrays.
+
+    Parameters
+    ----------
+    mesh_arrays : list of MeshArrays
+
+    """
+    scene = pyrender.Scene()
+    for obj_trimesh in to_trimeshes(mesh_arrays):
+        scene.add(
+            pyrender.Mesh.from_trimesh(obj_trimesh),
+            name=obj_trimesh.metadata["name"],
+        )
+
+    show_scene(scene)
+
+
+def show_node_viewer(node: Node):
+    """View a parsed Node without exporting it to Wavefront OBJ.
+
+    Parameters
+    ----------
+    node : Node
+        Node with parsed meshes and created faces.
+
+    """
+    show_mesh_viewer(get_mesh_arrays(node))
+
+
+def show_spm_viewer(spm_path: str, lod: int = LOD_COARSE, cache: MeshCache = None):
+    """View SPM/SPV package directly.
+
+    Coarse LODs are cached next to the exported Wavefront OBJ files and
+    only rebuilt when the SPM/SPV changes. Full detail Nodes are kept in
+    memory while the package is unchanged, see get_node.
+
+    Parameters
+    ----------
+    spm_path : str
+        Path to SPM or SPV file (e.g. 'path/to/PACKAGE.SPM')
+    lod : int
+        LOD level. LOD_FULL for full detail. Default LOD_COARSE.
+    cache : MeshCache or None
+        Load the decoded meshes from (and store them in) this cache. Default None.
+
+    """
+    if lod == LOD_FULL:
+        show_node_viewer(get_node(spm_path, cache=cache))
+        return
+
+    output_path = os.path.dirname(os.path.abspath(spm_path))
+    lod_path = export_lods(spm_path, output_path, cache=cache)
+    show_mesh_viewer(read_lod(lod_path, lod))